@@ -0,0 +1,59 @@
+"""
+Compare two benchmark result files.
+
+Usage::
+
+    pdm run bench --output before.json
+    # switch branch / version
+    pdm run bench --output after.json
+    pdm run bench-compare before.json after.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Any
+
+from benchmarks.runner import format_ns
+
+
+def _load(path: str) -> dict[str, dict[str, Any]]:
+    with open(path) as f:
+        data = json.load(f)
+    return {result["name"]: result for result in data["results"]}
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--metric",
+        default="ns_per_op_min",
+        help="result field to compare (default: ns_per_op_min)",
+    )
+    args = parser.parse_args(argv)
+
+    before, after = _load(args.before), _load(args.after)
+    names = [name for name in before if name in after]
+    width = max((len(name) for name in names), default=10)
+
+    print(
+        f"{'benchmark':<{width}}  {'before':>12}  {'after':>12}  {'change':>8}"
+    )
+    for name in names:
+        old, new = before[name][args.metric], after[name][args.metric]
+        change = (new - old) / old * 100 if old else 0.0
+        print(
+            f"{name:<{width}}  {format_ns(old):>12}  {format_ns(new):>12}  "
+            f"{change:>+7.1f}%"
+        )
+
+    for name in sorted(set(before) ^ set(after)):
+        side = "before" if name in before else "after"
+        print(f"{name:<{width}}  only in {side}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
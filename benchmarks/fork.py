@@ -0,0 +1,190 @@
+"""
+Memory benchmark for pre-fork servers.
+
+Compiles a synthetic project in a master process, as ``preload`` does under
+gunicorn with ``--preload``, forks workers which evaluate every flag and
+value and run a full garbage collection, and reports how much memory each
+worker had to copy from the master (``Private_Dirty`` from
+``/proc/self/smaps_rollup``, Linux only)::
+
+    python -m benchmarks.fork
+    python -m benchmarks.fork --flags 8000 --workers 8 --output fork.json
+
+``default`` mode forks right after preload, ``freeze`` calls
+``manager.freeze()`` before forking, so collections in workers don't touch
+compiled procs and their pages stay shared. Each mode runs in a fresh
+interpreter.
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+from typing import Any
+
+from benchmarks import generators as gen
+from benchmarks.runner import write_results
+from featureflags_client.http.managers.dummy import DummyManager
+
+MODES = ["default", "freeze"]
+
+
+def smaps_rollup() -> dict[str, int]:
+    """
+    Memory counters of the current process in bytes.
+    """
+    counters = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            parts = rest.split()
+            if len(parts) == 2 and parts[1] == "kB":
+                counters[key] = int(parts[0]) * 1024
+    return counters
+
+
+def preload(args: argparse.Namespace) -> DummyManager:
+    flag_set = gen.make_flag_set(
+        gen.FlagSetSpec(
+            flags=args.flags, values=args.flags // 4, seed=args.seed
+        )
+    )
+    manager = DummyManager(
+        url="",
+        project="bench",
+        variables=gen.VARIABLES,
+        defaults={},
+    )
+    response = flag_set.to_response()
+    manager._state.update(response.flags, response.values, response.version)
+    return manager
+
+
+def work(manager: DummyManager, contexts: list[dict[str, Any]]) -> None:
+    snapshot = manager.get_snapshot()
+    for ctx in contexts:
+        for proc in snapshot.flags.values():
+            proc(ctx)
+        for proc in snapshot.values.values():
+            proc(ctx)
+    gc.collect()
+
+
+def run_mode(args: argparse.Namespace) -> dict[str, Any]:
+    """
+    Runs in a fresh interpreter, preloads, forks workers and collects
+    their memory counters.
+    """
+    if args.run == "freeze":
+        gc.disable()
+    manager = preload(args)
+    contexts = gen.make_contexts(args.contexts, seed=args.seed)
+    gc.collect()
+    if args.run == "freeze":
+        manager.freeze()
+    master = smaps_rollup()
+
+    workers = []
+    for _ in range(args.workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            gc.enable()
+            work(manager, contexts)
+            with os.fdopen(write_fd, "w") as f:
+                json.dump(smaps_rollup(), f)
+            os._exit(0)
+        os.close(write_fd)
+        workers.append((pid, read_fd))
+
+    counters = []
+    for pid, read_fd in workers:
+        with os.fdopen(read_fd) as f:
+            counters.append(json.load(f))
+        os.waitpid(pid, 0)
+
+    def mean(key: str) -> float:
+        return sum(c.get(key, 0) for c in counters) / len(counters)
+
+    return {
+        "name": f"fork.{args.run}",
+        "master_rss_bytes": master.get("Rss", 0),
+        "worker_private_dirty_bytes": mean("Private_Dirty"),
+        "worker_pss_bytes": mean("Pss"),
+    }
+
+
+def measure(mode: str, argv: list[str]) -> dict[str, Any]:
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "benchmarks.fork", "--run", mode, *argv],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def format_bytes(value: float) -> str:
+    for unit, scale in (("GiB", 2**30), ("MiB", 2**20), ("KiB", 2**10)):
+        if abs(value) >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} B"
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Memory benchmark for pre-fork servers"
+    )
+    parser.add_argument("--flags", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--contexts", type=int, default=100, help="contexts per worker"
+    )
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_mode(args)))
+        return 0
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("/proc/self/smaps_rollup is not available", file=sys.stderr)
+        return 1
+
+    params = ["--flags", str(args.flags), "--workers", str(args.workers)]
+    params += ["--contexts", str(args.contexts), "--seed", str(args.seed)]
+    results = []
+    for mode in args.mode or MODES:
+        print(f"running {mode} ...", file=sys.stderr)
+        results.append(measure(mode, params))
+
+    width = max(len(r["name"]) for r in results)
+    print(
+        f"{'benchmark':<{width}}  {'master rss':>12}  "
+        f"{'worker dirty':>12}  {'worker pss':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['name']:<{width}}  "
+            f"{format_bytes(r['master_rss_bytes']):>12}  "
+            f"{format_bytes(r['worker_private_dirty_bytes']):>12}  "
+            f"{format_bytes(r['worker_pss_bytes']):>12}"
+        )
+
+    if args.output:
+        meta = {
+            key: getattr(args, key)
+            for key in ("flags", "workers", "contexts", "seed")
+        }
+        write_results(results, args.output, suite="fork", meta=meta)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Synthetic flag sets and contexts for benchmarks.
+
+Everything here is deterministic for a given ``seed`` so results are
+comparable between runs and between versions of the client.
+"""
+
+import random
+import string
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    PreloadFlagsResponse,
+    Value,
+    ValueCondition,
+    Variable,
+    VariableType,
+)
+
+USER_ID = Variable("user.id", VariableType.NUMBER)
+USER_EMAIL = Variable("user.email", VariableType.STRING)
+USER_AGE = Variable("user.age", VariableType.NUMBER)
+USER_ROLES = Variable("user.roles", VariableType.SET)
+REQUEST_PATH = Variable("request.path", VariableType.STRING)
+
+VARIABLES = [USER_ID, USER_EMAIL, USER_AGE, USER_ROLES, REQUEST_PATH]
+
+ROLES = [f"role-{i}" for i in range(32)]
+
+# Variable each operator is checked against.
+OPERATOR_VARIABLES: dict[Operator, Variable] = {
+    Operator.EQUAL: USER_ID,
+    Operator.LESS_THAN: USER_AGE,
+    Operator.LESS_OR_EQUAL: USER_AGE,
+    Operator.GREATER_THAN: USER_AGE,
+    Operator.GREATER_OR_EQUAL: USER_AGE,
+    Operator.CONTAINS: USER_EMAIL,
+    Operator.PERCENT: USER_ID,
+    Operator.REGEXP: REQUEST_PATH,
+    Operator.WILDCARD: REQUEST_PATH,
+    Operator.SUBSET: USER_ROLES,
+    Operator.SUPERSET: USER_ROLES,
+}
+
+# Operator mixes, weights are relative.
+MIXES: dict[str, dict[Operator, int]] = {
+    "uniform": dict.fromkeys(Operator, 1),
+    "equal": {Operator.EQUAL: 1},
+    "typical": {
+        Operator.EQUAL: 10,
+        Operator.PERCENT: 5,
+        Operator.CONTAINS: 2,
+        Operator.GREATER_THAN: 1,
+        Operator.LESS_THAN: 1,
+        Operator.WILDCARD: 1,
+        Operator.SUBSET: 1,
+    },
+}
+
+
+@dataclass
+class FlagSetSpec:
+    """Shape of a synthetic project."""
+
+    flags: int = 100
+    values: int = 100
+    conditions: int = 3
+    checks: int = 2
+    mix: str = "typical"
+    # share of flags/values which are overridden on the server
+    overridden: float = 0.8
+    operand_size: int = 8
+    seed: int = 42
+
+    def as_params(self) -> dict[str, Any]:
+        return {
+            "flags": self.flags,
+            "values": self.values,
+            "conditions": self.conditions,
+            "checks": self.checks,
+            "mix": self.mix,
+        }
+
+
+SIZES: dict[str, FlagSetSpec] = {
+    "small": FlagSetSpec(flags=10, values=10, conditions=1, checks=1),
+    "medium": FlagSetSpec(flags=200, values=200, conditions=3, checks=2),
+    "large": FlagSetSpec(flags=2000, values=2000, conditions=10, checks=3),
+}
+
+
+@dataclass
+class FlagSet:
+    spec: FlagSetSpec
+    flags: list[Flag] = field(default_factory=list)
+    values: list[Value] = field(default_factory=list)
+
+    @property
+    def defaults(self) -> dict[str, bool]:
+        return {flag.name: False for flag in self.flags}
+
+    @property
+    def values_defaults(self) -> dict[str, Union[int, str]]:
+        return {value.name: value.value_default for value in self.values}
+
+    def to_response(self, version: int = 1) -> PreloadFlagsResponse:
+        return PreloadFlagsResponse(
+            version=version,
+            flags=self.flags,
+            values=self.values,
+        )
+
+
+def _word(rng: random.Random, size: int = 8) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=size))
+
+
+def make_operand(
+    operator: Operator,
+    rng: random.Random,
+    operand_size: int = 8,
+) -> Union[str, float, list[str]]:
+    # numbers are floats on the wire, see `Check.value`
+    if operator is Operator.EQUAL:
+        return float(rng.randrange(1_000_000))
+    if operator in {
+        Operator.LESS_THAN,
+        Operator.LESS_OR_EQUAL,
+        Operator.GREATER_THAN,
+        Operator.GREATER_OR_EQUAL,
+    }:
+        return float(rng.randrange(10, 90))
+    if operator is Operator.CONTAINS:
+        return "@" + _word(rng, 6)
+    if operator is Operator.PERCENT:
+        return float(rng.randrange(1, 100))
+    if operator is Operator.REGEXP:
+        return rf"^/{_word(rng, 4)}/\d+/?$"
+    if operator is Operator.WILDCARD:
+        return f"/{_word(rng, 4)}/*"
+    if operator in {Operator.SUBSET, Operator.SUPERSET}:
+        size = min(operand_size, len(ROLES))
+        if operator is Operator.SUPERSET:
+            size = max(1, size // 4)
+        return rng.sample(ROLES, size)
+    raise ValueError(f"Unsupported operator: {operator!r}")
+
+
+def make_check(
+    operator: Operator,
+    rng: random.Random,
+    operand_size: int = 8,
+) -> Check:
+    variable = OPERATOR_VARIABLES[operator]
+    return Check(
+        operator=operator,
+        variable=CheckVariable(name=variable.name, type=variable.type),
+        value=make_operand(operator, rng, operand_size),
+    )
+
+
+def _pick_operators(mix: str, rng: random.Random, count: int) -> list[Operator]:
+    weights = MIXES[mix]
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def _make_checks(spec: FlagSetSpec, rng: random.Random) -> list[Check]:
+    return [
+        make_check(operator, rng, spec.operand_size)
+        for operator in _pick_operators(spec.mix, rng, spec.checks)
+    ]
+
+
+def make_flag(name: str, spec: FlagSetSpec, rng: random.Random) -> Flag:
+    return Flag(
+        name=name,
+        enabled=True,
+        overridden=rng.random() < spec.overridden,
+        conditions=[
+            Condition(checks=_make_checks(spec, rng))
+            for _ in range(spec.conditions)
+        ],
+    )
+
+
+def make_value(name: str, spec: FlagSetSpec, rng: random.Random) -> Value:
+    return Value(
+        name=name,
+        enabled=True,
+        overridden=rng.random() < spec.overridden,
+        value_default=rng.randrange(100),
+        value_override=str(rng.randrange(100)),
+        conditions=[
+            ValueCondition(
+                checks=_make_checks(spec, rng),
+                value_override=str(rng.randrange(100)),
+            )
+            for _ in range(spec.conditions)
+        ],
+    )
+
+
+def make_flag_set(spec: Optional[FlagSetSpec] = None) -> FlagSet:
+    spec = spec or FlagSetSpec()
+    rng = random.Random(spec.seed)
+    return FlagSet(
+        spec=spec,
+        flags=[make_flag(f"FLAG_{i}", spec, rng) for i in range(spec.flags)],
+        values=[
+            make_value(f"VALUE_{i}", spec, rng) for i in range(spec.values)
+        ],
+    )
+
+
+def make_context(rng: random.Random) -> dict[str, Any]:
+    return {
+        USER_ID.name: rng.randrange(1_000_000),
+        USER_EMAIL.name: f"{_word(rng)}@{_word(rng, 6)}.com",
+        USER_AGE.name: rng.randrange(100),
+        USER_ROLES.name: set(rng.sample(ROLES, rng.randrange(1, 6))),
+        REQUEST_PATH.name: f"/{_word(rng, 4)}/{rng.randrange(1000)}",
+    }
+
+
+def make_contexts(count: int, seed: int = 42) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_context(rng) for _ in range(count)]
+
+
+def make_matching_context(check: Check) -> dict[str, Any]:
+    """
+    Context which satisfies given check (for PERCENT operator it is only
+    likely to).
+    """
+    ctx = make_context(random.Random(0))
+    name, operand = check.variable.name, check.value
+
+    if check.operator is Operator.EQUAL:
+        ctx[name] = operand
+    elif check.operator in {Operator.LESS_THAN, Operator.LESS_OR_EQUAL}:
+        ctx[name] = operand - 1
+    elif check.operator in {Operator.GREATER_THAN, Operator.GREATER_OR_EQUAL}:
+        ctx[name] = operand + 1
+    elif check.operator is Operator.CONTAINS:
+        ctx[name] = f"user{operand}.com"
+    elif check.operator is Operator.REGEXP:
+        ctx[name] = operand[1:-3].replace("\\d+", "123")
+    elif check.operator is Operator.WILDCARD:
+        ctx[name] = operand.replace("*", "123")
+    elif check.operator is Operator.SUBSET:
+        ctx[name] = set(operand[:2])
+    elif check.operator is Operator.SUPERSET:
+        ctx[name] = set(operand) | {ROLES[-1]}
+
+    return ctx
@@ -0,0 +1,117 @@
+"""
+Import-time benchmark for the package entry points.
+
+Each module is imported in a fresh interpreter with ``-X importtime``, the
+cumulative time of the module is taken from its report, the minimum of
+several runs is shown together with the heaviest modules it pulled in::
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --module featureflags_client.http.client
+    python -m benchmarks.importtime --runs 20 --output importtime.json
+
+Heavy optional dependencies (HTTP clients, ``dataclass_wizard``,
+``asyncio``) are reported when an entry point imports them eagerly.
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Any
+
+from benchmarks.runner import write_results
+
+MODULES = [
+    "featureflags_client.http.client",
+    "featureflags_client.http.managers.dummy",
+    "featureflags_client.http.managers.requests",
+    "featureflags_client.http.managers.httpx",
+    "featureflags_client.http.managers.aiohttp",
+    "featureflags_client.http.managers.file",
+]
+
+HEAVY = [
+    "asyncio",
+    "aiohttp",
+    "httpx",
+    "requests",
+    "dataclass_wizard",
+    "concurrent.futures",
+]
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Imports the module in a fresh interpreter, returns self and cumulative
+    times in microseconds of every imported module.
+    """
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module: str, runs: int, top: int) -> dict[str, Any]:
+    best: dict[str, tuple[int, int]] = {}
+    for _ in range(runs):
+        times = import_times(module)
+        if not best or times[module][1] < best[module][1]:
+            best = times
+
+    heaviest = sorted(best.items(), key=lambda item: -item[1][0])[:top]
+    return {
+        "name": f"import.{module}",
+        "cumulative_us": best[module][1],
+        "modules": len(best),
+        "heavy": [name for name in HEAVY if name in best],
+        "top": {name: self_us for name, (self_us, _) in heaviest},
+    }
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument(
+        "--module",
+        action="append",
+        help="module to import, can be repeated, entry points by default",
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--top", type=int, default=5, help="number of heaviest modules"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.module or MODULES:
+        print(f"running {module} ...", file=sys.stderr)
+        try:
+            results.append(measure(module, args.runs, args.top))
+        except subprocess.CalledProcessError as exc:
+            print(f"failed to import {module}: {exc.stderr}", file=sys.stderr)
+
+    width = max(len(r["name"]) for r in results)
+    print(f"{'benchmark':<{width}}  {'import':>10}  {'modules':>7}  heavy")
+    for r in results:
+        print(
+            f"{r['name']:<{width}}  {r['cumulative_us'] / 1000:>7.1f} ms  "
+            f"{r['modules']:>7}  {', '.join(r['heavy']) or '-'}"
+        )
+
+    if args.output:
+        write_results(
+            results, args.output, suite="importtime", meta={"runs": args.runs}
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
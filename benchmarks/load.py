@@ -0,0 +1,353 @@
+"""
+End-to-end load benchmark for the http managers.
+
+Starts ``benchmarks.server`` in a subprocess and runs each manager under
+concurrent request traffic (threads for `requests`, tasks for `httpx` and
+`aiohttp`) while the manager keeps syncing in background::
+
+    pdm run bench-load --manager requests --concurrency 16 --duration 10
+    pdm run bench-load --latency 0.05 --failure-rate 0.2 --output load.json
+
+Reported: request throughput and latency percentiles, sync latency
+percentiles, sync failures, peak number of concurrent syncs and, for
+asyncio managers, event loop lag.
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from benchmarks import generators as gen
+from benchmarks.runner import format_ns, write_results
+from benchmarks.server import build_parser, spec_from_args
+from featureflags_client.http.client import FeatureFlagsClient
+
+# Managers are imported lazily, their http clients are optional.
+MANAGERS = {
+    "requests": "featureflags_client.http.managers.requests.RequestsManager",
+    "httpx": "featureflags_client.http.managers.httpx.HttpxManager",
+    "aiohttp": "featureflags_client.http.managers.aiohttp.AiohttpManager",
+}
+
+# How often loop lag is sampled in asyncio runs.
+LAG_INTERVAL = 0.001
+
+
+def manager_class(name: str) -> Any:
+    module, _, attr = MANAGERS[name].rpartition(".")
+    return getattr(importlib.import_module(module), attr)
+
+
+def percentiles(samples: list[float]) -> dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "p99": at(0.99),
+        "p999": at(0.999),
+        "max": ordered[-1],
+    }
+
+
+@contextmanager
+def flags_server(args: argparse.Namespace) -> Iterator[str]:
+    cmd = [
+        sys.executable,
+        "-m",
+        "benchmarks.server",
+        "--port=0",
+        f"--flags={args.flags}",
+        f"--values={args.values}",
+        f"--conditions={args.conditions}",
+        f"--checks={args.checks}",
+        f"--mix={args.mix}",
+        f"--latency={args.latency}",
+        f"--jitter={args.jitter}",
+        f"--failure-rate={args.failure_rate}",
+    ]
+    if args.change_every:
+        cmd.append(f"--change-every={args.change_every}")
+
+    proc = subprocess.Popen(  # noqa: S603
+        cmd, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        url = proc.stdout.readline().strip()
+        if not url:
+            raise RuntimeError("Flags server failed to start")
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+class SyncRecorder:
+    """Records duration, failures and concurrency of manager syncs."""
+
+    def __init__(self) -> None:
+        self.durations: list[float] = []
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self) -> float:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return time.perf_counter()
+
+    def _exit(self, started: float, failed: bool) -> None:
+        self.durations.append(time.perf_counter() - started)
+        with self._lock:
+            self.in_flight -= 1
+            self.failures += failed
+
+    def wrap(self, manager: Any) -> None:
+        sync = manager.sync
+
+        def timed_sync() -> None:
+            started = self._enter()
+            try:
+                sync()
+            except Exception:
+                self._exit(started, failed=True)
+                raise
+            self._exit(started, failed=False)
+
+        manager.sync = timed_sync
+
+    def wrap_async(self, manager: Any) -> None:
+        sync = manager.sync
+
+        async def timed_sync() -> None:
+            started = self._enter()
+            try:
+                await sync()
+            except Exception:
+                self._exit(started, failed=True)
+                raise
+            self._exit(started, failed=False)
+
+        manager.sync = timed_sync
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "sync_latency": percentiles(self.durations),
+            "sync_failures": self.failures,
+            "max_concurrent_syncs": self.max_in_flight,
+        }
+
+
+class Traffic:
+    """Synthetic request handler which reads a few flags and values."""
+
+    def __init__(self, flag_set: gen.FlagSet, reads: int, seed: int) -> None:
+        self._rng = random.Random(seed)
+        self._contexts = gen.make_contexts(64, seed=seed)
+        self._flags = [flag.name for flag in flag_set.flags]
+        self._values = [value.name for value in flag_set.values]
+        self._reads = reads
+
+    def handle(self, client: FeatureFlagsClient) -> None:
+        ctx = self._rng.choice(self._contexts)
+        with client.flags(ctx) as flags:
+            for name in self._rng.sample(self._flags, self._reads):
+                getattr(flags, name)
+        with client.values(ctx) as values:
+            for name in self._rng.sample(self._values, self._reads):
+                getattr(values, name)
+
+
+def _manager_kwargs(url: str, flag_set: gen.FlagSet, args: Any) -> dict:
+    return {
+        "url": url,
+        "project": "bench",
+        "variables": gen.VARIABLES,
+        "defaults": flag_set.defaults,
+        "values_defaults": flag_set.values_defaults,
+        "request_timeout": 5,
+        "refresh_interval": args.refresh_interval,
+    }
+
+
+def run_requests(url: str, flag_set: gen.FlagSet, args: Any) -> dict:
+    manager_cls = manager_class("requests")
+    manager = manager_cls(**_manager_kwargs(url, flag_set, args))
+    client = FeatureFlagsClient(manager)
+    client.preload()
+
+    syncs = SyncRecorder()
+    syncs.wrap(manager)
+
+    latencies: list[float] = []
+    deadline = time.monotonic() + args.duration
+
+    def worker(seed: int) -> None:
+        traffic = Traffic(flag_set, args.reads, seed)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            traffic.handle(client)
+            latencies.append(time.perf_counter() - started)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,))
+        for i in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "throughput": len(latencies) / elapsed,
+        "request_latency": percentiles(latencies),
+        **syncs.report(),
+    }
+
+
+async def _run_async(manager_cls: Any, url: str, flag_set: Any, args: Any):
+    manager = manager_cls(**_manager_kwargs(url, flag_set, args))
+    client = FeatureFlagsClient(manager)
+    await client.preload_async()
+
+    syncs = SyncRecorder()
+    syncs.wrap_async(manager)
+    manager.start()
+
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    lags: list[float] = []
+    deadline = time.monotonic() + args.duration
+
+    async def monitor() -> None:
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            lags.append(max(0.0, loop.time() - started - LAG_INTERVAL))
+
+    async def worker(seed: int) -> None:
+        traffic = Traffic(flag_set, args.reads, seed)
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            traffic.handle(client)
+            latencies.append(time.perf_counter() - started)
+            # simulate the rest of the request handling
+            await asyncio.sleep(0)
+
+    monitor_task = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    monitor_task.cancel()
+    await manager.wait_closed()
+
+    return {
+        "throughput": len(latencies) / elapsed,
+        "request_latency": percentiles(latencies),
+        "loop_lag": percentiles(lags),
+        **syncs.report(),
+    }
+
+
+def run_async(name: str, url: str, flag_set: gen.FlagSet, args: Any) -> dict:
+    return asyncio.run(
+        _run_async(manager_class(name), url, flag_set, args),
+    )
+
+
+def format_report(name: str, report: dict[str, Any]) -> str:
+    def dist(key: str) -> str:
+        values = report.get(key)
+        if not values or not values["count"]:
+            return f"  {key}: -"
+        return f"  {key}: " + ", ".join(
+            f"{q}={format_ns(values[q] * 1e9)}"
+            for q in ("p50", "p90", "p99", "p999", "max")
+        )
+
+    lines = [
+        f"{name}: {report['throughput']:.0f} req/s, "
+        f"sync failures: {report['sync_failures']}, "
+        f"max concurrent syncs: {report['max_concurrent_syncs']}",
+        dist("request_latency"),
+        dist("sync_latency"),
+    ]
+    if "loop_lag" in report:
+        lines.append(dist("loop_lag"))
+    return "\n".join(lines)
+
+
+def main(argv: Any = None) -> int:
+    parser = build_parser()
+    parser.description = "Load benchmark for http managers"
+    parser.add_argument(
+        "--manager",
+        action="append",
+        choices=list(MANAGERS),
+        help="manager to run, may be repeated (default: all)",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--reads", type=int, default=5, help="flags and values per request"
+    )
+    parser.add_argument("--refresh-interval", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.set_defaults(change_every=1.0)
+    args = parser.parse_args(argv)
+
+    logging.getLogger("featureflags_client").setLevel(logging.CRITICAL)
+    flag_set = gen.make_flag_set(spec_from_args(args))
+
+    results = []
+    with flags_server(args) as url:
+        for name in args.manager or MANAGERS:
+            print(f"running {name} ...", file=sys.stderr)
+            if name == "requests":
+                report = run_requests(url, flag_set, args)
+            else:
+                report = run_async(name, url, flag_set, args)
+            print(format_report(name, report))
+            results.append({"name": f"load.{name}", **report})
+
+    if args.output:
+        params = {
+            key: getattr(args, key)
+            for key in (
+                "concurrency",
+                "duration",
+                "reads",
+                "refresh_interval",
+                "flags",
+                "values",
+                "latency",
+                "failure_rate",
+                "change_every",
+            )
+        }
+        write_results(results, args.output, suite="load", meta=params)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
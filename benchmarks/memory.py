@@ -0,0 +1,249 @@
+"""
+Memory benchmark for large SUBSET/SUPERSET operands.
+
+Builds a project where flags check a context variable against long id
+lists, several flags sharing the same list, and reports with ``tracemalloc``
+how much memory compiled procs retain and how much an evaluation of all of
+them allocates at peak::
+
+    python -m benchmarks.memory --operand-size 100000 --flags 20 --lists 4
+    python -m benchmarks.memory --kind str --output memory.json
+
+``legacy`` mode reproduces the representation used before compact operands
+(a list per check and a set built on every call), ``compact`` uses the
+current compiler.
+
+``state`` mode compiles a whole synthetic project with the state, as
+managers do, and reports memory retained after the parsed response is
+dropped, together with ``StateSnapshot.retained_size()``::
+
+    python -m benchmarks.memory --mode state --state-flags 8000
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from benchmarks import generators as gen
+from benchmarks.runner import write_results
+from featureflags_client.http.conditions import check_proc
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.state import HttpState
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Operator,
+    PreloadFlagsResponse,
+    VariableType,
+)
+
+VARIABLE = CheckVariable("user.ids", VariableType.SET)
+
+
+def except_false(func: Callable) -> Callable:
+    # wrapper of the legacy procs
+    def wrapper(ctx: dict[str, Any]) -> Any:
+        try:
+            return func(ctx)
+        except (TypeError, ValueError):
+            return False
+
+    return wrapper
+
+
+def legacy_subset(name: str, value: Any) -> Callable:
+    @except_false
+    def proc(ctx: dict[str, Any], _value: Optional[set] = None) -> bool:
+        _value = _value or set(value)
+        ctx_val = ctx.get(name)
+        return bool(ctx_val) and _value.issuperset(ctx_val)
+
+    return proc
+
+
+def legacy_superset(name: str, value: Any) -> Callable:
+    @except_false
+    def proc(ctx: dict[str, Any], _value: Optional[set] = None) -> bool:
+        _value = _value or set(value)
+        ctx_val = ctx.get(name)
+        return bool(ctx_val) and _value.issubset(ctx_val)
+
+    return proc
+
+
+LEGACY = {Operator.SUBSET: legacy_subset, Operator.SUPERSET: legacy_superset}
+
+
+def make_raw(args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    lists = []
+    for _ in range(args.lists):
+        ids = rng.sample(range(10**9), args.operand_size)
+        if args.kind == "str":
+            lists.append([f"user-{i:x}" for i in ids])
+        else:
+            lists.append([str(i) for i in ids])
+
+    flags = []
+    for i in range(args.flags):
+        operator = Operator.SUBSET if i % 2 else Operator.SUPERSET
+        flags.append(
+            {
+                "name": f"FLAG_{i}",
+                "enabled": True,
+                "overridden": True,
+                "conditions": [
+                    {
+                        "checks": [
+                            {
+                                "operator": operator.value,
+                                "variable": {
+                                    "name": VARIABLE.name,
+                                    "type": VARIABLE.type.value,
+                                },
+                                "value": list(lists[i % args.lists]),
+                            },
+                        ],
+                    },
+                ],
+            }
+        )
+    return {"version": 1, "flags": flags, "values": []}
+
+
+def compile_checks(checks: list[Check], mode: str) -> list[Callable]:
+    if mode == "legacy":
+        return [
+            LEGACY[check.operator](check.variable.name, check.value)
+            for check in checks
+        ]
+    pool = OperandPool()
+    return [check_proc(check, pool) for check in checks]
+
+
+def measure(args: argparse.Namespace, mode: str) -> dict[str, Any]:
+    content = json.dumps(make_raw(args)).encode()
+    ctx = {VARIABLE.name: {str(i) for i in range(8)}}
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        response = PreloadFlagsResponse.from_dict(json.loads(content))
+        checks = [flag.conditions[0].checks[0] for flag in response.flags]
+        procs = compile_checks(checks, mode)
+        _, compile_peak = tracemalloc.get_traced_memory()
+
+        # parsed response is dropped after compile, as managers do
+        del response, checks
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+
+        tracemalloc.reset_peak()
+        for proc in procs:
+            proc(ctx)
+        current, eval_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": f"memory.{args.kind}.{mode}",
+        "retained_bytes": retained - baseline,
+        "compile_peak_bytes": compile_peak - baseline,
+        "evaluation_peak_bytes": eval_peak - current,
+    }
+
+
+def measure_state(args: argparse.Namespace) -> dict[str, Any]:
+    spec = gen.FlagSetSpec(
+        flags=args.state_flags, values=args.state_flags // 4, seed=args.seed
+    )
+    content = json.dumps(gen.make_flag_set(spec).to_response().to_dict())
+    state = HttpState(project="bench", variables=[], flags=[], values=[])
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        response = PreloadFlagsResponse.from_dict(json.loads(content))
+        state.update(response.flags, response.values, response.version)
+        del response
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": f"memory.state.{args.state_flags}",
+        "retained_bytes": retained - baseline,
+        "retained_size_bytes": state.snapshot.retained_size(),
+    }
+
+
+def format_bytes(value: float) -> str:
+    for unit, scale in (("GiB", 2**30), ("MiB", 2**20), ("KiB", 2**10)):
+        if abs(value) >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} B"
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Memory benchmark for large set operands"
+    )
+    parser.add_argument("--operand-size", type=int, default=100_000)
+    parser.add_argument("--flags", type=int, default=10)
+    parser.add_argument(
+        "--lists", type=int, default=2, help="distinct lists among flags"
+    )
+    parser.add_argument("--kind", choices=["int", "str"], default="int")
+    parser.add_argument(
+        "--mode", action="append", choices=["legacy", "compact", "state"]
+    )
+    parser.add_argument(
+        "--state-flags", type=int, default=8000, help="flags in state mode"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for mode in args.mode or ["legacy", "compact"]:
+        print(f"running {mode} ...", file=sys.stderr)
+        if mode == "state":
+            results.append(measure_state(args))
+        else:
+            results.append(measure(args, mode))
+
+    width = max(len(r["name"]) for r in results)
+    print(f"{'benchmark':<{width}}  {'retained':>12}  {'eval peak':>12}")
+    for r in results:
+        eval_peak = r.get("evaluation_peak_bytes")
+        print(
+            f"{r['name']:<{width}}  {format_bytes(r['retained_bytes']):>12}  "
+            f"{format_bytes(eval_peak) if eval_peak is not None else '-':>12}"
+        )
+
+    if args.output:
+        params = {
+            key: getattr(args, key)
+            for key in (
+                "operand_size",
+                "flags",
+                "lists",
+                "kind",
+                "seed",
+                "state_flags",
+            )
+        }
+        write_results(results, args.output, suite="memory", meta=params)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
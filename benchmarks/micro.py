@@ -0,0 +1,346 @@
+"""
+Micro-benchmarks for the evaluation, compile and parse paths.
+
+Usage::
+
+    pdm run bench
+    pdm run bench --quick --filter check. --output results.json
+
+Results are printed as a table and optionally written as JSON, see
+``benchmarks.compare`` to diff two result files.
+"""
+
+import argparse
+import itertools
+import random
+import sys
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from benchmarks import generators as gen
+from benchmarks.runner import Benchmark, format_table, run, write_results
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.conditions import (
+    check_proc,
+    update_flags_state,
+    update_values_state,
+)
+from featureflags_client.http.context import make_context_type
+from featureflags_client.http.exposures import ExposureLog
+from featureflags_client.http.managers.dummy import DummyManager
+from featureflags_client.http.metrics import (
+    EvaluationMetrics,
+    PrometheusMetrics,
+)
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions, with_masks
+from featureflags_client.http.types import Operator, PreloadFlagsResponse
+
+CONTEXTS = 64
+
+
+def bench_checks() -> Iterator[Benchmark]:
+    rng = random.Random(1)
+    for operator in Operator:
+        check = gen.make_check(operator, rng)
+        proc = check_proc(check)
+        hit = gen.make_matching_context(check)
+        miss = dict(hit)
+        del miss[check.variable.name]
+
+        for case, ctx in (("hit", hit), ("miss", miss)):
+            yield Benchmark(
+                name=f"check.{operator.name.lower()}.{case}",
+                func=lambda proc=proc, ctx=ctx: proc(ctx),
+                params={"operator": operator.name, "case": case},
+            )
+
+    # SET variable with a declared universe, context masks are prepared
+    options = CompileOptions(set_universes={gen.USER_ROLES.name: gen.ROLES})
+    for operator in (Operator.SUBSET, Operator.SUPERSET):
+        check = gen.make_check(operator, rng)
+        proc = check_proc(check, OperandPool(), options)
+        ctx = with_masks(gen.make_matching_context(check), options.universes)
+        yield Benchmark(
+            name=f"check.{operator.name.lower()}.mask",
+            func=lambda proc=proc, ctx=ctx: proc(ctx),
+            params={"operator": operator.name, "case": "mask"},
+        )
+
+    # typed context, values are coerced once, procs read attributes
+    context_type = make_context_type(gen.VARIABLES)
+    options = CompileOptions().for_context(context_type)
+    for operator in Operator:
+        check = gen.make_check(operator, rng)
+        proc = check_proc(check, OperandPool(), options)
+        ctx = context_type(gen.make_matching_context(check))
+        yield Benchmark(
+            name=f"check.{operator.name.lower()}.typed",
+            func=lambda proc=proc, ctx=ctx: proc(ctx),
+            params={"operator": operator.name, "case": "typed"},
+        )
+
+
+def _eval_all(procs: list[Callable], contexts: list[dict]) -> Callable:
+    next_ctx = itertools.cycle(contexts).__next__
+
+    def func() -> None:
+        ctx = next_ctx()
+        for proc in procs:
+            proc(ctx)
+
+    return func
+
+
+def bench_procs() -> Iterator[Benchmark]:
+    contexts = gen.make_contexts(CONTEXTS)
+    for size, spec in gen.SIZES.items():
+        flag_set = gen.make_flag_set(spec)
+
+        flag_procs = list(update_flags_state(flag_set.flags).values())
+        yield Benchmark(
+            name=f"flag_proc.{size}",
+            func=_eval_all(flag_procs, contexts),
+            params=spec.as_params(),
+            ops_per_call=max(len(flag_procs), 1),
+        )
+
+        value_procs = list(update_values_state(flag_set.values).values())
+        yield Benchmark(
+            name=f"value_proc.{size}",
+            func=_eval_all(value_procs, contexts),
+            params=spec.as_params(),
+            ops_per_call=max(len(value_procs), 1),
+        )
+
+
+def bench_mixes() -> Iterator[Benchmark]:
+    contexts = gen.make_contexts(CONTEXTS)
+    base = gen.SIZES["medium"]
+    for mix in gen.MIXES:
+        for conditions in (1, 10, 100):
+            spec = gen.FlagSetSpec(
+                flags=50,
+                values=50,
+                conditions=conditions,
+                checks=1,
+                mix=mix,
+                overridden=1.0,
+                seed=base.seed,
+            )
+            flag_set = gen.make_flag_set(spec)
+            procs = list(update_flags_state(flag_set.flags).values())
+            yield Benchmark(
+                name=f"flag_proc.mix.{mix}.conditions_{conditions}",
+                func=_eval_all(procs, contexts),
+                params=spec.as_params(),
+                ops_per_call=len(procs),
+            )
+
+            procs = list(update_values_state(flag_set.values).values())
+            yield Benchmark(
+                name=f"value_proc.mix.{mix}.conditions_{conditions}",
+                func=_eval_all(procs, contexts),
+                params=spec.as_params(),
+                ops_per_call=len(procs),
+            )
+
+
+def bench_compile() -> Iterator[Benchmark]:
+    for size, spec in gen.SIZES.items():
+        flag_set = gen.make_flag_set(spec)
+        yield Benchmark(
+            name=f"compile.flags.{size}",
+            func=lambda flags=flag_set.flags: update_flags_state(flags),
+            params=spec.as_params(),
+        )
+        yield Benchmark(
+            name=f"compile.values.{size}",
+            func=lambda values=flag_set.values: update_values_state(values),
+            params=spec.as_params(),
+        )
+
+
+def bench_parse() -> Iterator[Benchmark]:
+    for size, spec in gen.SIZES.items():
+        raw = gen.make_flag_set(spec).to_response().to_dict()
+        yield Benchmark(
+            name=f"parse.from_dict.{size}",
+            func=lambda raw=raw: PreloadFlagsResponse.from_dict(raw),
+            params=spec.as_params(),
+        )
+
+
+def bench_payload() -> Iterator[Benchmark]:
+    for size, spec in gen.SIZES.items():
+        flag_set = gen.make_flag_set(spec)
+        manager = DummyManager(
+            url="",
+            project="bench",
+            variables=gen.VARIABLES,
+            defaults=flag_set.defaults,
+            values_defaults=flag_set.values_defaults,
+        )
+        yield Benchmark(
+            name=f"payload.sync.{size}",
+            func=manager._sync_payload,
+            params=spec.as_params(),
+        )
+        yield Benchmark(
+            name=f"payload.preload.{size}",
+            func=manager._preload_payload,
+            params=spec.as_params(),
+        )
+
+
+def _dummy_client(
+    flag_set: gen.FlagSet,
+    metrics: Optional[EvaluationMetrics] = None,
+    exposures: Optional[ExposureLog] = None,
+) -> FeatureFlagsClient:
+    manager = DummyManager(
+        url="",
+        project="bench",
+        variables=gen.VARIABLES,
+        defaults=flag_set.defaults,
+        values_defaults=flag_set.values_defaults,
+    )
+    manager._state.update(flag_set.flags, flag_set.values, 1)
+    # Disable auto sync.
+    manager._next_sync = datetime.utcnow() + timedelta(days=1)
+    return FeatureFlagsClient(manager, metrics=metrics, exposures=exposures)
+
+
+def bench_getattr() -> Iterator[Benchmark]:
+    spec = gen.SIZES["medium"]
+    flag_set = gen.make_flag_set(spec)
+    client = _dummy_client(flag_set)
+    ctx = gen.make_contexts(1)[0]
+    name = flag_set.flags[0].name
+    value_name = flag_set.values[0].name
+
+    def flags_first_access() -> None:
+        with client.flags(ctx) as flags:
+            getattr(flags, name)
+
+    def values_first_access() -> None:
+        with client.values(ctx) as values:
+            getattr(values, value_name)
+
+    with client.flags(ctx) as cached:
+        getattr(cached, name)
+
+    yield Benchmark(
+        name="flags.getattr.first",
+        func=flags_first_access,
+        params=spec.as_params(),
+    )
+    yield Benchmark(
+        name="flags.getattr.cached",
+        func=lambda: getattr(cached, name),
+        params=spec.as_params(),
+    )
+    yield Benchmark(
+        name="values.getattr.first",
+        func=values_first_access,
+        params=spec.as_params(),
+    )
+
+    # value which is not overridden on the server, served without a call
+    snapshot = client._manager.get_snapshot()
+    constant_name = next(iter(snapshot.constant_values()))
+
+    def values_first_access_constant() -> None:
+        with client.values(ctx) as values:
+            getattr(values, constant_name)
+
+    yield Benchmark(
+        name="values.getattr.first.constant",
+        func=values_first_access_constant,
+        params=spec.as_params(),
+    )
+
+    metrics_client = _dummy_client(
+        flag_set, EvaluationMetrics(PrometheusMetrics())
+    )
+
+    def flags_first_access_metrics() -> None:
+        with metrics_client.flags(ctx) as flags:
+            getattr(flags, name)
+
+    yield Benchmark(
+        name="flags.getattr.first.metrics",
+        func=flags_first_access_metrics,
+        params=spec.as_params(),
+    )
+
+    # deduplicated reads of the same user, the buffer is never flushed
+    exposures_client = _dummy_client(
+        flag_set, exposures=ExposureLog(gen.USER_ID.name)
+    )
+
+    def flags_first_access_exposures() -> None:
+        with exposures_client.flags(ctx) as flags:
+            getattr(flags, name)
+
+    yield Benchmark(
+        name="flags.getattr.first.exposures",
+        func=flags_first_access_exposures,
+        params=spec.as_params(),
+    )
+
+
+SUITES: dict[str, Callable[[], Iterator[Benchmark]]] = {
+    "checks": bench_checks,
+    "procs": bench_procs,
+    "mixes": bench_mixes,
+    "compile": bench_compile,
+    "parse": bench_parse,
+    "payload": bench_payload,
+    "getattr": bench_getattr,
+}
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--suite",
+        action="append",
+        choices=sorted(SUITES),
+        help="suite to run, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--filter",
+        default="",
+        help="run only benchmarks which name contains this string",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="fewer repeats, for smoke testing",
+    )
+    parser.add_argument(
+        "--output",
+        help="write results as JSON to this file (`-` for stdout)",
+    )
+    args = parser.parse_args(argv)
+
+    suites = args.suite or list(SUITES)
+    benchmarks = [
+        bench
+        for suite in suites
+        for bench in SUITES[suite]()
+        if args.filter in bench.name
+    ]
+    results = run(benchmarks, repeat=3 if args.quick else 7, quick=args.quick)
+
+    if args.output != "-":
+        print(format_table(results))
+    if args.output:
+        write_results(results, args.output, suite="micro")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Tiny timing harness shared by the benchmark scripts.
+
+It relies on ``timeit`` only, so benchmarks can run on any interpreter the
+client supports without extra dependencies.
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import featureflags_client
+
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], Any]
+    params: dict[str, Any] = field(default_factory=dict)
+    # how many operations a single `func` call performs
+    ops_per_call: int = 1
+
+
+@dataclass
+class Result:
+    name: str
+    params: dict[str, Any]
+    loops: int
+    repeat: int
+    ns_per_op_min: float
+    ns_per_op_median: float
+    ns_per_op_stdev: float
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+def measure(bench: Benchmark, repeat: int = 7, quick: bool = False) -> Result:
+    timer = timeit.Timer(bench.func)
+    if quick:
+        loops = 1
+        while timer.timeit(loops) < 0.01:
+            loops *= 10
+    else:
+        loops, _ = timer.autorange()
+
+    times = timer.repeat(repeat=repeat, number=loops)
+    per_op = [t * 1e9 / (loops * bench.ops_per_call) for t in times]
+    return Result(
+        name=bench.name,
+        params=bench.params,
+        loops=loops,
+        repeat=repeat,
+        ns_per_op_min=min(per_op),
+        ns_per_op_median=statistics.median(per_op),
+        ns_per_op_stdev=statistics.stdev(per_op) if repeat > 1 else 0.0,
+    )
+
+
+def run(
+    benchmarks: list[Benchmark],
+    repeat: int = 7,
+    quick: bool = False,
+) -> list[Result]:
+    results = []
+    for bench in benchmarks:
+        print(f"running {bench.name} ...", file=sys.stderr)
+        results.append(measure(bench, repeat=repeat, quick=quick))
+    return results
+
+
+def metadata(suite: str) -> dict[str, Any]:
+    return {
+        "schema": SCHEMA_VERSION,
+        "suite": suite,
+        "client_version": featureflags_client.__version__,
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_results(
+    results: list[Any],
+    output: str,
+    suite: str,
+    meta: Optional[dict[str, Any]] = None,
+) -> None:
+    data = {
+        "meta": {**metadata(suite), **(meta or {})},
+        "results": [
+            asdict(result) if not isinstance(result, dict) else result
+            for result in results
+        ],
+    }
+    encoded = json.dumps(data, indent=2, sort_keys=True, default=str)
+    if output == "-":
+        print(encoded)
+    else:
+        with open(output, "w") as f:
+            f.write(encoded + "\n")
+
+
+def format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.1f} ns"
+
+
+def format_table(results: list[Result]) -> str:
+    width = max((len(r.name) for r in results), default=10)
+    lines = [f"{'benchmark':<{width}}  {'min':>12}  {'median':>12}"]
+    lines.extend(
+        f"{r.name:<{width}}  {format_ns(r.ns_per_op_min):>12}  "
+        f"{format_ns(r.ns_per_op_median):>12}"
+        for r in results
+    )
+    return "\n".join(lines)
@@ -0,0 +1,178 @@
+"""
+Stand-in flags server for load benchmarks.
+
+Implements ``/flags/load`` and ``/flags/sync`` with a synthetic project of
+configurable size, response latency and failure injection::
+
+    python -m benchmarks.server --port 8080 --flags 1000 --latency 0.05
+
+When started with ``--port 0`` it picks a free port and prints the
+listening url as the first line of stdout.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from benchmarks import generators as gen
+from featureflags_client.http.constants import Endpoints
+
+
+class FakeFlagsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(  # noqa: PLR0913
+        self,
+        address: tuple[str, int],
+        spec: gen.FlagSetSpec,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        change_every: Optional[float] = None,
+    ) -> None:
+        super().__init__(address, FakeFlagsHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.change_every = change_every
+
+        self._flag_set = gen.make_flag_set(spec)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._payloads: dict[int, bytes] = {}
+        self.stats = {"load": 0, "sync": 0, "failed": 0, "bytes": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def version(self) -> int:
+        if not self.change_every:
+            return 1
+        elapsed = time.monotonic() - self._started
+        return 1 + int(elapsed // self.change_every)
+
+    def payload(self) -> bytes:
+        version = self.version
+        with self._lock:
+            payload = self._payloads.get(version)
+            if payload is None:
+                response = self._flag_set.to_response(version=version)
+                payload = json.dumps(response.to_dict()).encode()
+                self._payloads = {version: payload}
+        return payload
+
+    def should_fail(self) -> bool:
+        return random.random() < self.failure_rate
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-1, 1) * self.jitter)
+
+
+class FakeFlagsHandler(BaseHTTPRequestHandler):
+    server: FakeFlagsServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+
+        if self.path == Endpoints.PRELOAD.value:
+            self.server.stats["load"] += 1
+        elif self.path == Endpoints.SYNC.value:
+            self.server.stats["sync"] += 1
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, b"{}")
+            return
+
+        time.sleep(self.server.delay())
+
+        if self.server.should_fail():
+            self.server.stats["failed"] += 1
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, b"{}")
+            return
+
+        payload = self.server.payload()
+        self.server.stats["bytes"] += len(payload)
+        self._reply(HTTPStatus.OK, payload)
+
+    def _reply(self, status: HTTPStatus, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Stand-in flags server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--flags", type=int, default=200)
+    parser.add_argument("--values", type=int, default=200)
+    parser.add_argument("--conditions", type=int, default=3)
+    parser.add_argument("--checks", type=int, default=2)
+    parser.add_argument("--mix", default="typical", choices=sorted(gen.MIXES))
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per response"
+    )
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="share of requests answered with HTTP 500",
+    )
+    parser.add_argument(
+        "--change-every",
+        type=float,
+        default=None,
+        help="bump project version every N seconds",
+    )
+    return parser
+
+
+def spec_from_args(args: argparse.Namespace) -> gen.FlagSetSpec:
+    return gen.FlagSetSpec(
+        flags=args.flags,
+        values=args.values,
+        conditions=args.conditions,
+        checks=args.checks,
+        mix=args.mix,
+    )
+
+
+def main(argv: Any = None) -> int:
+    args = build_parser().parse_args(argv)
+    server = FakeFlagsServer(
+        (args.host, args.port),
+        spec=spec_from_args(args),
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        change_every=args.change_every,
+    )
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Thread scaling benchmark for the evaluation path.
+
+Every thread reads all flags of a synthetic project with the client for
+the same set of contexts, while an optional writer thread keeps swapping
+the compiled state, and the total throughput is reported for each number
+of threads::
+
+    python -m benchmarks.threads
+    python -m benchmarks.threads --threads 1 --threads 4 --writer
+
+On a free-threaded build (3.13t+) every thread count is measured twice, in
+fresh interpreters with ``-X gil=1`` and ``-X gil=0``; on regular builds
+only the GIL mode is available, so throughput is not expected to scale.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import sysconfig
+import threading
+import time
+from typing import Any
+
+from benchmarks import generators as gen
+from benchmarks.runner import write_results
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.managers.dummy import DummyManager
+
+THREADS = [1, 2, 4, 8]
+
+
+def gil_enabled() -> bool:
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def make_manager(args: argparse.Namespace) -> DummyManager:
+    flag_set = gen.make_flag_set(
+        gen.FlagSetSpec(flags=args.flags, values=0, seed=args.seed)
+    )
+    manager = DummyManager(
+        url="",
+        project="bench",
+        variables=gen.VARIABLES,
+        defaults={flag.name: False for flag in flag_set.flags},
+    )
+    response = flag_set.to_response()
+    manager._state.update(response.flags, response.values, response.version)
+    return manager
+
+
+def swap_state(
+    manager: DummyManager,
+    args: argparse.Namespace,
+    stop: threading.Event,
+    swaps: list[int],
+) -> None:
+    """
+    Recompiles the same project under a new version until stopped, as a
+    sync does.
+    """
+    response = gen.make_flag_set(
+        gen.FlagSetSpec(flags=args.flags, values=0, seed=args.seed)
+    ).to_response()
+    while not stop.wait(args.writer_interval):
+        swaps.append(1)
+        manager._state.update(response.flags, [], response.version + len(swaps))
+
+
+def measure(args: argparse.Namespace, threads: int) -> dict[str, Any]:
+    manager = make_manager(args)
+    client = FeatureFlagsClient(manager)
+    names = list(manager.defaults)
+    contexts = gen.make_contexts(args.contexts, seed=args.seed)
+    barrier = threading.Barrier(threads + 1)
+
+    def read() -> None:
+        barrier.wait()
+        for _ in range(args.rounds):
+            for ctx in contexts:
+                with client.flags(ctx) as flags:
+                    for name in names:
+                        getattr(flags, name)
+
+    stop = threading.Event()
+    swaps: list[int] = []
+    workers = [threading.Thread(target=read) for _ in range(threads)]
+    if args.writer:
+        workers.append(
+            threading.Thread(
+                target=swap_state, args=(manager, args, stop, swaps)
+            )
+        )
+    for thread in workers:
+        thread.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers[:threads]:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in workers[threads:]:
+        thread.join()
+
+    reads = threads * args.rounds * len(contexts) * len(names)
+    return {
+        "name": f"threads.{threads}.{'gil' if gil_enabled() else 'nogil'}",
+        "threads": threads,
+        "gil_enabled": gil_enabled(),
+        "reads_per_second": reads / elapsed,
+        "swaps": len(swaps),
+    }
+
+
+def run_in_subprocess(gil: int, argv: list[str]) -> list[dict[str, Any]]:
+    proc = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-X",
+            f"gil={gil}",
+            "-m",
+            "benchmarks.threads",
+            *argv,
+            "--run",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(description="Thread scaling benchmark")
+    parser.add_argument(
+        "--threads", type=int, action="append", help="can be repeated"
+    )
+    parser.add_argument("--flags", type=int, default=100)
+    parser.add_argument(
+        "--contexts", type=int, default=200, help="contexts per round"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="rounds per thread"
+    )
+    parser.add_argument(
+        "--writer", action="store_true", help="swap state concurrently"
+    )
+    parser.add_argument("--writer-interval", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    thread_counts = args.threads or THREADS
+
+    if args.run or not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        results = []
+        for threads in thread_counts:
+            print(f"running {threads} threads ...", file=sys.stderr)
+            results.append(measure(args, threads))
+        if args.run:
+            print(json.dumps(results))
+            return 0
+    else:
+        argv = sys.argv[1:] if argv is None else list(argv)
+        results = []
+        for gil in (1, 0):
+            print(f"running with -X gil={gil} ...", file=sys.stderr)
+            results.extend(run_in_subprocess(gil, argv))
+
+    base = {r["gil_enabled"]: r["reads_per_second"] for r in results[::-1]}
+    width = max(len(r["name"]) for r in results)
+    print(f"{'benchmark':<{width}}  {'reads/s':>12}  {'speedup':>7}")
+    for r in results:
+        speedup = r["reads_per_second"] / base[r["gil_enabled"]]
+        print(
+            f"{r['name']:<{width}}  {r['reads_per_second']:>12,.0f}  "
+            f"{speedup:>6.2f}x"
+        )
+
+    if args.output:
+        meta = {
+            key: getattr(args, key)
+            for key in ("flags", "contexts", "rounds", "writer", "seed")
+        }
+        write_results(results, args.output, suite="threads", meta=meta)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
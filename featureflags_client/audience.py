@@ -0,0 +1,415 @@
+"""
+Audience sizing of flags and values over a stream of contexts.
+
+Contexts are read as JSON lines or CSV rows, evaluated with the procs the
+client compiles from a preload response, so the results are the same as
+in the app, including PERCENT hashing, and counted: number of matching
+contexts for each flag and distribution of results for each value. With
+`--upstream` the flags and values are requested with a sync request, which
+doesn't change anything on the server::
+
+    python -m featureflags_client.audience --snapshot flags.json \\
+        --flag NEW_CHECKOUT --value CHECKOUT_VARIANT contexts.jsonl
+    zcat contexts.csv.gz | python -m featureflags_client.audience \\
+        --upstream http://flags.example --project shop --format csv \\
+        --flag NEW_CHECKOUT --workers 8
+
+Contexts are sent to a pool of processes in chunks, with a bounded number
+of chunks in flight, so memory use doesn't depend on the size of the
+input.
+
+CSV columns are variable names, cells are coerced to the types of the
+variables used by the checks, empty cells are missing variables; a row
+has to fit into a single line.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Any, Optional, Union
+from urllib.parse import urljoin
+
+from featureflags_client.http.conditions import Constant
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.context import COERCE_MAP, parse_number
+from featureflags_client.http.state import HttpState
+from featureflags_client.http.types import (
+    PreloadFlagsResponse,
+    VariableType,
+)
+
+log = logging.getLogger(__name__)
+
+JSONL = "jsonl"
+CSV = "csv"
+
+
+class Tally:
+    """
+    Counts for a part of the contexts, merged into the total.
+    """
+
+    __slots__ = ("flags", "invalid", "rows", "values")
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.invalid = 0
+        self.flags: Counter[str] = Counter()
+        self.values: dict[str, Counter[Union[int, str]]] = {}
+
+    def merge(self, other: "Tally") -> None:
+        self.rows += other.rows
+        self.invalid += other.invalid
+        self.flags.update(other.flags)
+        for name, counts in other.values.items():
+            self.values.setdefault(name, Counter()).update(counts)
+
+
+class Evaluator:
+    """
+    Procs of the selected flags and values, compiled from a preload
+    response. All flags and values of the response are selected when names
+    are not given.
+    """
+
+    def __init__(
+        self,
+        response: dict[str, Any],
+        flags: Optional[list[str]] = None,
+        values: Optional[list[str]] = None,
+        fmt: str = JSONL,
+        header: Optional[list[str]] = None,
+    ) -> None:
+        parsed = PreloadFlagsResponse.from_dict(response)
+        state = HttpState(project="", variables=[], flags=[], values=[])
+        snapshot = state.compile(parsed.flags, parsed.values, parsed.version)
+
+        self.flag_names = (
+            flags if flags is not None else [f.name for f in parsed.flags]
+        )
+        self.value_names = (
+            values if values is not None else [v.name for v in parsed.values]
+        )
+        # flags and values which are not overridden on the server, or not
+        # known to it, use defaults from the client code
+        self.missing = [
+            name for name in self.flag_names if name not in snapshot.flags
+        ] + [name for name in self.value_names if name not in snapshot.values]
+
+        self.flag_procs = {
+            name: snapshot.flags[name]
+            for name in self.flag_names
+            if name in snapshot.flags
+        }
+        self.value_procs = {
+            name: snapshot.values[name]
+            for name in self.value_names
+            if name in snapshot.values
+        }
+
+        self.fmt = fmt
+        self.header = header
+        conditions: list[Any] = [
+            *(c for flag in parsed.flags for c in flag.conditions),
+            *(c for value in parsed.values for c in value.conditions),
+        ]
+        self.types = {
+            check.variable.name: check.variable.type
+            for condition in conditions
+            for check in condition.checks
+        }
+
+    def _coerce(self, name: str, cell: str) -> Any:
+        variable_type = self.types.get(name, VariableType.STRING)
+        if variable_type is VariableType.NUMBER:
+            return parse_number(cell)
+        return COERCE_MAP[variable_type](cell)
+
+    def contexts(self, lines: list[str], tally: Tally) -> Iterator[dict]:
+        if self.fmt == CSV:
+            header = self.header or []
+            for row in csv.reader(lines):
+                if len(row) != len(header):
+                    tally.invalid += 1
+                    continue
+                ctx = {
+                    name: self._coerce(name, cell)
+                    for name, cell in zip(header, row)
+                    if cell != ""
+                }
+                # cells which can't be converted to the types of their
+                # variables, empty cells are missing values
+                if None in ctx.values():
+                    tally.invalid += 1
+                    continue
+                yield ctx
+        else:
+            for line in lines:
+                try:
+                    ctx = json.loads(line)
+                except ValueError:
+                    ctx = None
+                if not isinstance(ctx, dict):
+                    tally.invalid += 1
+                    continue
+                yield ctx
+
+    def evaluate(self, lines: list[str]) -> Tally:
+        tally = Tally()
+        flag_procs = [
+            (name, proc)
+            for name, proc in self.flag_procs.items()
+            if not isinstance(proc, Constant)
+        ]
+        value_procs = [
+            (proc, tally.values.setdefault(name, Counter()))
+            for name, proc in self.value_procs.items()
+            if not isinstance(proc, Constant)
+        ]
+        flag_counts = tally.flags
+
+        rows = 0
+        for ctx in self.contexts(lines, tally):
+            rows += 1
+            for name, check in flag_procs:
+                if check(ctx):
+                    flag_counts[name] += 1
+            for proc, counts in value_procs:
+                counts[proc(ctx)] += 1
+        tally.rows = rows
+
+        # constants are counted once per chunk
+        for name, check in self.flag_procs.items():
+            if isinstance(check, Constant) and check.value:
+                flag_counts[name] += rows
+        for name, proc in self.value_procs.items():
+            if isinstance(proc, Constant):
+                tally.values.setdefault(name, Counter())[proc.value] += rows
+        return tally
+
+    def report(self, tally: Tally) -> dict[str, Any]:
+        return {
+            "rows": tally.rows,
+            "invalid": tally.invalid,
+            "flags": {
+                name: {
+                    "matched": tally.flags[name],
+                    "share": (
+                        tally.flags[name] / tally.rows if tally.rows else 0
+                    ),
+                    "constant": isinstance(proc, Constant),
+                }
+                for name, proc in self.flag_procs.items()
+            },
+            "values": {
+                name: {
+                    "distribution": dict(
+                        tally.values.get(name, Counter()).most_common()
+                    ),
+                    "constant": isinstance(proc, Constant),
+                }
+                for name, proc in self.value_procs.items()
+            },
+            "not_overridden": self.missing,
+        }
+
+
+# evaluator of a pool process, set by its initializer
+_evaluator: Optional[Evaluator] = None
+
+
+def _init_worker(*args: Any) -> None:
+    global _evaluator  # noqa: PLW0603
+    _evaluator = Evaluator(*args)
+
+
+def _evaluate_chunk(lines: list[str]) -> Tally:
+    assert _evaluator is not None
+    return _evaluator.evaluate(lines)
+
+
+def chunks(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def audience(  # noqa: PLR0913
+    response: dict[str, Any],
+    contexts: IO[str],
+    *,
+    flags: Optional[list[str]] = None,
+    values: Optional[list[str]] = None,
+    fmt: str = JSONL,
+    workers: int = 1,
+    chunk_size: int = 10_000,
+) -> dict[str, Any]:
+    """
+    Evaluates flags and values of the preload response for every context of
+    the stream and returns the report. Contexts are evaluated in this
+    process with a single worker, in a pool of processes otherwise.
+    """
+    header = None
+    if fmt == CSV:
+        header = next(csv.reader([contexts.readline()]), [])
+    args = (response, flags, values, fmt, header)
+    evaluator = Evaluator(*args)
+
+    total = Tally()
+    if workers <= 1:
+        for chunk in chunks(contexts, chunk_size):
+            total.merge(evaluator.evaluate(chunk))
+        return evaluator.report(total)
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=args
+    ) as pool:
+        # chunks are read only as fast as they are evaluated
+        pending: deque[Future[Tally]] = deque()
+        for chunk in chunks(contexts, chunk_size):
+            if len(pending) >= workers * 2:
+                total.merge(pending.popleft().result())
+            pending.append(pool.submit(_evaluate_chunk, chunk))
+        while pending:
+            total.merge(pending.popleft().result())
+    return evaluator.report(total)
+
+
+def load_snapshot(path: str) -> dict[str, Any]:
+    """
+    Reads a preload response from a file, see `FileManager`.
+    """
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def fetch(
+    upstream: str,
+    project: str,
+    flags: list[str],
+    values: list[str],
+    timeout: int = 5,
+) -> dict[str, Any]:
+    """
+    Requests the flags and values from the server like managers do on sync.
+    Unlike preload, sync doesn't register names which are not known to the
+    server, they are reported as not overridden.
+    """
+    import urllib.request
+
+    payload = json.dumps(
+        {
+            "project": project,
+            "version": 0,
+            "flags": flags,
+            "values": values,
+        }
+    ).encode()
+    request = urllib.request.Request(  # noqa: S310
+        urljoin(upstream, Endpoints.SYNC.value),
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(  # noqa: S310
+        request, timeout=timeout
+    ) as response:
+        return json.loads(response.read())
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = [f"contexts: {report['rows']} (invalid: {report['invalid']})"]
+    for name, flag in report["flags"].items():
+        constant = ", constant" if flag["constant"] else ""
+        lines.append(
+            f"flag {name}: {flag['matched']} ({flag['share']:.2%}{constant})"
+        )
+    for name, value in report["values"].items():
+        constant = " (constant)" if value["constant"] else ""
+        lines.append(f"value {name}{constant}:")
+        lines.extend(
+            f"  {result!r}: {count}"
+            for result, count in value["distribution"].items()
+        )
+    for name in report["not_overridden"]:
+        lines.append(f"{name}: not overridden, default is used")
+    return "\n".join(lines)
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Count contexts matched by flags and values"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="file with a preload response")
+    source.add_argument("--upstream", help="flags server url")
+    parser.add_argument("--project", help="project name, with --upstream")
+    parser.add_argument(
+        "--flag", action="append", dest="flags", help="may be repeated"
+    )
+    parser.add_argument(
+        "--value", action="append", dest="values", help="may be repeated"
+    )
+    parser.add_argument(
+        "contexts", nargs="?", help="contexts file (default: stdin)"
+    )
+    parser.add_argument("--format", choices=[JSONL, CSV], default=None)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--json", action="store_true", help="JSON report")
+    args = parser.parse_args(argv)
+
+    flags, values = args.flags, args.values
+    if flags or values:
+        # only the given names are evaluated
+        flags, values = flags or [], values or []
+    if args.upstream is not None:
+        if not args.project or not (flags or values):
+            parser.error("--upstream requires --project and names")
+        response = fetch(args.upstream, args.project, flags, values)
+    else:
+        response = load_snapshot(args.snapshot)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = CSV if (args.contexts or "").endswith(".csv") else JSONL
+
+    stream = (
+        open(args.contexts, encoding="utf-8", newline="")  # noqa: SIM115
+        if args.contexts
+        else sys.stdin
+    )
+    try:
+        report = audience(
+            response,
+            stream,
+            flags=flags,
+            values=values,
+            fmt=fmt,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    if args.json:
+        print(json.dumps(report, default=str))  # noqa: T201
+    else:
+        print(format_report(report))  # noqa: T201
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,21 @@
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from contextlib import contextmanager
 from typing import Any, Optional, Union, cast
 
+from featureflags_client.http import decisions as _decisions
+from featureflags_client.http.context import TypedContext
+from featureflags_client.http.decisions import Decisions
+from featureflags_client.http.exposures import ExposureLog
 from featureflags_client.http.flags import Flags
 from featureflags_client.http.managers.base import (
     AsyncBaseManager,
     BaseManager,
 )
+from featureflags_client.http.metrics import (
+    FLAG,
+    VALUE,
+    EvaluationMetrics,
+)
 from featureflags_client.http.values import Values
 
 
@@ -15,34 +24,109 @@ class FeatureFlagsClient:
     Feature flags and values http based client.
     """
 
-    def __init__(self, manager: BaseManager) -> None:
+    def __init__(
+        self,
+        manager: BaseManager,
+        *,
+        metrics: Optional[EvaluationMetrics] = None,
+        exposures: Optional[ExposureLog] = None,
+        decisions_secret: Union[str, bytes, None] = None,
+    ) -> None:
         self._manager = manager
+        self._metrics = metrics
+        self._exposures = exposures
+        # decision tokens are signed and checked with this secret, they are
+        # not encoded or accepted without it
+        if isinstance(decisions_secret, str):
+            decisions_secret = decisions_secret.encode()
+        self._decisions_secret = decisions_secret
+
+        if metrics is not None:
+            metrics.declare(FLAG, manager.defaults)
+            metrics.declare(VALUE, manager.values_defaults)
 
     @contextmanager
     def flags(
         self,
-        ctx: Optional[dict[str, Any]] = None,
+        ctx: Union[Mapping[str, Any], TypedContext, None] = None,
         *,
         overrides: Optional[dict[str, bool]] = None,
+        decisions: Optional[Decisions] = None,
     ) -> Generator[Flags, None, None]:
         """
         Context manager to wrap your request handling code and get actual
         flags values.
         """
-        yield Flags(self._manager, ctx, overrides)
+        if decisions is not None and decisions.flags:
+            overrides = {**decisions.flags, **(overrides or {})}
+        yield Flags(
+            self._manager, ctx, overrides, self._metrics, self._exposures
+        )
 
     @contextmanager
     def values(
         self,
-        ctx: Optional[dict[str, Any]] = None,
+        ctx: Union[Mapping[str, Any], TypedContext, None] = None,
         *,
         overrides: Optional[dict[str, Union[int, str]]] = None,
+        decisions: Optional[Decisions] = None,
     ) -> Generator[Values, None, None]:
         """
         Context manager to wrap your request handling code and get actual
         feature values.
         """
-        yield Values(self._manager, ctx, overrides)
+        if decisions is not None and decisions.values:
+            overrides = {**decisions.values, **(overrides or {})}
+        yield Values(
+            self._manager, ctx, overrides, self._metrics, self._exposures
+        )
+
+    def encode_decisions(
+        self,
+        ctx: Union[Mapping[str, Any], TypedContext, None] = None,
+    ) -> str:
+        """
+        Evaluates all flags and values for the context and encodes their
+        results into a token, pass it to downstream services in the
+        `featureflags_client.http.decisions.HEADER` header, so they serve
+        the same results without evaluating them again. Requires
+        `decisions_secret`, shared with downstream services.
+        """
+        if not self._decisions_secret:
+            raise RuntimeError("Decisions secret is not configured")
+
+        # flags and values are evaluated with the state of the encoded
+        # version; these reads are not exposures, downstream services record
+        # reads of the results
+        snapshot = self._manager.get_snapshot()
+        flags = Flags(self._manager, ctx, None, self._metrics, None, snapshot)
+        values = Values(self._manager, ctx, None, self._metrics, None, snapshot)
+        return _decisions.encode(
+            snapshot.version,
+            {name: getattr(flags, name) for name in self._manager.defaults},
+            {
+                name: getattr(values, name)
+                for name in self._manager.values_defaults
+            },
+            self._decisions_secret,
+        )
+
+    def decode_decisions(self, token: Optional[str]) -> Optional[Decisions]:
+        """
+        Decodes a token of an upstream service, see `encode_decisions`.
+        Returns `None` when the token is missing, malformed or not signed
+        with `decisions_secret`, and always when the secret is not
+        configured. Flags or values which are not the same as in this
+        service are evaluated locally.
+        """
+        if not self._decisions_secret:
+            return None
+        return _decisions.decode(
+            token,
+            self._manager.defaults,
+            self._manager.values_defaults,
+            self._decisions_secret,
+        )
 
     def preload(self) -> None:
         """Preload flags and values from featureflags server.
@@ -1,137 +1,388 @@
+# annotations of procs are not evaluated and stored for every compiled
+# check, which matters for large projects
+from __future__ import annotations
+
 import logging
+import operator
 import re
+import sys
+import time
+from operator import attrgetter
 from typing import Any, Callable, Optional, Union
 
-from featureflags_client.http.types import Check, Flag, Operator, Value
-from featureflags_client.http.utils import hash_flag_value
+from featureflags_client.http.context import COERCE_MAP, TypedContext
+from featureflags_client.http.operands import Operand, OperandPool
+from featureflags_client.http.options import CompileOptions, SetUniverse
+from featureflags_client.http.patterns import (
+    NESTED_QUANTIFIERS,
+    pattern_problem,
+    wildcard_matcher,
+)
+from featureflags_client.http.types import (
+    Check,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+    VariableType,
+)
+from featureflags_client.http.utils import hash_flag_value, to_timestamp
 
 log = logging.getLogger(__name__)
 
 _UNDEFINED = object()
 
+# Conditions which are a single EQUAL check on the same variable are looked
+# up in a hash index instead of being checked one by one, when there are at
+# least this many of them
+EQUAL_INDEX_MIN_SIZE = 4
+
+
+def intern(value: Any) -> Any:
+    """
+    Interns strings, so variable names and operands repeated across checks
+    of a large project are stored once.
+    """
+    return sys.intern(value) if type(value) is str else value
+
 
 def false(_ctx: dict[str, Any]) -> bool:
     return False
 
 
-def except_false(func: Callable) -> Callable:
-    def wrapper(ctx: dict[str, Any]) -> Any:
-        try:
-            return func(ctx)
-        except (TypeError, ValueError):
-            return False
+class Constant:
+    """
+    Proc of a flag or value which doesn't depend on the context. Its result
+    is computed when the state is compiled, `Flags` and `Values` read it
+    from `value` without a call.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __call__(self, _ctx: Any) -> Any:
+        return self.value
+
+    def __repr__(self) -> str:
+        return f"Constant({self.value!r})"
 
-    return wrapper
+
+# Procs catch `TypeError` and `ValueError` themselves, to avoid a wrapper
+# function per check.
 
 
 def equal(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
-        return ctx.get(name, _UNDEFINED) == value
+        try:
+            return ctx.get(name, _UNDEFINED) == value
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def less_than(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
         ctx_val = ctx.get(name, _UNDEFINED)
-        return ctx_val is not _UNDEFINED and ctx_val < value
+        try:
+            return ctx_val is not _UNDEFINED and ctx_val < value
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def less_or_equal(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
         ctx_val = ctx.get(name, _UNDEFINED)
-        return ctx_val is not _UNDEFINED and ctx_val <= value
+        try:
+            return ctx_val is not _UNDEFINED and ctx_val <= value
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def greater_than(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
         ctx_val = ctx.get(name, _UNDEFINED)
-        return ctx_val is not _UNDEFINED and ctx_val > value
+        try:
+            return ctx_val is not _UNDEFINED and ctx_val > value
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def greater_or_equal(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
         ctx_val = ctx.get(name, _UNDEFINED)
-        return ctx_val is not _UNDEFINED and ctx_val >= value
+        try:
+            return ctx_val is not _UNDEFINED and ctx_val >= value
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def contains(name: str, value: Any) -> Callable:
-    @except_false
     def proc(ctx: dict[str, Any]) -> bool:
-        return value in ctx.get(name, "")
+        try:
+            return value in ctx.get(name, "")
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def percent(name: str, value: Any) -> Callable:
-    @except_false
+    try:
+        threshold = int(value)
+    except (TypeError, ValueError):
+        return false
+    if threshold <= 0:
+        return false
+
+    if threshold >= 100:  # noqa: PLR2004
+
+        def present(ctx: dict[str, Any]) -> bool:
+            # any hash is less than 100 percent
+            return ctx.get(name, _UNDEFINED) is not _UNDEFINED
+
+        return present
+
     def proc(ctx: dict[str, Any]) -> bool:
         ctx_val = ctx.get(name, _UNDEFINED)
         if ctx_val is _UNDEFINED:
             return False
+        try:
+            return hash_flag_value(name, ctx_val) % 100 < threshold
+        except (TypeError, ValueError):
+            return False
+
+    return proc
+
 
-        hash_ctx_val = hash_flag_value(name, ctx_val)
-        return hash_ctx_val % 100 < int(value)
+def regexp(name: str, value: Any, max_length: Optional[int] = None) -> Callable:
+    try:
+        _re = re.compile(value)
+    except (re.error, TypeError):
+        return false
+    limit = max_length if max_length is not None else sys.maxsize
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        ctx_val = ctx.get(name, "")
+        try:
+            return len(ctx_val) <= limit and _re.match(ctx_val) is not None
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
-def regexp(name: str, value: Any) -> Callable:
-    @except_false
-    def proc(ctx: dict[str, Any], _re: re.Pattern = re.compile(value)) -> bool:
-        return _re.match(ctx.get(name, "")) is not None
+def wildcard_pattern(value: str) -> str:
+    return "^" + "(?:.*)".join(map(re.escape, value.split("*"))) + "$"
+
+
+def wildcard(
+    name: str, value: Any, max_length: Optional[int] = None
+) -> Callable:
+    if not isinstance(value, str):
+        return false
+    match = wildcard_matcher(value, max_length)
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        try:
+            return match(ctx.get(name, ""))
+        except (TypeError, AttributeError):
+            return False
 
     return proc
 
 
-def wildcard(name: str, value: Any) -> Callable:
-    re_ = "^" + "(?:.*)".join(map(re.escape, value.split("*"))) + "$"
-    return regexp(name, re_)
+def rejected_pattern(
+    value: Any, options: Optional[CompileOptions] = None
+) -> Optional[str]:
+    """
+    Returns why REGEXP check with this pattern is compiled into `false`,
+    see `CompileOptions.reject_unsafe_patterns`.
+    """
+    problem = pattern_problem(value)
+    if (
+        problem == NESTED_QUANTIFIERS
+        and options is not None
+        and not options.reject_unsafe_patterns
+    ):
+        return None
+    return problem
+
+
+def pattern_check_proc(
+    op: Operator,
+    name: str,
+    value: Any,
+    options: Optional[CompileOptions] = None,
+) -> Callable:
+    max_length = options.max_match_length if options is not None else None
+    if op is Operator.WILDCARD:
+        return wildcard(name, value, max_length)
+    if rejected_pattern(value, options) is not None:
+        return false
+    return regexp(name, value, max_length)
 
 
-def subset(name: str, value: Any) -> Callable:
-    if value:
+def _operand(value: Any) -> Optional[Operand]:
+    try:
+        return OperandPool().get(value)
+    except TypeError:
+        # unhashable items, such check is always false
+        return None
 
-        @except_false
-        def proc(ctx: dict[str, Any], _value: Optional[set] = None) -> bool:
-            _value = _value or set(value)
-            ctx_val = ctx.get(name)
-            return bool(ctx_val) and _value.issuperset(ctx_val)
 
-    else:
-        proc = false
+def subset(name: str, value: Any) -> Callable:
+    operand = _operand(value) if value else None
+    if not operand:
+        return false
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        ctx_val = ctx.get(name)
+        try:
+            return bool(ctx_val) and operand.issuperset(ctx_val)
+        except (TypeError, ValueError):
+            return False
 
     return proc
 
 
 def superset(name: str, value: Any) -> Callable:
-    if value:
+    operand = _operand(value) if value else None
+    if not operand:
+        return false
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        ctx_val = ctx.get(name)
+        try:
+            return bool(ctx_val) and operand.issubset(ctx_val)
+        except (TypeError, ValueError):
+            return False
+
+    return proc
+
+
+def subset_mask(name: str, value: Any, universe: SetUniverse) -> Callable:
+    fallback = subset(name, value)
+    if fallback is false:
+        return false
+
+    # unknown operand members can't be in a context without unknown members
+    operand_mask, _ = universe.operand_mask(value)
+    outside = ~operand_mask
+    unknown = universe.unknown
+
+    def slow(ctx: dict[Any, Any]) -> bool:
+        ctx_mask = universe.mask(ctx.get(name))
+        if ctx_mask is None or ctx_mask & unknown:
+            return fallback(ctx)
+        return ctx_mask != 0 and not ctx_mask & outside
+
+    def proc(ctx: dict[Any, Any]) -> bool:
+        ctx_mask = ctx.get(universe)
+        if ctx_mask is not None and not ctx_mask & unknown:
+            return ctx_mask != 0 and not ctx_mask & outside
+        return slow(ctx)
 
-        @except_false
-        def proc(ctx: dict[str, Any], _value: Optional[set] = None) -> bool:
-            _value = _value or set(value)
-            ctx_val = ctx.get(name)
-            return bool(ctx_val) and _value.issubset(ctx_val)
+    return proc
+
+
+def superset_mask(name: str, value: Any, universe: SetUniverse) -> Callable:
+    fallback = superset(name, value)
+    if fallback is false:
+        return false
+
+    operand_mask, operand_unknown = universe.operand_mask(value)
+    unknown = universe.unknown
+
+    def slow(ctx: dict[Any, Any]) -> bool:
+        ctx_mask = universe.mask(ctx.get(name))
+        if ctx_mask is None or (operand_unknown and ctx_mask & unknown):
+            return fallback(ctx)
+        return not operand_unknown and ctx_mask & operand_mask == operand_mask
+
+    if operand_unknown:
+        # context contains unknown operand members only if it has unknown
+        # members itself, which are checked by the fallback
+        def proc(ctx: dict[Any, Any]) -> bool:
+            ctx_mask = ctx.get(universe)
+            if ctx_mask is not None and not ctx_mask & unknown:
+                return False
+            return slow(ctx)
 
     else:
-        proc = false
+
+        def proc(ctx: dict[Any, Any]) -> bool:
+            ctx_mask = ctx.get(universe)
+            if ctx_mask is not None:
+                return ctx_mask & operand_mask == operand_mask
+            return slow(ctx)
+
+    return proc
+
+
+MASK_OPERATIONS_MAP: dict[Operator, Callable[..., Callable[..., bool]]] = {
+    Operator.SUBSET: subset_mask,
+    Operator.SUPERSET: superset_mask,
+}
+
+TIMESTAMP_OPERATIONS_MAP: dict[Operator, Callable[[Any, Any], bool]] = {
+    Operator.EQUAL: operator.eq,
+    Operator.LESS_THAN: operator.lt,
+    Operator.LESS_OR_EQUAL: operator.le,
+    Operator.GREATER_THAN: operator.gt,
+    Operator.GREATER_OR_EQUAL: operator.ge,
+}
+
+
+def timestamp(op: Operator, name: str, value: Any) -> Callable:
+    """
+    Comparison of TIMESTAMP variable, operand is parsed once, context value
+    can be a number, a string or a `datetime`, see `to_timestamp`.
+    """
+    operand = to_timestamp(value)
+    if operand is None:
+        log.debug(f"Invalid timestamp: {value!r}")
+        return false
+
+    compare = TIMESTAMP_OPERATIONS_MAP[op]
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        ctx_val = to_timestamp(ctx.get(name))
+        return ctx_val is not None and compare(ctx_val, operand)
+
+    return proc
+
+
+def current_time(op: Operator, value: Any) -> Callable:
+    """
+    Comparison of the current time, see `CompileOptions.now_variable`.
+    """
+    operand = to_timestamp(value)
+    if operand is None:
+        log.debug(f"Invalid timestamp: {value!r}")
+        return false
+
+    compare = TIMESTAMP_OPERATIONS_MAP[op]
+
+    def proc(ctx: dict[str, Any]) -> bool:
+        return compare(time.time(), operand)
 
     return proc
 
 
+_SET_OPERATORS = frozenset({Operator.SUBSET, Operator.SUPERSET})
+_PATTERN_OPERATORS = frozenset({Operator.REGEXP, Operator.WILDCARD})
+
 OPERATIONS_MAP: dict[Operator, Callable[..., Callable[..., bool]]] = {
     Operator.EQUAL: equal,
     Operator.LESS_THAN: less_than,
@@ -147,15 +398,376 @@ OPERATIONS_MAP: dict[Operator, Callable[..., Callable[..., bool]]] = {
 }
 
 
-def check_proc(check: Check) -> Callable:
+def typed_compare(get: Callable, op: Operator, operand: Any) -> Callable:
+    if operand is None:
+        return false
+
+    compare = TIMESTAMP_OPERATIONS_MAP[op]
+
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return ctx_val is not None and compare(ctx_val, operand)
+
+    return proc
+
+
+def typed_percent(get: Callable, name: str, value: Any) -> Callable:
+    def mismatched(ctx: TypedContext) -> Any:
+        return ctx._mismatched and ctx._mismatched.get(name)
+
+    try:
+        threshold = int(value)
+    except (TypeError, ValueError):
+        return false
+    if threshold <= 0:
+        return false
+
+    if threshold >= 100:  # noqa: PLR2004
+
+        def present(ctx: TypedContext) -> bool:
+            return get(ctx) is not None or mismatched(ctx) is not None
+
+        return present
+
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        if ctx_val is None:
+            # plain dict contexts hash values of any type
+            ctx_val = mismatched(ctx)
+        return (
+            ctx_val is not None
+            and hash_flag_value(name, ctx_val) % 100 < threshold
+        )
+
+    return proc
+
+
+def typed_contains(get: Callable, value: str) -> Callable:
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return ctx_val is not None and value in ctx_val
+
+    return proc
+
+
+def typed_match(
+    get: Callable, pattern: str, max_length: Optional[int] = None
+) -> Callable:
+    _re = re.compile(pattern)
+    limit = max_length if max_length is not None else sys.maxsize
+
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return (
+            ctx_val is not None
+            and len(ctx_val) <= limit
+            and _re.match(ctx_val) is not None
+        )
+
+    return proc
+
+
+def typed_wildcard(
+    get: Callable, pattern: str, max_length: Optional[int] = None
+) -> Callable:
+    match = wildcard_matcher(pattern, max_length)
+
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return ctx_val is not None and match(ctx_val)
+
+    return proc
+
+
+def typed_subset(get: Callable, operand: Operand) -> Callable:
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return bool(ctx_val) and operand.issuperset(ctx_val)
+
+    return proc
+
+
+def typed_superset(get: Callable, operand: Operand) -> Callable:
+    def proc(ctx: TypedContext) -> bool:
+        ctx_val = get(ctx)
+        return bool(ctx_val) and operand.issubset(ctx_val)
+
+    return proc
+
+
+def typed_set_proc(
+    get: Callable,
+    op: Operator,
+    value: Any,
+    pool: Optional[OperandPool],
+) -> Optional[Callable]:
+    if op not in _SET_OPERATORS:
+        return None
+    try:
+        operand = (pool or OperandPool()).get(value)
+    except TypeError:
+        return false
+    if not operand:
+        return false
+    if op is Operator.SUBSET:
+        return typed_subset(get, operand)
+    return typed_superset(get, operand)
+
+
+def typed_string_proc(
+    get: Callable,
+    op: Operator,
+    value: Any,
+    options: Optional[CompileOptions] = None,
+) -> Optional[Callable]:
+    if not isinstance(value, str):
+        return None
+    max_length = options.max_match_length if options is not None else None
+    if op is Operator.CONTAINS:
+        return typed_contains(get, value)
+    if op is Operator.REGEXP:
+        if rejected_pattern(value, options) is not None:
+            return false
+        return typed_match(get, value, max_length)
+    if op is Operator.WILDCARD:
+        return typed_wildcard(get, value, max_length)
+    return None
+
+
+def typed_check_proc(
+    check: Check,
+    context_type: type[TypedContext],
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> Optional[Callable]:
+    """
+    Returns proc for contexts of the `context_type`, values of which are
+    already coerced to the variable types, so procs don't need `ctx.get`
+    and type checks. Returns `None` if there is no typed proc for the check.
+    """
+    name = check.variable.name
+    attr = context_type.attr(name)
+    variable_type = context_type.variable_type(name)
+    # current time and bitmasks are handled by the generic procs
+    if (
+        attr is None
+        or variable_type is None
+        or (
+            options is not None
+            and (name == options.now_variable or name in options.universes)
+        )
+    ):
+        return None
+
+    get = attrgetter(attr)
+    op = check.operator
+    value: Any = check.value
+
+    if variable_type is VariableType.SET:
+        return typed_set_proc(get, op, value, pool)
+
+    if op in TIMESTAMP_OPERATIONS_MAP:
+        operand = COERCE_MAP[variable_type](value)
+        return typed_compare(get, op, operand)
+
+    if op is Operator.PERCENT:
+        return typed_percent(get, name, value)
+
+    if variable_type is VariableType.STRING:
+        return typed_string_proc(get, op, value, options)
+    return None
+
+
+def set_check_proc(
+    op: Operator,
+    name: str,
+    value: Any,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> Callable:
+    if pool is not None:
+        try:
+            value = pool.get(value)
+        except TypeError:
+            return false
+
+    universe = options.universes.get(name) if options else None
+    if universe is not None:
+        return MASK_OPERATIONS_MAP[op](name, value, universe)
+    return OPERATIONS_MAP[op](name, value)
+
+
+def timestamp_check_proc(
+    check: Check,
+    name: str,
+    value: Any,
+    options: Optional[CompileOptions] = None,
+) -> Optional[Callable]:
+    if options is not None and name == options.now_variable:
+        return current_time(check.operator, value)
+    if check.variable.type is VariableType.TIMESTAMP:
+        return timestamp(check.operator, name, value)
+    return None
+
+
+def check_proc(
+    check: Check,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> Callable:
     if check.value is None:
         log.debug(f"Check[{check}].value is None")
         return false
 
-    return OPERATIONS_MAP[check.operator](check.variable.name, check.value)
+    if options is not None and options.context_type is not None:
+        proc = typed_check_proc(check, options.context_type, pool, options)
+        if proc is not None:
+            return proc
+
+    name = intern(check.variable.name)
+    value: Any = intern(check.value)
+    if check.operator in TIMESTAMP_OPERATIONS_MAP:
+        proc = timestamp_check_proc(check, name, value, options)
+        if proc is not None:
+            return proc
+
+    if check.operator in _SET_OPERATORS:
+        return set_check_proc(check.operator, name, value, pool, options)
+
+    if check.operator in _PATTERN_OPERATORS:
+        return pattern_check_proc(check.operator, name, value, options)
+
+    return OPERATIONS_MAP[check.operator](name, value)
+
+
+def indexed_value(check: Check, options: Optional[CompileOptions]) -> Any:
+    """
+    Returns value of the EQUAL check coerced like `check_proc` does it, so
+    indexed and checked conditions give the same results, `_UNDEFINED` if
+    the check can't be looked up in an index.
+    """
+    name = check.variable.name
+    # timestamps are parsed before they are compared and the current time
+    # is not read from the context
+    if check.variable.type is VariableType.TIMESTAMP or (
+        options is not None and name == options.now_variable
+    ):
+        return _UNDEFINED
+
+    value: Any = check.value
+    if (
+        options is not None
+        and options.context_type is not None
+        and name not in options.universes
+    ):
+        variable_type = options.context_type.variable_type(name)
+        if variable_type is VariableType.TIMESTAMP:
+            return _UNDEFINED
+        # typed contexts store coerced values, see `typed_check_proc`
+        if variable_type in (VariableType.STRING, VariableType.NUMBER):
+            value = COERCE_MAP[variable_type](value)
+
+    try:
+        hash(value)
+    except TypeError:
+        return _UNDEFINED
+    return _UNDEFINED if value is None else value
+
+
+def equal_check(
+    checks: list[Check],
+    options: Optional[CompileOptions] = None,
+) -> Optional[tuple[str, Any]]:
+    """
+    Returns variable name and value if condition consists of a single EQUAL
+    check, which can be looked up in a hash index.
+    """
+    if len(checks) != 1:
+        return None
+
+    (check,) = checks
+    if check.operator != Operator.EQUAL or check.value is None:
+        return None
+
+    value = indexed_value(check, options)
+    if value is _UNDEFINED:
+        return None
+    return intern(check.variable.name), intern(value)
+
+
+def index_get(index: dict, ctx: dict[str, Any], name: str) -> Any:
+    try:
+        return index.get(ctx.get(name, _UNDEFINED), _UNDEFINED)
+    except TypeError:
+        # unhashable value is never equal to the checked one
+        return _UNDEFINED
+
+
+def conditions_procs(
+    checks: list[Check],
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> tuple[Callable, ...]:
+    checks_procs = tuple(check_proc(check, pool, options) for check in checks)
 
+    # in case of invalid condition it would be safe to replace it
+    # with a falsish condition
+    if not checks_procs:
+        log.debug("Condition has empty checks")
+        checks_procs = (false,)
 
-def flag_proc(flag: Flag) -> Optional[Callable]:
+    return checks_procs
+
+
+def never(checks: tuple[Callable, ...]) -> bool:
+    """
+    Whether condition with these checks procs is false for any context.
+    """
+    return false in checks
+
+
+def flag_conditions(
+    flag: Flag,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> tuple[tuple[tuple[str, dict], ...], tuple[tuple[Callable, ...], ...]]:
+    """
+    Returns indexes for single EQUAL conditions and checks procs for the
+    rest of flag conditions.
+    """
+    # order of conditions doesn't matter for flags, so all single EQUAL
+    # conditions on the same variable can be merged into one index
+    equal_checks = [equal_check(c.checks, options) for c in flag.conditions]
+    equal_values: dict[str, dict[Any, bool]] = {}
+    for key in equal_checks:
+        if key is not None:
+            name, value = key
+            equal_values.setdefault(name, {})[value] = True
+
+    indexes = tuple(
+        (name, index)
+        for name, index in equal_values.items()
+        if len(index) >= EQUAL_INDEX_MIN_SIZE
+    )
+    indexed = {name for name, _ in indexes}
+
+    conditions = tuple(
+        checks
+        for checks in (
+            conditions_procs(condition.checks, pool, options)
+            for condition, key in zip(flag.conditions, equal_checks)
+            if key is None or key[0] not in indexed
+        )
+        if not never(checks)
+    )
+    return indexes, conditions
+
+
+def flag_proc(
+    flag: Flag,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> Optional[Callable]:
     if not flag.overridden:
         # Flag was not overridden on server, use value from defaults.
         log.debug(
@@ -163,47 +775,56 @@ def flag_proc(flag: Flag) -> Optional[Callable]:
         )
         return None
 
-    conditions = []
-    for condition in flag.conditions:
-        checks_procs = [check_proc(check) for check in condition.checks]
+    indexes, conditions = flag_conditions(flag, pool, options)
+    # procs don't keep references to the flag and its checks
+    enabled = flag.enabled
 
-        # in case of invalid condition it would be safe to replace it
-        # with a falsish condition
-        if not checks_procs:
-            log.debug("Condition has empty checks")
-            checks_procs = [false]
+    if enabled and indexes:
 
-        conditions.append(checks_procs)
+        def proc(ctx: dict[str, Any]) -> bool:
+            for name, index in indexes:
+                if index_get(index, ctx, name) is not _UNDEFINED:
+                    return True
+            return any(
+                all(check(ctx) for check in checks) for checks in conditions
+            )
 
-    if flag.enabled and conditions:
+    elif enabled and conditions:
 
         def proc(ctx: dict[str, Any]) -> bool:
             return any(
                 all(check(ctx) for check in checks) for checks in conditions
             )
 
+    elif enabled and flag.conditions:
+        log.debug(f"Flag[{flag.name}] conditions are never true")
+        return Constant(False)
+
     else:
         log.debug(
             f"Flag[{flag.name}] is disabled or do not have any conditions"
         )
-
-        def proc(ctx: dict[str, Any]) -> bool:
-            return flag.enabled
+        return Constant(enabled)
 
     return proc
 
 
-def update_flags_state(flags: list[Flag]) -> dict[str, Callable[..., bool]]:
+def update_flags_state(
+    flags: list[Flag],
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> dict[str, Callable[..., bool]]:
     """
     Assign a proc to each flag which has to be computed.
     """
 
     procs = {}
+    pool = pool if pool is not None else OperandPool()
 
     for flag in flags:
-        proc = flag_proc(flag)
+        proc = flag_proc(flag, pool, options)
         if proc is not None:
-            procs[flag.name] = proc
+            procs[intern(flag.name)] = proc
 
     return procs
 
@@ -215,63 +836,115 @@ def str_to_int(value: Union[int, str]) -> Union[int, str]:
         return value
 
 
-def value_proc(value: Value) -> Union[Callable[..., Union[int, str]]]:
+def equal_runs(
+    conditions: list[ValueCondition],
+    options: Optional[CompileOptions] = None,
+) -> list[tuple[Optional[str], list[tuple[Any, ValueCondition]]]]:
+    """
+    Groups consecutive single EQUAL conditions on the same variable, with
+    their checked values, other conditions are returned one by one with
+    `None` as a variable name.
+    """
+    runs: list[tuple[Optional[str], list[tuple[Any, ValueCondition]]]] = []
+    for condition in conditions:
+        key = equal_check(condition.checks, options)
+        name, value = key if key is not None else (None, None)
+        if name is not None and runs and runs[-1][0] == name:
+            runs[-1][1].append((value, condition))
+        else:
+            runs.append((name, [(value, condition)]))
+    return runs
+
+
+def value_conditions(
+    value: Value,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> list[tuple[Optional[str], Any, Optional[tuple[Callable, ...]]]]:
+    """
+    Returns `(variable name, index, None)` for indexed runs of conditions and
+    `(None, value override, checks procs)` for the rest of value conditions.
+    """
+    conditions: list[
+        tuple[Optional[str], Any, Optional[tuple[Callable, ...]]]
+    ] = []
+    for name, run in equal_runs(value.conditions, options):
+        if name is not None and len(run) >= EQUAL_INDEX_MIN_SIZE:
+            # first matching condition wins, so the earliest override is
+            # kept for each value
+            index: dict[Any, Any] = {}
+            for checked, condition in run:
+                index.setdefault(
+                    checked, str_to_int(intern(condition.value_override))
+                )
+            conditions.append((name, index, None))
+        else:
+            for _, condition in run:
+                checks = conditions_procs(condition.checks, pool, options)
+                if not never(checks):
+                    conditions.append(
+                        (
+                            None,
+                            str_to_int(intern(condition.value_override)),
+                            checks,
+                        )
+                    )
+    return conditions
+
+
+def value_proc(
+    value: Value,
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
+) -> Union[Callable[..., Union[int, str]]]:
+    # procs don't keep references to the value and its checks, results are
+    # converted once, when the value is compiled
     if not value.overridden:
         # Value was not overridden on server, use value from defaults.
         log.debug(
             f"Value[{value.name}] is not override yet, using default value"
         )
+        return Constant(str_to_int(intern(value.value_default)))
 
-        def proc(ctx: dict[str, Any]) -> Union[int, str]:
-            return str_to_int(value.value_default)
-
-        return proc
-
-    conditions = []
-    for condition in value.conditions:
-        checks_procs = [check_proc(check) for check in condition.checks]
-
-        # in case of invalid condition it would be safe to replace it
-        # with a falsish condition
-        if not checks_procs:
-            log.debug("Condition has empty checks")
-            checks_procs = [false]
-
-        conditions.append(
-            (condition.value_override, checks_procs),
-        )
+    value_override = str_to_int(intern(value.value_override))
+    conditions = tuple(value_conditions(value, pool, options))
 
     if value.enabled and conditions:
 
         def proc(ctx: dict[str, Any]) -> Union[int, str]:
-            for condition_value_override, checks in conditions:
-                if all(check(ctx) for check in checks):
-                    return str_to_int(condition_value_override)
-            return str_to_int(value.value_override)
+            for name, override, checks in conditions:
+                if checks is None:
+                    result = index_get(override, ctx, name)
+                    if result is not _UNDEFINED:
+                        return result
+                elif all(check(ctx) for check in checks):
+                    return override
+            return value_override
 
     else:
         log.debug(
             f"Value[{value.name}] is disabled or do not have any conditions"
         )
-
-        def proc(ctx: dict[str, Any]) -> Union[int, str]:
-            return str_to_int(value.value_override)
+        return Constant(value_override)
 
     return proc
 
 
 def update_values_state(
     values: list[Value],
+    pool: Optional[OperandPool] = None,
+    options: Optional[CompileOptions] = None,
 ) -> dict[str, Callable[..., Union[int, str]]]:
     """
     Assign a proc to each values which has to be computed.
     """
 
     procs = {}
+    pool = pool if pool is not None else OperandPool()
 
     for value in values:
-        proc = value_proc(value)
+        proc = value_proc(value, pool, options)
         if proc is not None:
-            procs[value.name] = proc
+            procs[intern(value.name)] = proc
 
     return procs
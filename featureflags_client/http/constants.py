@@ -4,3 +4,4 @@ from enum import Enum
 class Endpoints(Enum):
     PRELOAD = "/flags/load"
     SYNC = "/flags/sync"
+    EXPOSURES = "/flags/exposures"
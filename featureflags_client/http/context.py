@@ -0,0 +1,269 @@
+import keyword
+import logging
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any, Callable, ClassVar, Optional
+
+from featureflags_client.http.types import Variable, VariableType
+from featureflags_client.http.utils import to_timestamp
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def coerce_string(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def coerce_number(value: Any) -> Optional[float]:
+    # values are kept as is, like in plain dict contexts: bools compare as
+    # numbers there and numeric strings don't
+    return value if isinstance(value, (int, float)) else None
+
+
+def parse_number(value: str) -> Optional[float]:
+    for number_type in (int, float):
+        try:
+            return number_type(value)
+        except ValueError:
+            pass
+    return None
+
+
+def coerce_set(value: Any) -> Optional[frozenset]:
+    if isinstance(value, frozenset):
+        return value
+    if isinstance(value, str):
+        return frozenset((value,))
+    try:
+        return frozenset(value)
+    except TypeError:
+        return None
+
+
+COERCE_MAP: dict[VariableType, Callable[[Any], Any]] = {
+    VariableType.STRING: coerce_string,
+    VariableType.NUMBER: coerce_number,
+    VariableType.TIMESTAMP: to_timestamp,
+    VariableType.SET: coerce_set,
+}
+
+
+class TypedContext:
+    """
+    Base class of typed contexts, see `make_context_type`.
+
+    Values are coerced to the types of their variables when the context is
+    built, values of other types are stored as `None` and don't match any
+    check, as with plain dicts, except PERCENT checks, which hash any value.
+    Compiled checks read attributes directly, contexts also support `get` by
+    variable name, like plain dicts, for everything else.
+    """
+
+    __slots__ = ("_mismatched",)
+
+    # variable name -> value, which can't be coerced
+    _mismatched: Optional[dict[str, Any]]
+
+    # variable name -> attribute name
+    _attrs: ClassVar[dict[str, str]] = {}
+    _types: ClassVar[dict[str, VariableType]] = {}
+
+    def __init__(
+        self,
+        values: Optional[Mapping[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Accepts values by variable names and keyword arguments by attribute
+        names.
+        """
+        values = values or {}
+        mismatched: Optional[dict[str, Any]] = None
+        for name, attr in self._attrs.items():
+            value = kwargs.pop(attr, values.get(name))
+            if value is not None:
+                coerced = COERCE_MAP[self._types[name]](value)
+                if coerced is None:
+                    mismatched = mismatched or {}
+                    mismatched[name] = value
+                value = coerced
+            object.__setattr__(self, attr, value)
+        object.__setattr__(self, "_mismatched", mismatched)
+
+        if kwargs:
+            raise TypeError(f"Unknown variables: {', '.join(sorted(kwargs))}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Context is immutable")
+
+    def get(self, name: Any, default: Any = None) -> Any:
+        attr = self._attrs.get(name)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            f"{attr}={getattr(self, attr)!r}" for attr in self._attrs.values()
+        )
+        return f"{type(self).__name__}({values})"
+
+    @classmethod
+    def attr(cls, name: str) -> Optional[str]:
+        """Attribute name of the variable."""
+        return cls._attrs.get(name)
+
+    @classmethod
+    def variable_type(cls, name: str) -> Optional[VariableType]:
+        return cls._types.get(name)
+
+
+def _attr_name(name: str, taken: set[str]) -> str:
+    attr = re.sub(r"\W", "_", name)
+    if (
+        not attr.isidentifier()
+        or keyword.iskeyword(attr)
+        or attr.startswith("_")
+        or hasattr(TypedContext, attr)
+    ):
+        attr = f"var_{attr}"
+
+    unique = attr
+    idx = 2
+    while unique in taken:
+        unique = f"{attr}_{idx}"
+        idx += 1
+    taken.add(unique)
+    return unique
+
+
+def make_context_type(
+    variables: list[Variable],
+    name: str = "Context",
+) -> type[TypedContext]:
+    """
+    Creates a `__slots__` based context type with a field for each variable,
+    variable names are converted into valid attribute names: `user.id`
+    becomes `user_id`.
+    """
+    taken: set[str] = set()
+    attrs = {
+        variable.name: _attr_name(variable.name, taken)
+        for variable in variables
+    }
+    return type(
+        name,
+        (TypedContext,),
+        {
+            "__slots__": tuple(attrs.values()),
+            "_attrs": attrs,
+            "_types": {variable.name: variable.type for variable in variables},
+        },
+    )
+
+
+class LazyContext(Mapping[str, Any]):
+    """
+    Context with values computed on first access. Callable values are
+    providers, they are called when a check reads the variable for the
+    first time and the result is memoized, so expensive variables are
+    computed only for requests which evaluate flags that use them.
+
+    Async providers are not called by checks, they have to be resolved in
+    advance with `resolve`, otherwise variables are treated as missing::
+
+        ctx = LazyContext({"geo.country": geoip_lookup})
+        await ctx.resolve(manager.get_snapshot().variables)
+
+    Variables which providers failed to compute are logged and treated as
+    missing.
+    """
+
+    __slots__ = ("_async_providers", "_providers", "_values")
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None) -> None:
+        self._values: dict[str, Any] = {}
+        self._providers: dict[str, Callable[[], Any]] = {}
+        self._async_providers: dict[str, Callable[[], Any]] = {}
+        if not values:
+            return
+
+        # deferred, as `inspect` is slow to import
+        import inspect
+
+        for name, value in values.items():
+            if inspect.iscoroutinefunction(value):
+                self._async_providers[name] = value
+            elif callable(value):
+                self._providers[name] = value
+            else:
+                self._values[name] = value
+
+    def _provide(self, name: str) -> Any:
+        # provider is removed only after its value is stored, so readers in
+        # other threads always find one of them; they could call the
+        # provider concurrently, but all of them get the first stored value
+        provider = self._providers.get(name)
+        if provider is None:
+            if name in self._async_providers:
+                log.warning(f"Async context variable is not resolved: {name}")
+            return self._values.get(name, _MISSING)
+
+        try:
+            value = self._values.setdefault(name, provider())
+        except Exception:
+            log.exception(f"Failed to provide context variable: {name}")
+            value = _MISSING
+        self._providers.pop(name, None)
+        return value
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = self._values.get(name, _MISSING)
+        if value is _MISSING:
+            value = self._provide(name)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        # values are resolved while iterating, a name is both in values and
+        # providers while its provider is being removed
+        return iter(
+            dict.fromkeys(
+                [*self._values, *self._providers, *self._async_providers]
+            )
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"LazyContext({self._values!r})"
+
+    async def _provide_async(self, name: str) -> None:
+        provider = self._async_providers.pop(name)
+        try:
+            self._values[name] = await provider()
+        except Exception:
+            log.exception(f"Failed to provide context variable: {name}")
+
+    async def resolve(self, names: Optional[Iterable[str]] = None) -> None:
+        """
+        Concurrently resolves async providers of the given variables, all of
+        them by default. Pass `StateSnapshot.variables` to skip variables
+        which are not used by any flag or value.
+        """
+        import asyncio
+
+        if names is None:
+            pending = list(self._async_providers)
+        else:
+            pending = [name for name in names if name in self._async_providers]
+        await asyncio.gather(*(self._provide_async(name) for name in pending))
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import zlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+log = logging.getLogger(__name__)
+
+# header to pass the token between services
+HEADER = "X-FeatureFlags-Decisions"
+
+_FORMAT = "2"
+_PARTS = 7
+# bytes of HMAC-SHA256 kept in the token
+_SIGNATURE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class Decisions:
+    """
+    Results of flags and values evaluated by an upstream service, decoded
+    from a token, see `FeatureFlagsClient.encode_decisions`. Pass them to
+    `FeatureFlagsClient.flags()` and `values()` to serve these results
+    instead of evaluating them again.
+
+    Flags or values are left empty when their names are not the same as in
+    the defaults of this service, they are evaluated locally then.
+
+    Tokens are signed with a secret shared by the services, tokens which
+    are not signed with it are ignored. A signed token can still be copied
+    from one request to another, so the header has to be stripped from
+    requests which come from outside at the edge.
+    """
+
+    version: int
+    flags: dict[str, bool] = field(default_factory=dict)
+    values: dict[str, Union[int, str]] = field(default_factory=dict)
+
+
+def names_fingerprint(names: Iterable[str]) -> str:
+    return f"{zlib.crc32(chr(0).join(names).encode()):08x}"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(body: str, secret: bytes) -> str:
+    digest = hmac.new(secret, body.encode(), hashlib.sha256).digest()
+    return _b64encode(digest[:_SIGNATURE_SIZE])
+
+
+def encode(
+    version: int,
+    flags: dict[str, bool],
+    values: dict[str, Union[int, str]],
+    secret: bytes,
+) -> str:
+    """
+    Encodes results into a token which fits into a header: version, bitset
+    of flag results and a list of value results, ordered by names, with
+    fingerprints of the names, signed with the secret.
+    """
+    flag_names = sorted(flags)
+    bits = 0
+    for i, name in enumerate(flag_names):
+        if flags[name]:
+            bits |= 1 << i
+
+    value_names = sorted(values)
+    value_results = json.dumps(
+        [values[name] for name in value_names],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    body = ".".join(
+        (
+            _FORMAT,
+            str(version),
+            names_fingerprint(flag_names),
+            _b64encode(bits.to_bytes((len(flag_names) + 7) // 8, "little")),
+            names_fingerprint(value_names),
+            _b64encode(value_results.encode()),
+        )
+    )
+    return f"{body}.{_sign(body, secret)}"
+
+
+def decode(
+    token: Optional[str],
+    flag_names: Iterable[str],
+    value_names: Iterable[str],
+    secret: bytes,
+) -> Optional[Decisions]:
+    """
+    Decodes results of the flags and values with the given names, returns
+    `None` when the token is missing, malformed or not signed with the
+    secret.
+    """
+    if not token:
+        return None
+
+    parts = token.split(".")
+    if len(parts) != _PARTS or parts[0] != _FORMAT:
+        log.debug("Unsupported decisions token: %r", token)
+        return None
+
+    body, _, signature = token.rpartition(".")
+    if not hmac.compare_digest(signature, _sign(body, secret)):
+        log.warning("Decisions token with invalid signature is ignored")
+        return None
+    _, version, flags_fingerprint, bits, values_fingerprint, results, _ = parts
+
+    flags: dict[str, bool] = {}
+    values: dict[str, Union[int, str]] = {}
+    try:
+        decisions = Decisions(int(version), flags, values)
+
+        sorted_flags = sorted(flag_names)
+        if flags_fingerprint == names_fingerprint(sorted_flags):
+            bitset = int.from_bytes(_b64decode(bits), "little")
+            for i, name in enumerate(sorted_flags):
+                flags[name] = bool(bitset >> i & 1)
+        else:
+            log.debug("Flags of the decisions token are not the same")
+
+        sorted_values = sorted(value_names)
+        if values_fingerprint == names_fingerprint(sorted_values):
+            value_results = json.loads(_b64decode(results))
+            if len(value_results) != len(sorted_values) or not all(
+                isinstance(result, (int, str)) for result in value_results
+            ):
+                raise ValueError("Invalid value results")
+            values.update(zip(sorted_values, value_results))
+        else:
+            log.debug("Values of the decisions token are not the same")
+    except (ValueError, TypeError) as exc:
+        log.debug("Malformed decisions token %r: %r", token, exc)
+        return None
+
+    return decisions
@@ -0,0 +1,263 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from featureflags_client.http.constants import Endpoints
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from featureflags_client.http.context import TypedContext
+    from featureflags_client.http.managers.base import BaseManager
+
+log = logging.getLogger(__name__)
+
+# kind, name, context key, result, timestamp
+Exposure = tuple[str, str, Any, Union[bool, int, str], float]
+
+
+class ExposureLog:
+    """
+    Records which flags and values were read and with what result, pass it
+    to the `FeatureFlagsClient` to enable it.
+
+    Reads are appended to a bounded buffer without locks, a read of the
+    same flag or value for the same context key is recorded once per
+    `dedupe_window` seconds. Context key is the value of the `key_variable`
+    in the context, e.g. `user.id`. Recorded exposures are sent in gzip
+    compressed batches to the `/flags/exposures` endpoint with the session
+    of the manager, by a background thread or task started with `start()`.
+    When the buffer is full, new exposures are dropped and counted in
+    `dropped`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        key_variable: Optional[str] = None,
+        *,
+        capacity: int = 10_000,
+        batch_size: int = 1_000,
+        flush_interval: float = 5.0,
+        dedupe_window: float = 60.0,
+        compress: bool = True,
+    ) -> None:
+        self.key_variable = key_variable
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self.compress = compress
+
+        # appends and pops of a deque are atomic, so readers don't take
+        # locks; the length check could let a few more exposures in when
+        # threads append concurrently
+        self._buffer: deque[Exposure] = deque()
+        # (kind, name, key) -> time when the read is recorded again
+        self._seen: dict[tuple[str, str, Any], float] = {}
+
+        self._counters_lock = threading.Lock()
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+
+        self._manager: Optional[BaseManager] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def context_key(
+        self, ctx: Union[Mapping[str, Any], "TypedContext", None]
+    ) -> Any:
+        if self.key_variable is None or ctx is None:
+            return None
+        return ctx.get(self.key_variable)
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        key: Any,
+        result: Union[bool, int, str],
+    ) -> None:
+        now = time.time()
+        seen_key: Optional[tuple[str, str, Any]] = (kind, name, key)
+        try:
+            if self._seen.get(seen_key, 0.0) > now:  # type: ignore
+                return
+        except TypeError:
+            # unhashable context key, it is not deduplicated
+            seen_key = None
+
+        if len(self._buffer) >= self.capacity:
+            with self._counters_lock:
+                self.dropped += 1
+            return
+        self._buffer.append((kind, name, key, result, now))
+        if seen_key is not None:
+            self._seen[seen_key] = now + self.dedupe_window
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _take(self) -> list[Exposure]:
+        batch: list[Exposure] = []
+        popleft = self._buffer.popleft
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _prune(self) -> None:
+        # exposures recorded while the dict is rebuilt could be recorded
+        # again, before their window is over; readers write to the dict
+        # concurrently, so a copy of its items is iterated
+        now = time.time()
+        self._seen = {
+            key: until for key, until in list(self._seen.items()) if until > now
+        }
+
+    def encode(self, project: str, batch: list[Exposure]) -> bytes:
+        payload = json.dumps(
+            {
+                "project": project,
+                "exposures": [
+                    {
+                        "kind": kind,
+                        "name": name,
+                        "key": key,
+                        "result": result,
+                        "timestamp": timestamp,
+                    }
+                    for kind, name, key, result, timestamp in batch
+                ],
+            },
+            default=str,
+        ).encode()
+        if self.compress:
+            import gzip
+
+            payload = gzip.compress(payload)
+        return payload
+
+    def _headers(self) -> Optional[dict[str, str]]:
+        return {"Content-Encoding": "gzip"} if self.compress else None
+
+    def _sent(self, batch: list[Exposure], error: Optional[Exception]) -> None:
+        with self._counters_lock:
+            if error is None:
+                self.sent += len(batch)
+            else:
+                self.failed += len(batch)
+        if error is not None:
+            log.error("Failed to send %d exposures: %r", len(batch), error)
+
+    def flush(self, manager: "BaseManager") -> None:
+        """
+        Sends all recorded exposures, with a sync manager.
+        """
+        self._prune()
+        while batch := self._take():
+            payload = self.encode(manager._state.project, batch)
+            try:
+                manager._post_raw(
+                    Endpoints.EXPOSURES,
+                    payload,
+                    manager._request_timeout,
+                    self._headers(),
+                )
+            except Exception as exc:
+                self._sent(batch, exc)
+            else:
+                self._sent(batch, None)
+
+    async def flush_async(self, manager: "BaseManager") -> None:
+        """
+        Sends all recorded exposures, with an async manager.
+        """
+        self._prune()
+        while batch := self._take():
+            payload = self.encode(manager._state.project, batch)
+            try:
+                await manager._post_raw(  # type: ignore
+                    Endpoints.EXPOSURES,
+                    payload,
+                    manager._request_timeout,
+                    self._headers(),
+                )
+            except Exception as exc:
+                self._sent(batch, exc)
+            else:
+                self._sent(batch, None)
+
+    def start(self, manager: "BaseManager") -> None:
+        """
+        Starts sending exposures in the background: in a task with an async
+        manager, has to be called in the running event loop, in a daemon
+        thread otherwise.
+        """
+        from featureflags_client.http.managers.base import AsyncBaseManager
+
+        if self._manager is not None:
+            raise RuntimeError("Exposure log is already started")
+        self._manager = manager
+
+        if isinstance(manager, AsyncBaseManager):
+            import asyncio
+
+            self._task = asyncio.create_task(self._flush_loop_async())
+        else:
+            self._thread = threading.Thread(
+                target=self._flush_loop,
+                name="featureflags-exposures",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _flush_loop(self) -> None:
+        assert self._manager is not None
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush(self._manager)
+            except Exception:
+                log.exception("Failed to flush exposures")
+
+    async def _flush_loop_async(self) -> None:
+        import asyncio
+
+        assert self._manager is not None
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async(self._manager)
+            except Exception:
+                log.exception("Failed to flush exposures")
+
+    def close(self) -> None:
+        """
+        Stops the background thread and sends remaining exposures.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._manager is not None:
+            self.flush(self._manager)
+
+    async def wait_closed(self) -> None:
+        """
+        Stops the background task and sends remaining exposures.
+        """
+        import asyncio
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._manager is not None:
+            await self.flush_async(self._manager)
@@ -1,6 +1,13 @@
-from typing import Any, Optional
+from collections.abc import Mapping
+from typing import Any, Optional, Union
 
+from featureflags_client.http.conditions import Constant
+from featureflags_client.http.context import TypedContext
+from featureflags_client.http.exposures import ExposureLog
 from featureflags_client.http.managers.base import BaseManager
+from featureflags_client.http.metrics import FLAG, EvaluationMetrics
+from featureflags_client.http.options import with_masks
+from featureflags_client.http.state import StateSnapshot
 
 
 class Flags:
@@ -8,16 +15,33 @@ class Flags:
     Flags object to access current flags state.
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         manager: BaseManager,
-        ctx: Optional[dict[str, Any]] = None,
+        ctx: Union[Mapping[str, Any], TypedContext, None] = None,
         overrides: Optional[dict[str, bool]] = None,
+        metrics: Optional[EvaluationMetrics] = None,
+        exposures: Optional[ExposureLog] = None,
+        snapshot: Optional[StateSnapshot] = None,
     ) -> None:
-        self._manager = manager
         self._defaults = manager.defaults
+        # pin state for the whole request
+        if snapshot is None:
+            snapshot = manager.get_snapshot()
         self._ctx = ctx or {}
+        if type(self._ctx) is snapshot.context_type:
+            self._procs = snapshot.typed_flags
+        else:
+            self._procs = snapshot.flags
+            if snapshot.universes and isinstance(self._ctx, dict):
+                self._ctx = with_masks(self._ctx, snapshot.universes)
         self._overrides = overrides or {}
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.observe_rejected(snapshot.rejected)
+        self._exposures = exposures
+        if exposures is not None:
+            self._exposure_key = exposures.context_key(ctx)
 
     def __getattr__(self, name: str) -> bool:
         default = self._defaults.get(name)
@@ -26,9 +50,24 @@ class Flags:
 
         value = self._overrides.get(name)
         if value is None:
-            check = self._manager.get_flag(name)
-            value = check(self._ctx) if check is not None else default
+            check = self._procs.get(name)
+            if self._metrics is not None:
+                value = bool(
+                    self._metrics.resolve(FLAG, name, check, self._ctx, default)
+                )
+            elif check is None:
+                value = default
+            elif type(check) is Constant:
+                # doesn't depend on the context
+                value = check.value
+            else:
+                value = check(self._ctx)
+        elif self._metrics is not None:
+            self._metrics.record(FLAG, name, value)
 
-        # caching/snapshotting
-        setattr(self, name, value)
-        return value
+        if self._exposures is not None:
+            self._exposures.record(FLAG, name, self._exposure_key, value)
+
+        # caching/snapshotting, readers of the same object in other threads
+        # get the value which was stored first
+        return self.__dict__.setdefault(name, value)
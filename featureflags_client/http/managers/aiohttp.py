@@ -1,22 +1,31 @@
+import json
 import logging
 from enum import EnumMeta
-from typing import Any, Optional, Union
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from featureflags_client.http.constants import Endpoints
 from featureflags_client.http.managers.base import (
     AsyncBaseManager,
+    _sends_raw,
 )
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.tracing import SyncHooks
 from featureflags_client.http.types import (
     Variable,
 )
 
-try:
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
     import aiohttp
-except ImportError:
+
+# `aiohttp` is imported when the first request is sent
+if find_spec("aiohttp") is None:
     raise ImportError(
         "`aiohttp` is not installed, please install it to use AiohttpManager "
         "like this `pip install 'featureflags-client[aiohttp]'`"
-    ) from None
+    )
 
 log = logging.getLogger(__name__)
 
@@ -35,6 +44,9 @@ class AiohttpManager(AsyncBaseManager):
         ] = None,
         request_timeout: int = 5,
         refresh_interval: int = 10,
+        sync_hooks: Optional[SyncHooks] = None,
+        executor: Optional["Executor"] = None,
+        compile_options: Optional[CompileOptions] = None,
     ) -> None:
         super().__init__(
             url,
@@ -44,24 +56,56 @@ class AiohttpManager(AsyncBaseManager):
             values_defaults,
             request_timeout,
             refresh_interval,
+            sync_hooks,
+            executor,
+            compile_options,
         )
-        self._session = aiohttp.ClientSession(base_url=url)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        # connections are shared with the parent, a new session is created
+        # on the first request
+        self._session = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                base_url=self.url,
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
 
     async def close(self) -> None:
-        await self._session.close()
+        if self._session is not None:
+            await self._session.close()
 
+    @_sends_raw
     async def _post(  # type: ignore
         self,
         url: Endpoints,
         payload: dict[str, Any],
         timeout: int,
     ) -> dict[str, Any]:
-        async with self._session.post(
+        content = await self._post_raw(
+            url, json.dumps(payload).encode(), timeout
+        )
+        return json.loads(content)
+
+    async def _post_raw(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        async with self._get_session().post(
             url=url.value,
-            json=payload,
+            data=payload,
+            headers=headers,
             timeout=timeout,
         ) as response:
             response.raise_for_status()
-            response_data = await response.json()
-
-        return response_data
+            return await response.read()
@@ -1,13 +1,22 @@
-import asyncio
+import gc
+import json
 import logging
+import os
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Mapping
 from dataclasses import asdict
 from datetime import datetime, timedelta
 from enum import EnumMeta
-from typing import Any, Callable, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar, Union
 
 from featureflags_client.http.constants import Endpoints
-from featureflags_client.http.state import HttpState
+from featureflags_client.http.context import TypedContext
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.state import HttpState, StateSnapshot
+from featureflags_client.http.tracing import SyncHooks, SyncStage, SyncTrace
 from featureflags_client.http.types import (
     PreloadFlagsRequest,
     PreloadFlagsResponse,
@@ -22,8 +31,14 @@ from featureflags_client.http.utils import (
     intervals_gen,
 )
 
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Executor
+
 log = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
 
 def _values_defaults_to_tuple(
     values: list[str], values_defaults: dict[str, Union[int, str]]
@@ -40,6 +55,86 @@ def _values_defaults_to_tuple(
     return result
 
 
+class _EncodedRequest:
+    """
+    JSON body of a request where only `version` changes between requests,
+    the rest is encoded once and the version is spliced in.
+    """
+
+    __slots__ = ("_prefix", "_suffix")
+
+    def __init__(
+        self, request: Union[PreloadFlagsRequest, SyncFlagsRequest]
+    ) -> None:
+        data = asdict(request, dict_factory=custom_asdict_factory)
+        del data["version"]
+        encoded = json.dumps(data).encode()
+        self._prefix = b'{"version": '
+        # `encoded` starts with "{"
+        self._suffix = b", " + encoded[1:] if data else b"}"
+
+    def encode(self, version: int) -> bytes:
+        return b"%s%d%s" % (self._prefix, version, self._suffix)
+
+
+# live managers, reset in forked children by a single hook, registered
+# when the first manager is created
+_managers: "weakref.WeakSet[BaseManager]" = weakref.WeakSet()
+_fork_hook_registered = False
+
+
+def _after_fork() -> None:
+    for manager in list(_managers):
+        manager._after_fork()
+
+
+def _track(manager: "BaseManager") -> None:
+    global _fork_hook_registered  # noqa: PLW0603
+    _managers.add(manager)
+    if not _fork_hook_registered and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_after_fork)
+        _fork_hook_registered = True
+
+
+def _sends_raw(func: Callable[..., _T]) -> Callable[..., _T]:
+    """
+    Marks `_post` of a manager which only wraps its `_post_raw`, requests
+    are sent with `_post_raw` then. Requests are sent with `_post` when it
+    is overridden by a subclass or patched in tests.
+    """
+    func._sends_raw = True  # type: ignore
+    return func
+
+
+def _decode_payload(
+    payload: bytes, headers: Optional[dict[str, str]]
+) -> dict[str, Any]:
+    # for managers which send requests only with `_post`
+    if headers is not None and headers.get("Content-Encoding") == "gzip":
+        import gzip
+
+        payload = gzip.decompress(payload)
+    return json.loads(payload)
+
+
+def _decode(content: bytes, trace: SyncTrace) -> dict[str, Any]:
+    trace.report.response_bytes = len(content)
+    with trace.stage(SyncStage.DECODE):
+        return json.loads(content)
+
+
+def _parse(
+    response_cls: type[Union[PreloadFlagsResponse, SyncFlagsResponse]],
+    response_raw: dict[str, Any],
+) -> Union[PreloadFlagsResponse, SyncFlagsResponse]:
+    # module level function, so it can be sent to a process pool; errors of
+    # dataclass-wizard can't be sent back from it, so they are converted
+    try:
+        return response_cls.from_dict(response_raw)
+    except Exception as exc:
+        raise ValueError(str(exc)) from None
+
+
 class BaseManager(ABC):
     """
     Base manager for using with sync http clients.
@@ -56,6 +151,8 @@ class BaseManager(ABC):
         ] = None,
         request_timeout: int = 5,
         refresh_interval: int = 60,  # 1 minute.
+        sync_hooks: Optional[SyncHooks] = None,
+        compile_options: Optional[CompileOptions] = None,
     ) -> None:
         self.url = url
         self.defaults = coerce_defaults(defaults)
@@ -71,12 +168,64 @@ class BaseManager(ABC):
             variables=variables,
             flags=list(self.defaults.keys()),
             values=list(self.values_defaults.keys()),
+            options=compile_options,
         )
 
         self._int_gen = intervals_gen(interval=refresh_interval)
         self._int_gen.send(None)
 
         self._next_sync = datetime.utcnow()
+        # held by the thread which syncs, see `_check_sync`
+        self._sync_lock = threading.Lock()
+
+        self._sync_hooks = sync_hooks or SyncHooks()
+        self._last_sync: Optional[float] = None
+
+        # bodies of requests are static except the version
+        self._preload_body = _EncodedRequest(
+            PreloadFlagsRequest(
+                project=self._state.project,
+                variables=self._state.variables,
+                flags=self._state.flags,
+                values=_values_defaults_to_tuple(
+                    self._state.values,
+                    self.values_defaults,
+                ),
+                version=0,
+            )
+        )
+        self._sync_body = _EncodedRequest(
+            SyncFlagsRequest(
+                project=self._state.project,
+                flags=self._state.flags,
+                values=self._state.values,
+                version=0,
+            )
+        )
+
+        # forked workers inherit compiled state, but not connections,
+        # threads and tasks
+        _track(self)
+
+    def _after_fork(self) -> None:
+        """
+        Called in a forked child process, resets what can't be shared with
+        the parent.
+        """
+        self._state.after_fork()
+        self._sync_lock = threading.Lock()
+
+    def freeze(self) -> None:
+        """
+        Moves compiled state, and all other objects tracked by the garbage
+        collector at the moment, to the permanent generation. Collections
+        in forked workers don't touch them, so their memory pages stay
+        shared copy-on-write. Call it in the master process after
+        `preload`, right before workers are forked; calling `gc.disable()`
+        before preload and `gc.enable()` in workers keeps pages even more
+        compact, see `gc.freeze`.
+        """
+        gc.freeze()
 
     @abstractmethod
     def _post(
@@ -85,94 +234,244 @@ class BaseManager(ABC):
         payload: dict[str, Any],
         timeout: int,
     ) -> dict[str, Any]:
-        pass
+        """
+        Send request to the server and return decoded response.
+        """
 
-    def _check_sync(self) -> None:
-        if datetime.utcnow() >= self._next_sync:
-            try:
-                self.sync()
-            except Exception as exc:
-                self._next_sync = datetime.utcnow() + timedelta(
-                    seconds=self._int_gen.send(False)
-                )
-                log.error(
-                    "Failed to exchange: %r, retry after %s",
-                    exc,
-                    self._next_sync,
-                )
-            else:
-                self._next_sync = datetime.utcnow() + timedelta(
-                    seconds=self._int_gen.send(True)
+    def _post_raw(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        """
+        Send JSON encoded request to the server and return raw response
+        body, `headers` are sent in addition to the session ones. Override
+        it to send pre-encoded bodies as is, by default they are decoded
+        and sent with `_post`, without `headers`.
+        """
+        return json.dumps(
+            self._post(url, _decode_payload(payload, headers), timeout)
+        ).encode()
+
+    def _uses_post_raw(self) -> bool:
+        func = getattr(self._post, "__func__", None)
+        return getattr(func, "_sends_raw", False)
+
+    def _send(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        trace: SyncTrace,
+    ) -> dict[str, Any]:
+        if not self._uses_post_raw():
+            with trace.stage(SyncStage.NETWORK):
+                return self._post(
+                    url=url, payload=json.loads(payload), timeout=timeout
                 )
-                log.debug(
-                    "Exchange complete, next will be after %s",
-                    self._next_sync,
+
+        with trace.stage(SyncStage.NETWORK):
+            content = self._post_raw(url, payload, timeout)
+        return _decode(content, trace)
+
+    @property
+    def staleness(self) -> Optional[float]:
+        """
+        Seconds since the last successful sync, `None` if flags were
+        never synced.
+        """
+        if self._last_sync is None:
+            return None
+        return time.monotonic() - self._last_sync
+
+    def make_context(
+        self,
+        values: Optional[Mapping[str, Any]] = None,
+        **kwargs: Any,
+    ) -> TypedContext:
+        """
+        Builds typed context from values by variable names and keyword
+        arguments by attribute names, `user.id` becomes `user_id`. Values
+        are validated once here, with `CompileOptions.typed_context` flags
+        and values are checked without type checks and exception handling.
+        """
+        return self._state.context_type(values, **kwargs)
+
+    def subscribe(
+        self,
+        names: Iterable[str],
+        callback: Callable[[frozenset[str]], None],
+    ) -> Callable[[], None]:
+        """
+        Calls `callback` with names of flags and values which were changed
+        by a sync: their definitions or results which don't depend on the
+        context. Use it to rebuild objects configured by values only when
+        they are changed. Callbacks are called in the thread or task which
+        syncs, subscribe before `preload` to be called with its result.
+        Returns a function which cancels the subscription.
+        """
+        return self._state.subscribe(names, callback)
+
+    def _start_trace(self, url: Endpoints) -> SyncTrace:
+        return SyncTrace(self._sync_hooks, url, self.staleness)
+
+    def _finish_trace(
+        self,
+        trace: SyncTrace,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        if error is None:
+            self._last_sync = time.monotonic()
+        trace.finish(error)
+
+    def _apply(
+        self,
+        response_raw: dict[str, Any],
+        response_cls: type[Union[PreloadFlagsResponse, SyncFlagsResponse]],
+        trace: SyncTrace,
+    ) -> None:
+        with trace.stage(SyncStage.PARSE):
+            response = response_cls.from_dict(response_raw)
+
+        trace.report.version = response.version
+        outdated = self._is_outdated(response.version)
+        if outdated:
+            trace.report.flags_compiled = len(response.flags)
+            trace.report.values_compiled = len(response.values)
+
+        with trace.stage(SyncStage.COMPILE):
+            if outdated:
+                self._state.swap(
+                    self._state.compile(
+                        response.flags,
+                        response.values,
+                        response.version,
+                    )
                 )
 
+    def _is_outdated(self, version: int) -> bool:
+        """
+        Whether the state has to be compiled again for a response of the
+        given version.
+        """
+        return version != self._state.version
+
+    def _preload_payload(self) -> bytes:
+        log.debug(
+            "Exchange request, project: %s, version: %s, flags: %s, values: %s",
+            self._state.project,
+            self._state.version,
+            self._state.flags,
+            self._state.values,
+        )
+        return self._preload_body.encode(self._state.version)
+
+    def _sync_payload(self) -> bytes:
+        log.debug(
+            "Sync request, project: %s, version: %s, flags: %s, values: %s",
+            self._state.project,
+            self._state.version,
+            self._state.flags,
+            self._state.values,
+        )
+        return self._sync_body.encode(self._state.version)
+
+    def _exchange(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        response_cls: type[Union[PreloadFlagsResponse, SyncFlagsResponse]],
+    ) -> None:
+        trace = self._start_trace(url)
+        try:
+            response_raw = self._send(
+                url=url,
+                payload=payload,
+                timeout=self._request_timeout,
+                trace=trace,
+            )
+            log.debug(
+                "Exchange reply, url: %s, response: %s", url, response_raw
+            )
+            self._apply(response_raw, response_cls, trace)
+        except Exception as exc:
+            self._finish_trace(trace, exc)
+            raise
+        self._finish_trace(trace)
+
+    def _check_sync(self) -> None:
+        if datetime.utcnow() < self._next_sync:
+            return
+        # a single thread syncs, others don't wait for it and keep reading
+        # the current snapshot; until the state is loaded for the first time
+        # they wait, so they get results of the server instead of defaults
+        if not self._sync_lock.acquire(blocking=self._state.version == 0):
+            return
+        try:
+            # sync could be completed while the lock was acquired
+            if datetime.utcnow() >= self._next_sync:
+                self._sync_and_schedule()
+        finally:
+            self._sync_lock.release()
+
+    def _sync_and_schedule(self) -> None:
+        try:
+            self.sync()
+        except Exception as exc:
+            self._next_sync = datetime.utcnow() + timedelta(
+                seconds=self._int_gen.send(False)
+            )
+            log.error(
+                "Failed to exchange: %r, retry after %s",
+                exc,
+                self._next_sync,
+            )
+        else:
+            self._next_sync = datetime.utcnow() + timedelta(
+                seconds=self._int_gen.send(True)
+            )
+            log.debug(
+                "Exchange complete, next will be after %s",
+                self._next_sync,
+            )
+
+    def get_snapshot(self) -> StateSnapshot:
+        """
+        Current compiled state, `Flags` and `Values` pin it for the whole
+        request.
+        """
+        self._check_sync()
+        self._state.advance(time.time())
+        return self._state.snapshot
+
     def get_flag(self, name: str) -> Optional[Callable[[dict], bool]]:
         self._check_sync()
+        self._state.advance(time.time())
         return self._state.get_flag(name)
 
     def get_value(
         self, name: str
     ) -> Optional[Callable[[dict], Union[int, str]]]:
         self._check_sync()
+        self._state.advance(time.time())
         return self._state.get_value(name)
 
     def preload(self) -> None:
-        payload = PreloadFlagsRequest(
-            project=self._state.project,
-            variables=self._state.variables,
-            flags=self._state.flags,
-            values=_values_defaults_to_tuple(
-                self._state.values,
-                self.values_defaults,
-            ),
-            version=self._state.version,
-        )
-        log.debug(
-            "Exchange request, project: %s, version: %s, flags: %s, values: %s",
-            payload.project,
-            payload.version,
-            payload.flags,
-            payload.values,
-        )
-
-        response_raw = self._post(
-            url=Endpoints.PRELOAD,
-            payload=asdict(payload, dict_factory=custom_asdict_factory),
-            timeout=self._request_timeout,
+        self._exchange(
+            Endpoints.PRELOAD,
+            self._preload_payload(),
+            PreloadFlagsResponse,
         )
-        log.debug("Preload response: %s", response_raw)
-
-        response = PreloadFlagsResponse.from_dict(response_raw)
-        self._state.update(response.flags, response.values, response.version)
 
     def sync(self) -> None:
-        payload = SyncFlagsRequest(
-            project=self._state.project,
-            flags=self._state.flags,
-            values=self._state.values,
-            version=self._state.version,
-        )
-        log.debug(
-            "Sync request, project: %s, version: %s, flags: %s, values: %s",
-            payload.project,
-            payload.version,
-            payload.flags,
-            payload.values,
+        self._exchange(
+            Endpoints.SYNC,
+            self._sync_payload(),
+            SyncFlagsResponse,
         )
 
-        response_raw = self._post(
-            url=Endpoints.SYNC,
-            payload=asdict(payload, dict_factory=custom_asdict_factory),
-            timeout=self._request_timeout,
-        )
-        log.debug("Sync reply: %s", response_raw)
-
-        response = SyncFlagsResponse.from_dict(response_raw)
-        self._state.update(response.flags, response.values, response.version)
-
 
 class AsyncBaseManager(BaseManager):
     """
@@ -190,6 +489,9 @@ class AsyncBaseManager(BaseManager):
         ] = None,
         request_timeout: int = 5,
         refresh_interval: int = 10,
+        sync_hooks: Optional[SyncHooks] = None,
+        executor: Optional["Executor"] = None,
+        compile_options: Optional[CompileOptions] = None,
     ) -> None:
         super().__init__(
             url,
@@ -199,8 +501,25 @@ class AsyncBaseManager(BaseManager):
             values_defaults,
             request_timeout,
             refresh_interval,
+            sync_hooks,
+            compile_options,
         )
         self._refresh_task: Optional[asyncio.Task] = None
+        # refresh task was running before fork, see `_after_fork`
+        self._restart_pending = False
+
+        # When executor is given, decoding, parsing and compiling are done
+        # off the event loop, only the swap of the compiled state is done
+        # on the loop. Compiled state can't be transferred between
+        # processes, so with a process pool it is compiled in the loop's
+        # default thread pool.
+        self._executor = executor
+        self._compile_executor = executor
+        if executor is not None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            if isinstance(executor, ProcessPoolExecutor):
+                self._compile_executor = None
 
     @abstractmethod
     async def _post(  # type: ignore
@@ -211,83 +530,188 @@ class AsyncBaseManager(BaseManager):
     ) -> dict[str, Any]:
         pass
 
+    async def _post_raw(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        return json.dumps(
+            await self._post(url, _decode_payload(payload, headers), timeout)
+        ).encode()
+
+    async def _send(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        trace: SyncTrace,
+    ) -> dict[str, Any]:
+        if not self._uses_post_raw():
+            with trace.stage(SyncStage.NETWORK):
+                return await self._post(
+                    url=url, payload=json.loads(payload), timeout=timeout
+                )
+
+        with trace.stage(SyncStage.NETWORK):
+            content = await self._post_raw(url, payload, timeout)
+
+        trace.report.response_bytes = len(content)
+        with trace.stage(SyncStage.DECODE):
+            return await self._run_blocking(
+                trace, self._executor, json.loads, content
+            )
+
+    async def _run_blocking(
+        self,
+        trace: SyncTrace,
+        executor: Optional["Executor"],
+        func: Callable[..., _T],
+        *args: Any,
+    ) -> _T:
+        if self._executor is None:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                trace.report.loop_blocked_time += time.perf_counter() - started
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+
+    async def _apply_async(
+        self,
+        response_raw: dict[str, Any],
+        response_cls: type[Union[PreloadFlagsResponse, SyncFlagsResponse]],
+        trace: SyncTrace,
+    ) -> None:
+        with trace.stage(SyncStage.PARSE):
+            response = await self._run_blocking(
+                trace, self._executor, _parse, response_cls, response_raw
+            )
+
+        trace.report.version = response.version
+        with trace.stage(SyncStage.COMPILE):
+            if not self._is_outdated(response.version):
+                return
+
+            trace.report.flags_compiled = len(response.flags)
+            trace.report.values_compiled = len(response.values)
+            snapshot = await self._run_blocking(
+                trace,
+                self._compile_executor,
+                self._state.compile,
+                response.flags,
+                response.values,
+                response.version,
+            )
+
+        started = time.perf_counter()
+        self._state.swap(snapshot)
+        trace.report.loop_blocked_time += time.perf_counter() - started
+
+    async def _exchange(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        response_cls: type[Union[PreloadFlagsResponse, SyncFlagsResponse]],
+    ) -> None:
+        trace = self._start_trace(url)
+        try:
+            response_raw = await self._send(
+                url=url,
+                payload=payload,
+                timeout=self._request_timeout,
+                trace=trace,
+            )
+            log.debug(
+                "Exchange reply, url: %s, response: %s", url, response_raw
+            )
+            await self._apply_async(response_raw, response_cls, trace)
+        except Exception as exc:
+            self._finish_trace(trace, exc)
+            raise
+        self._finish_trace(trace)
+
     @abstractmethod
     async def close(self) -> None:
         pass
 
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        # task belongs to the parent's event loop, it is started again in
+        # the child's loop on the first access to the state
+        if self._refresh_task is not None:
+            self._refresh_task = None
+            self._restart_pending = True
+
+    def _restart_after_fork(self) -> None:
+        import asyncio
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # not in the event loop yet
+            return
+        self._restart_pending = False
+        self.start()
+
+    def get_snapshot(self) -> StateSnapshot:
+        if self._restart_pending:
+            self._restart_after_fork()
+        self._state.advance(time.time())
+        return self._state.snapshot
+
     def get_flag(self, name: str) -> Optional[Callable[[dict], bool]]:
+        if self._restart_pending:
+            self._restart_after_fork()
+        self._state.advance(time.time())
         return self._state.get_flag(name)
 
     def get_value(
         self, name: str
     ) -> Optional[Callable[[dict], Union[int, str]]]:
+        if self._restart_pending:
+            self._restart_after_fork()
+        self._state.advance(time.time())
         return self._state.get_value(name)
 
     async def preload(self) -> None:  # type: ignore
         """
         Preload flags and values from the server.
         """
-
-        payload = PreloadFlagsRequest(
-            project=self._state.project,
-            variables=self._state.variables,
-            flags=self._state.flags,
-            values=_values_defaults_to_tuple(
-                self._state.values,
-                self.values_defaults,
-            ),
-            version=self._state.version,
+        await self._exchange(
+            Endpoints.PRELOAD,
+            self._preload_payload(),
+            PreloadFlagsResponse,
         )
-        log.debug(
-            "Exchange request, project: %s, version: %s, flags: %s, values: %s",
-            payload.project,
-            payload.version,
-            payload.flags,
-            payload.values,
-        )
-
-        response_raw = await self._post(
-            url=Endpoints.PRELOAD,
-            payload=asdict(payload, dict_factory=custom_asdict_factory),
-            timeout=self._request_timeout,
-        )
-        log.debug("Preload response: %s", response_raw)
-
-        response = PreloadFlagsResponse.from_dict(response_raw)
-        self._state.update(response.flags, response.values, response.version)
 
     async def sync(self) -> None:  # type: ignore
-        payload = SyncFlagsRequest(
-            project=self._state.project,
-            flags=self._state.flags,
-            values=self._state.values,
-            version=self._state.version,
+        await self._exchange(
+            Endpoints.SYNC,
+            self._sync_payload(),
+            SyncFlagsResponse,
         )
-        log.debug(
-            "Sync request, project: %s, version: %s, flags: %s, values: %s",
-            payload.project,
-            payload.version,
-            payload.flags,
-            payload.values,
-        )
-
-        response_raw = await self._post(
-            url=Endpoints.SYNC,
-            payload=asdict(payload, dict_factory=custom_asdict_factory),
-            timeout=self._request_timeout,
-        )
-        log.debug("Sync reply: %s", response_raw)
-
-        response = SyncFlagsResponse.from_dict(response_raw)
-        self._state.update(response.flags, response.values, response.version)
 
     def start(self) -> None:
         if self._refresh_task is not None:
             raise RuntimeError("Manager is already started")
 
+        import asyncio
+
         self._refresh_task = asyncio.create_task(self._refresh_loop())
 
     async def wait_closed(self) -> None:
+        import asyncio
+
+        if self._refresh_task is None:
+            # not started, or not restarted after fork yet
+            await self.close()
+            return
+
         self._refresh_task.cancel()
         await asyncio.wait([self._refresh_task])
 
@@ -303,6 +727,8 @@ class AsyncBaseManager(BaseManager):
         await self.close()
 
     async def _refresh_loop(self) -> None:
+        import asyncio
+
         log.info("Flags refresh task started")
 
         while True:
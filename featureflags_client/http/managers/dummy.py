@@ -38,6 +38,15 @@ class DummyManager(BaseManager):
     ) -> dict[str, Any]:
         pass
 
+    def _post_raw(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        pass
+
 
 class AsyncDummyManager(AsyncBaseManager):
     """Dummy feature flags manager for asyncio apps.
@@ -61,6 +70,15 @@ class AsyncDummyManager(AsyncBaseManager):
     ) -> dict[str, Any]:
         pass
 
+    async def _post_raw(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        pass
+
     async def close(self) -> None:
         pass
 
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import logging
+import os
+from enum import EnumMeta
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.managers.base import (
+    AsyncBaseManager,
+    BaseManager,
+    _decode,
+)
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.tracing import SyncHooks, SyncStage
+from featureflags_client.http.types import (
+    PreloadFlagsResponse,
+    Variable,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+log = logging.getLogger(__name__)
+
+
+def _check_url(url: Endpoints) -> None:
+    # exposures and other requests can't be sent, they shouldn't be counted
+    # as sent
+    if url not in (Endpoints.PRELOAD, Endpoints.SYNC):
+        raise RuntimeError(f"Requests to {url.value} are not supported")
+
+
+class _SnapshotFile:
+    """
+    Local file with a preload response, tracks changes of its content.
+    """
+
+    __slots__ = ("_digest", "_stat", "path")
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        self.path = os.fspath(path)
+        self._stat: Optional[tuple[int, int]] = None
+        self._digest: Optional[bytes] = None
+
+    def reset(self) -> None:
+        self._stat = None
+        self._digest = None
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def read_changed(self) -> Optional[bytes]:
+        """
+        Returns content of the file, `None` if it wasn't changed since the
+        last call. Content is read only when modification time or size of
+        the file is changed, and it is considered changed only when its
+        hash is changed too.
+        """
+        stat = os.stat(self.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return None
+
+        content = self.read()
+        self._stat = key
+        digest = hashlib.sha256(content).digest()
+        if digest == self._digest:
+            return None
+        self._digest = digest
+        return content
+
+
+class FileManager(BaseManager):
+    """Feature flags and values manager which loads them from a local file.
+
+    File has to contain a preload response of the flags server, flags and
+    values are compiled the same way as for other managers, so their
+    conditions are evaluated without access to the server. File is checked
+    every `refresh_interval` seconds and flags and values are compiled again
+    when its content is changed, readers keep using the current state in
+    the meantime.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        project: str,
+        variables: list[Variable],
+        defaults: Union[EnumMeta, type, dict[str, bool]],
+        values_defaults: Optional[
+            Union[EnumMeta, type, dict[str, Union[int, str]]]
+        ] = None,
+        refresh_interval: int = 10,
+        sync_hooks: Optional[SyncHooks] = None,
+        compile_options: Optional[CompileOptions] = None,
+    ) -> None:
+        self._file = _SnapshotFile(path)
+        super().__init__(
+            self._file.path,
+            project,
+            variables,
+            defaults,
+            values_defaults,
+            5,
+            refresh_interval,
+            sync_hooks,
+            compile_options,
+        )
+
+    def preload(self) -> None:
+        """
+        Load flags and values from the file, even if it wasn't changed.
+        """
+        self._file.reset()
+        self._reload(Endpoints.PRELOAD)
+
+    def sync(self) -> None:
+        self._reload(Endpoints.SYNC)
+
+    def _reload(self, url: Endpoints) -> None:
+        # reading of the file is reported as the network stage
+        trace = self._start_trace(url)
+        try:
+            with trace.stage(SyncStage.NETWORK):
+                content = self._file.read_changed()
+            if content is not None:
+                log.info("Loading flags and values from %s", self._file.path)
+                response_raw = _decode(content, trace)
+                self._apply(response_raw, PreloadFlagsResponse, trace)
+        except Exception as exc:
+            self._finish_trace(trace, exc)
+            raise
+        self._finish_trace(trace)
+
+    def _is_outdated(self, version: int) -> bool:
+        # content of the file was changed, version could be the same
+        return True
+
+    def _post(
+        self,
+        url: Endpoints,
+        payload: dict[str, Any],
+        timeout: int,
+    ) -> dict[str, Any]:
+        return json.loads(self._post_raw(url, b"", timeout))
+
+    def _post_raw(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        _check_url(url)
+        return self._file.read()
+
+
+class AsyncFileManager(AsyncBaseManager):
+    """Feature flags and values manager for asyncio apps which loads them
+    from a local file.
+
+    See `FileManager`, the file is checked by the refresh task started with
+    `start()`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        project: str,
+        variables: list[Variable],
+        defaults: Union[EnumMeta, type, dict[str, bool]],
+        values_defaults: Optional[
+            Union[EnumMeta, type, dict[str, Union[int, str]]]
+        ] = None,
+        refresh_interval: int = 10,
+        sync_hooks: Optional[SyncHooks] = None,
+        executor: Optional["Executor"] = None,
+        compile_options: Optional[CompileOptions] = None,
+    ) -> None:
+        self._file = _SnapshotFile(path)
+        super().__init__(
+            self._file.path,
+            project,
+            variables,
+            defaults,
+            values_defaults,
+            5,
+            refresh_interval,
+            sync_hooks,
+            executor,
+            compile_options,
+        )
+
+    async def preload(self) -> None:  # type: ignore
+        """
+        Load flags and values from the file, even if it wasn't changed.
+        """
+        self._file.reset()
+        await self._reload(Endpoints.PRELOAD)
+
+    async def sync(self) -> None:  # type: ignore
+        await self._reload(Endpoints.SYNC)
+
+    async def _reload(self, url: Endpoints) -> None:
+        trace = self._start_trace(url)
+        try:
+            with trace.stage(SyncStage.NETWORK):
+                # tracked file state is kept in this process
+                content = await self._run_blocking(
+                    trace, self._compile_executor, self._file.read_changed
+                )
+            if content is not None:
+                log.info("Loading flags and values from %s", self._file.path)
+                trace.report.response_bytes = len(content)
+                with trace.stage(SyncStage.DECODE):
+                    response_raw = await self._run_blocking(
+                        trace, self._executor, json.loads, content
+                    )
+                await self._apply_async(
+                    response_raw, PreloadFlagsResponse, trace
+                )
+        except Exception as exc:
+            self._finish_trace(trace, exc)
+            raise
+        self._finish_trace(trace)
+
+    def _is_outdated(self, version: int) -> bool:
+        # content of the file was changed, version could be the same
+        return True
+
+    async def _post(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: dict[str, Any],
+        timeout: int,
+    ) -> dict[str, Any]:
+        return json.loads(await self._post_raw(url, b"", timeout))
+
+    async def _post_raw(  # type: ignore
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        _check_url(url)
+
+        import asyncio
+
+        # in the default executor, when there is none, not to block the loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._file.read)
+
+    async def close(self) -> None:
+        pass
@@ -1,24 +1,30 @@
+import json
 import logging
 from enum import EnumMeta
-from typing import Any, Optional, Union
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Optional, Union
+from urllib.parse import urljoin
 
 from featureflags_client.http.constants import Endpoints
 from featureflags_client.http.managers.base import (
     BaseManager,
+    _sends_raw,
 )
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.tracing import SyncHooks
 from featureflags_client.http.types import (
     Variable,
 )
 
-try:
-    from urllib.parse import urljoin
-
+if TYPE_CHECKING:
     import requests
-except ImportError:
+
+# `requests` is imported when the first request is sent
+if find_spec("requests") is None:
     raise ImportError(
         "`requests` is not installed, please install it to use RequestsManager "
         "like this `pip install 'featureflags-client[requests]'`"
-    ) from None
+    )
 
 log = logging.getLogger(__name__)
 
@@ -37,6 +43,8 @@ class RequestsManager(BaseManager):
         ] = None,
         request_timeout: int = 5,
         refresh_interval: int = 10,
+        sync_hooks: Optional[SyncHooks] = None,
+        compile_options: Optional[CompileOptions] = None,
     ) -> None:
         super().__init__(
             url,
@@ -46,21 +54,47 @@ class RequestsManager(BaseManager):
             values_defaults,
             request_timeout,
             refresh_interval,
+            sync_hooks,
+            compile_options,
         )
-        self._session = requests.Session()
-        self._session.headers.update({"Content-Type": "application/json"})
+        self._session: Optional[requests.Session] = None
+
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        # connections are shared with the parent, a new session is created
+        # on the first request
+        self._session = None
+
+    def _get_session(self) -> "requests.Session":
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+            self._session.headers.update({"Content-Type": "application/json"})
+        return self._session
 
+    @_sends_raw
     def _post(
         self,
         url: Endpoints,
         payload: dict[str, Any],
         timeout: int,
     ) -> dict[str, Any]:
-        response = self._session.post(
+        content = self._post_raw(url, json.dumps(payload).encode(), timeout)
+        return json.loads(content)
+
+    def _post_raw(
+        self,
+        url: Endpoints,
+        payload: bytes,
+        timeout: int,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        response = self._get_session().post(
             url=urljoin(self.url, url.value),
-            json=payload,
+            data=payload,
+            headers=headers,
             timeout=timeout,
         )
         response.raise_for_status()
-        response_data = response.json()
-        return response_data
+        return response.content
@@ -0,0 +1,287 @@
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any, Callable, Union
+
+from featureflags_client.http.conditions import Constant
+
+FLAG = "flag"
+VALUE = "value"
+
+DEFAULT_BUCKETS = (
+    0.000_001,
+    0.000_002_5,
+    0.000_005,
+    0.000_01,
+    0.000_025,
+    0.000_05,
+    0.000_1,
+    0.000_25,
+    0.000_5,
+    0.001,
+)
+
+
+class MetricsSink(ABC):
+    """
+    Receives per-flag/value evaluation metrics. Implement it to export
+    metrics into your monitoring system, see `PrometheusMetrics` for a
+    reference implementation.
+
+    `kind` is either `FLAG` or `VALUE`.
+    """
+
+    def declare(self, kind: str, names: Iterable[str]) -> None:  # noqa: B027
+        """
+        Called once with all names known to the client, so names which are
+        never read can be reported too.
+        """
+
+    @abstractmethod
+    def record_evaluation(
+        self,
+        kind: str,
+        name: str,
+        result: Union[bool, int, str],
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def record_latency(self, kind: str, name: str, seconds: float) -> None:
+        pass
+
+    def record_rejected(  # noqa: B027
+        self, rejected: Iterable[tuple[str, str, str]]
+    ) -> None:
+        """
+        Called with `(kind, name, reason)` of all checks rejected by the
+        compiler in the current state, every time they change, see
+        `CompileOptions.reject_unsafe_patterns`.
+        """
+
+
+class EvaluationMetrics:
+    """
+    Instrumentation layer for `Flags` and `Values`, pass it to the
+    `FeatureFlagsClient` to enable it.
+
+    Every read is counted together with its result, evaluation latency is
+    measured only for a `latency_sample_rate` share of evaluations.
+    """
+
+    def __init__(
+        self,
+        sink: MetricsSink,
+        latency_sample_rate: float = 0.01,
+    ) -> None:
+        self.sink = sink
+        self._sample_rate = latency_sample_rate
+        self._random = random.random
+        self._rejected: tuple[tuple[str, str, str], ...] = ()
+
+    def declare(self, kind: str, names: Iterable[str]) -> None:
+        self.sink.declare(kind, names)
+
+    def observe_rejected(
+        self, rejected: tuple[tuple[str, str, str], ...]
+    ) -> None:
+        """
+        Reports rejected checks of a pinned snapshot, when they change.
+        """
+        if rejected is not self._rejected:
+            self._rejected = rejected
+            self.sink.record_rejected(rejected)
+
+    def evaluate(
+        self,
+        kind: str,
+        name: str,
+        proc: Callable[[Any], Union[bool, int, str]],
+        ctx: Any,
+    ) -> Union[bool, int, str]:
+        if self._random() < self._sample_rate:
+            started = time.perf_counter()
+            result = proc(ctx)
+            self.sink.record_latency(kind, name, time.perf_counter() - started)
+        else:
+            result = proc(ctx)
+
+        self.sink.record_evaluation(kind, name, result)
+        return result
+
+    def resolve(
+        self,
+        kind: str,
+        name: str,
+        check: Any,
+        ctx: Any,
+        default: Union[bool, int, str],
+    ) -> Union[bool, int, str]:
+        """
+        Resolve flag or value same way as `Flags` and `Values` do, counting
+        the read.
+        """
+        if type(check) is Constant:
+            # doesn't depend on the context, it is not evaluated
+            check = check.value
+        elif callable(check):
+            return self.evaluate(kind, name, check, ctx)
+
+        result = check if check is not None else default
+        self.record(kind, name, result)
+        return result
+
+    def record(
+        self,
+        kind: str,
+        name: str,
+        result: Union[bool, int, str],
+    ) -> None:
+        """Count a read which didn't require evaluation."""
+        self.sink.record_evaluation(kind, name, result)
+
+
+def _label(value: Any) -> str:
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_le(bound: float) -> str:
+    return repr(bound) if bound != float("inf") else "+Inf"
+
+
+class PrometheusMetrics(MetricsSink):
+    """
+    In-memory metrics sink which renders collected metrics in the
+    Prometheus text exposition format, serve `render()` result from your
+    `/metrics` endpoint.
+    """
+
+    def __init__(
+        self,
+        prefix: str = "featureflags",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.prefix = prefix
+        self.buckets = (*sorted(buckets), float("inf"))
+
+        self.evaluations: dict[tuple[str, str], int] = {}
+        self.results: dict[tuple[str, str, str], int] = {}
+        # (bucket counts, sum, count)
+        self.latencies: dict[tuple[str, str], tuple[list[int], float, int]] = {}
+        self.rejected: dict[tuple[str, str, str], int] = {}
+
+        self._lock = threading.Lock()
+
+    def declare(self, kind: str, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                self.evaluations.setdefault((kind, name), 0)
+
+    def record_evaluation(
+        self,
+        kind: str,
+        name: str,
+        result: Union[bool, int, str],
+    ) -> None:
+        key = (kind, name)
+        result_key = (kind, name, _label(result))
+        with self._lock:
+            self.evaluations[key] = self.evaluations.get(key, 0) + 1
+            self.results[result_key] = self.results.get(result_key, 0) + 1
+
+    def record_latency(self, kind: str, name: str, seconds: float) -> None:
+        idx = bisect_left(self.buckets, seconds)
+        key = (kind, name)
+        with self._lock:
+            counts, total, count = self.latencies.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            counts[idx] += 1
+            self.latencies[key] = (counts, total + seconds, count + 1)
+
+    def record_rejected(self, rejected: Iterable[tuple[str, str, str]]) -> None:
+        counts: dict[tuple[str, str, str], int] = {}
+        for key in rejected:
+            counts[key] = counts.get(key, 0) + 1
+        with self._lock:
+            self.rejected = counts
+
+    def render(self) -> str:
+        with self._lock:
+            rejected = dict(self.rejected)
+            evaluations = dict(self.evaluations)
+            results = dict(self.results)
+            latencies = {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self.latencies.items()
+            }
+
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_evaluations_total Number of reads.",
+            f"# TYPE {p}_evaluations_total counter",
+        ]
+        lines.extend(
+            f'{p}_evaluations_total{{kind="{kind}",name="{_label(name)}"}} '
+            f"{count}"
+            for (kind, name), count in sorted(evaluations.items())
+        )
+
+        lines.extend(
+            [
+                f"# HELP {p}_results_total Number of reads by result.",
+                f"# TYPE {p}_results_total counter",
+            ]
+        )
+        lines.extend(
+            f'{p}_results_total{{kind="{kind}",name="{_label(name)}",'
+            f'result="{result}"}} {count}'
+            for (kind, name, result), count in sorted(results.items())
+        )
+
+        lines.extend(
+            [
+                f"# HELP {p}_evaluation_duration_seconds "
+                "Sampled evaluation latency.",
+                f"# TYPE {p}_evaluation_duration_seconds histogram",
+            ]
+        )
+        for (kind, name), (counts, total, count) in sorted(latencies.items()):
+            labels = f'kind="{kind}",name="{_label(name)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{p}_evaluation_duration_seconds_bucket"
+                    f'{{{labels},le="{_format_le(bound)}"}} {cumulative}'
+                )
+            lines.append(
+                f"{p}_evaluation_duration_seconds_sum{{{labels}}} {total!r}"
+            )
+            lines.append(
+                f"{p}_evaluation_duration_seconds_count{{{labels}}} {count}"
+            )
+
+        lines.extend(
+            [
+                f"# HELP {p}_rejected_checks Checks rejected by the compiler.",
+                f"# TYPE {p}_rejected_checks gauge",
+            ]
+        )
+        lines.extend(
+            f'{p}_rejected_checks{{kind="{kind}",name="{_label(name)}",'
+            f'reason="{reason}"}} {count}'
+            for (kind, name, reason), count in sorted(rejected.items())
+        )
+
+        return "\n".join(lines) + "\n"
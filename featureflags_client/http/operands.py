@@ -0,0 +1,157 @@
+"""
+Compact storage for list operands of SUBSET and SUPERSET checks.
+
+Operands are sets of strings on the wire. Small ones are kept as
+`frozenset`, large ones as sorted arrays searched with bisect: numeric ids
+as an `array` of int64, other strings as a tuple of interned strings.
+Operands are shared between checks through the `OperandPool`.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+# operands with fewer items are kept as `frozenset`, which is faster and
+# has negligible overhead for small sets
+COMPACT_MIN_SIZE = 64
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+class SortedOperand:
+    """
+    Sorted sequence of unique items with set-like membership tests.
+    """
+
+    __slots__ = ("_items",)
+
+    _items: Any
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Any:
+        return iter(self._items)
+
+    def _key(self, item: Any) -> Any:
+        raise NotImplementedError
+
+    def __contains__(self, item: Any) -> bool:
+        key = self._key(item)
+        if key is None:
+            return False
+
+        items = self._items
+        idx = bisect_left(items, key)
+        return idx < len(items) and items[idx] == key
+
+    def issuperset(self, other: Iterable) -> bool:
+        return all(item in self for item in other)
+
+    def issubset(self, other: Iterable) -> bool:
+        if not isinstance(other, (set, frozenset)):
+            other = set(other)
+        if len(self) > len(other):
+            return False
+        # items are unique, so all of them are in `other` if it contains
+        # as many of them as there are
+        return sum(1 for item in other if item in self) == len(self)
+
+
+class IntOperand(SortedOperand):
+    """
+    Strings with canonical decimal integers, stored as an int64 array.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, numbers: Iterable[int]) -> None:
+        self._items = array("q", sorted(set(numbers)))
+
+    def _key(self, item: Any) -> Optional[int]:
+        if type(item) is not str:
+            return None
+        try:
+            number = int(item)
+        except ValueError:
+            return None
+        # "01", " 1" or "1_0" are not equal to "1" and "10"
+        return number if str(number) == item else None
+
+    def __iter__(self) -> Any:
+        return map(str, self._items)
+
+
+class StrOperand(SortedOperand):
+    """
+    Strings stored as a sorted tuple of interned strings.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, strings: Iterable[str]) -> None:
+        self._items = tuple(sorted(set(map(sys.intern, strings))))
+
+    def _key(self, item: Any) -> Optional[str]:
+        return item if type(item) is str else None
+
+
+Operand = Union[frozenset, SortedOperand]
+
+
+def _as_int64(strings: tuple[str, ...]) -> Optional[list[int]]:
+    numbers = []
+    for string in strings:
+        if not string[-1:].isdigit():
+            return None
+        try:
+            number = int(string)
+        except ValueError:
+            return None
+        if str(number) != string or not _INT64_MIN <= number <= _INT64_MAX:
+            return None
+        numbers.append(number)
+    return numbers
+
+
+def compact(items: tuple) -> Operand:
+    """
+    Returns the most compact representation of the operand.
+
+    Raises `TypeError` if items are not hashable.
+    """
+    if len(items) < COMPACT_MIN_SIZE or not all(
+        type(item) is str for item in items
+    ):
+        return frozenset(items)
+
+    numbers = _as_int64(items)
+    if numbers is not None:
+        return IntOperand(numbers)
+    return StrOperand(items)
+
+
+class OperandPool:
+    """
+    Shares operands between all checks compiled with this pool, so flags
+    and values with the same list keep a single copy of it.
+    """
+
+    def __init__(self) -> None:
+        self._operands: dict[tuple, Operand] = {}
+
+    def __len__(self) -> int:
+        return len(self._operands)
+
+    def get(self, value: Iterable) -> Operand:
+        if isinstance(value, (frozenset, SortedOperand)):
+            return value
+
+        items = tuple(value)
+        operand = self._operands.get(items)
+        if operand is None:
+            operand = self._operands[items] = compact(items)
+        return operand
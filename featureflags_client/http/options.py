@@ -0,0 +1,120 @@
+import copy
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from featureflags_client.http.context import TypedContext
+
+
+class SetUniverse:
+    """
+    Known members of a SET variable, each one gets its own bit. Members
+    which are not known in advance share a single `unknown` bit.
+    """
+
+    __slots__ = ("bits", "name", "unknown")
+
+    def __init__(self, name: str, members: Iterable[str]) -> None:
+        self.name = name
+        self.bits = {
+            member: 1 << idx
+            for idx, member in enumerate(dict.fromkeys(members))
+        }
+        self.unknown = 1 << len(self.bits)
+
+    def mask(self, items: Any) -> Optional[int]:
+        """
+        Returns mask of the context value, `None` if it is not a collection
+        of hashable items.
+        """
+        bits = self.bits
+        unknown = self.unknown
+        mask = 0
+        try:
+            for item in items:
+                mask |= bits.get(item, unknown)
+        except TypeError:
+            return None
+        return mask
+
+    def operand_mask(self, items: Iterable) -> tuple[int, bool]:
+        """
+        Returns mask of known operand members and whether there are unknown
+        ones.
+        """
+        mask = self.mask(items) or 0
+        return mask & ~self.unknown, bool(mask & self.unknown)
+
+
+@dataclass
+class CompileOptions:
+    """
+    Options of the flags and values compiler, pass them to the manager.
+    """
+
+    # Members of SET variables, known in advance. SUBSET and SUPERSET
+    # checks of these variables are compiled into bitmask operations and
+    # context values are converted into bitmasks once per `Flags` or
+    # `Values` object. Members which are not listed are still handled
+    # correctly, but slower.
+    set_universes: dict[str, list[str]] = field(default_factory=dict)
+
+    # TIMESTAMP variable with the current time. Its checks are compared
+    # with the clock instead of the context, and flags and values which
+    # compare it only with fixed times are precomputed for each time
+    # segment, see `featureflags_client.http.schedule`.
+    now_variable: Optional[str] = None
+
+    # Compile a second set of procs for typed contexts, built with
+    # `manager.make_context()`. They read context attributes directly and
+    # skip type checks, plain dicts are still supported.
+    typed_context: bool = False
+
+    # REGEXP checks with patterns which could backtrack catastrophically,
+    # like `(a+)+`, are compiled into checks which are always false, see
+    # `featureflags_client.http.patterns`. Invalid patterns are always
+    # rejected. Rejected checks are reported by `EvaluationMetrics`.
+    reject_unsafe_patterns: bool = True
+
+    # REGEXP and WILDCARD checks are false for strings longer than this.
+    max_match_length: Optional[int] = None
+
+    universes: dict[str, SetUniverse] = field(init=False, repr=False)
+    # set when compiling procs for typed contexts
+    context_type: Optional[type["TypedContext"]] = field(
+        init=False, repr=False, default=None
+    )
+
+    def __post_init__(self) -> None:
+        self.universes = {
+            name: SetUniverse(name, members)
+            for name, members in self.set_universes.items()
+        }
+
+    def for_context(
+        self, context_type: type["TypedContext"]
+    ) -> "CompileOptions":
+        """
+        Returns options for compiling procs for the given context type.
+        """
+        options = copy.copy(self)
+        options.context_type = context_type
+        return options
+
+
+def with_masks(
+    ctx: dict[str, Any],
+    universes: dict[str, SetUniverse],
+) -> dict[Any, Any]:
+    """
+    Returns a copy of the context with bitmasks of SET variables, stored
+    under their `SetUniverse` as a key.
+    """
+    prepared: dict[Any, Any] = dict(ctx)
+    for name, universe in universes.items():
+        if name in ctx:
+            mask = universe.mask(ctx[name])
+            if mask is not None:
+                prepared[universe] = mask
+    return prepared
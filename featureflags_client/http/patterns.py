@@ -0,0 +1,337 @@
+"""
+Safety of REGEXP and WILDCARD checks.
+
+Patterns come from the server and are matched against request data, so a
+pattern with catastrophic backtracking could stall a worker. REGEXP
+patterns are analyzed when they are compiled and patterns with nested
+quantifiers which could match the same text in many ways, like ``(a+)+``
+or ``(\\w+\\s?)*``, are rejected. WILDCARD patterns are matched without
+regular expressions at all.
+"""
+
+import re
+import string
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+if sys.version_info >= (3, 11):
+    from re import _constants as sre_constants  # type: ignore[attr-defined]
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+else:
+    import sre_constants
+    import sre_parse
+
+INVALID = "invalid pattern"
+NESTED_QUANTIFIERS = "nested quantifiers"
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+# quantifiers which never backtrack, Python 3.11+
+_POSSESSIVE = getattr(sre_constants, "POSSESSIVE_REPEAT", None)
+_ATOMIC = getattr(sre_constants, "ATOMIC_GROUP", None)
+
+_ASCII_END = 128
+_ASCII = frozenset(range(_ASCII_END))
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: frozenset(map(ord, string.digits)),
+    sre_constants.CATEGORY_WORD: frozenset(
+        map(ord, string.ascii_letters + string.digits + "_")
+    ),
+    sre_constants.CATEGORY_SPACE: frozenset(map(ord, string.whitespace)),
+}
+_NOT_CATEGORIES = {
+    sre_constants.CATEGORY_NOT_DIGIT: sre_constants.CATEGORY_DIGIT,
+    sre_constants.CATEGORY_NOT_WORD: sre_constants.CATEGORY_WORD,
+    sre_constants.CATEGORY_NOT_SPACE: sre_constants.CATEGORY_SPACE,
+}
+
+# Characters a pattern item could match: ASCII codes and whether it could
+# match non-ASCII characters too. Sets are approximate, but never smaller
+# than the real ones.
+_Chars = tuple[frozenset[int], bool]
+_ANY: _Chars = (_ASCII, True)
+_NONE: _Chars = (frozenset(), False)
+
+
+def _union(*chars: _Chars) -> _Chars:
+    return (
+        frozenset().union(*(ascii_ for ascii_, _ in chars)),
+        any(non_ascii for _, non_ascii in chars),
+    )
+
+
+def _literal(code: int) -> _Chars:
+    if code < _ASCII_END:
+        return frozenset((code,)), False
+    return frozenset(), True
+
+
+def _in_chars(items: list[tuple[Any, Any]]) -> _Chars:
+    chars: list[_Chars] = []
+    negate = False
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            chars.append(_literal(av))
+        elif op is sre_constants.RANGE:
+            low, high = av
+            chars.append(
+                (
+                    frozenset(range(low, min(high + 1, _ASCII_END))),
+                    high >= _ASCII_END,
+                )
+            )
+        elif op is sre_constants.CATEGORY and av in _CATEGORIES:
+            chars.append((_CATEGORIES[av], True))
+        elif op is sre_constants.CATEGORY and av in _NOT_CATEGORIES:
+            chars.append((_ASCII - _CATEGORIES[_NOT_CATEGORIES[av]], True))
+        else:
+            return _ANY
+    ascii_, non_ascii = _union(*chars)
+    if negate:
+        return _ASCII - ascii_, True
+    return ascii_, non_ascii
+
+
+def _chars(items: Any) -> _Chars:
+    """
+    Characters which could be matched by a sequence of pattern items.
+    """
+    chars: list[_Chars] = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            chars.append(_literal(av))
+        elif op is sre_constants.NOT_LITERAL:
+            chars.append((_ASCII - {av}, True))
+        elif op is sre_constants.ANY:
+            return _ANY
+        elif op is sre_constants.IN:
+            chars.append(_in_chars(av))
+        elif op in _REPEATS or op is _POSSESSIVE:
+            chars.append(_chars(av[2]))
+        elif op is sre_constants.SUBPATTERN:
+            chars.append(_chars(av[-1]))
+        elif op is sre_constants.BRANCH:
+            chars.extend(_chars(branch) for branch in av[1])
+        elif op is sre_constants.AT:
+            # anchors don't match characters
+            continue
+        else:
+            return _ANY
+    return _union(*chars) if chars else _NONE
+
+
+def _disjoint(left: _Chars, right: _Chars) -> bool:
+    return not left[0] & right[0] and not (left[1] and right[1])
+
+
+def _unbounded(items: Any) -> list[Any]:
+    """
+    Bodies of unbounded quantifiers which could backtrack, at any depth.
+    """
+    bodies = []
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] == sre_constants.MAXREPEAT:
+                bodies.append(av[2])
+            bodies.extend(_unbounded(av[2]))
+        elif op is sre_constants.SUBPATTERN:
+            bodies.extend(_unbounded(av[-1]))
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                bodies.extend(_unbounded(branch))
+    return bodies
+
+
+def _separators(items: Any) -> list[_Chars]:
+    """
+    Characters of the single character items which are always matched by
+    the sequence.
+    """
+    separators = []
+    for op, av in items:
+        if op is sre_constants.SUBPATTERN:
+            separators.extend(_separators(av[-1]))
+        elif op in (
+            sre_constants.LITERAL,
+            sre_constants.NOT_LITERAL,
+            sre_constants.IN,
+        ):
+            separators.append(_chars([(op, av)]))
+    return separators
+
+
+def _ambiguous(body: Any, ignore_case: bool) -> bool:
+    """
+    Whether repeated body could match the same text in many ways: it
+    contains unbounded quantifiers and nothing it always matches separates
+    their matches.
+    """
+    inner = _unbounded(body)
+    if not inner:
+        return False
+    inner_chars = _fold(_union(*map(_chars, inner)), ignore_case)
+    return not any(
+        _disjoint(_fold(separator, ignore_case), inner_chars)
+        for separator in _separators(body)
+    )
+
+
+def _fold(chars: _Chars, ignore_case: bool) -> _Chars:
+    if not ignore_case:
+        return chars
+    ascii_, non_ascii = chars
+    letters = "".join(
+        map(chr, ascii_ & _CATEGORIES[sre_constants.CATEGORY_WORD])
+    )
+    return ascii_ | set(map(ord, letters.swapcase())), non_ascii
+
+
+def _children(op: Any, av: Any) -> list[Any]:
+    """
+    Sequences of pattern items nested into an item.
+    """
+    children: list[Any] = []
+    if op in _REPEATS or op is _POSSESSIVE:
+        children.append(av[2])
+    elif op is sre_constants.SUBPATTERN:
+        children.append(av[-1])
+    elif op is sre_constants.BRANCH:
+        children.extend(av[1])
+    elif op is _ATOMIC:
+        children.append(av)
+    elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        children.append(av[1])
+    elif op is sre_constants.GROUPREF_EXISTS:
+        children.extend(items for items in av[1:] if items is not None)
+    return children
+
+
+def _nested(items: Any, ignore_case: bool) -> bool:
+    for op, av in items:
+        if op in _REPEATS and av[1] > 1 and _ambiguous(av[2], ignore_case):
+            return True
+        if any(_nested(child, ignore_case) for child in _children(op, av)):
+            return True
+    return False
+
+
+def pattern_problem(pattern: Any) -> Optional[str]:
+    """
+    Returns why a REGEXP pattern is rejected, `None` if it is safe.
+    """
+    if not isinstance(pattern, str):
+        return INVALID
+    return _analyze(pattern)
+
+
+# the same patterns are compiled on every sync
+@lru_cache(maxsize=1024)
+def _analyze(pattern: str) -> Optional[str]:
+    try:
+        parsed = sre_parse.parse(pattern)
+        re.compile(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return INVALID
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    if _nested(parsed, ignore_case):
+        return NESTED_QUANTIFIERS
+    return None
+
+
+def _find_parts(value: str, parts: list[str], pos: int, end: int) -> bool:
+    for part in parts:
+        pos = value.find(part, pos, end)
+        if pos < 0:
+            return False
+        pos += len(part)
+    return True
+
+
+def _line_matcher(pattern: str) -> Callable[[str], bool]:
+    """
+    Returns matcher of strings without newlines by a pattern without
+    newlines. Parts between stars are found one by one with `str.find`,
+    leftmost match of each part is always the best one, so nothing is
+    backtracked.
+    """
+    prefix, *parts = pattern.split("*")
+    if not parts:
+
+        def exact(value: str) -> bool:
+            return value == pattern
+
+        return exact
+
+    suffix = parts.pop()
+    parts = [part for part in parts if part]
+    min_length = len(prefix) + len(suffix)
+
+    if not parts and not suffix:
+        # the most common pattern, `prefix*`
+
+        def starts(value: str) -> bool:
+            return value.startswith(prefix)
+
+        return starts
+
+    def affixes(value: str) -> bool:
+        return (
+            len(value) >= min_length
+            and value.startswith(prefix)
+            and value.endswith(suffix)
+        )
+
+    if not parts:
+        return affixes
+
+    def match(value: str) -> bool:
+        return affixes(value) and _find_parts(
+            value, parts, len(prefix), len(value) - len(suffix)
+        )
+
+    return match
+
+
+def wildcard_matcher(
+    pattern: str, max_length: Optional[int] = None
+) -> Callable[[str], bool]:
+    """
+    Returns matcher of strings by a wildcard pattern, where `*` matches any
+    characters, in linear time. Results are the same as of the `^...$`
+    regular expression, with `.*` for stars: `*` doesn't match newlines and
+    a trailing newline of the string is ignored. So lines of the string are
+    matched by lines of the pattern one by one. Strings longer than
+    `max_length` are not matched. Matcher raises `TypeError` or
+    `AttributeError` for values which are not strings.
+    """
+    limit = max_length if max_length is not None else sys.maxsize
+    first, *rest = map(_line_matcher, pattern.split("\n"))
+
+    if not rest:
+
+        def line(value: str) -> bool:
+            if len(value) > limit:
+                return False
+            end = value.find("\n")
+            if end < 0:
+                return first(value)
+            return end == len(value) - 1 and first(value[:end])
+
+        return line
+
+    lines = [first, *rest]
+
+    def match(value: str) -> bool:
+        if len(value) > limit:
+            return False
+        values = value.split("\n")
+        if len(values) == len(lines) + 1 and not values[-1]:
+            values.pop()
+        return len(values) == len(lines) and all(
+            line_match(line_value)
+            for line_match, line_value in zip(lines, values)
+        )
+
+    return match
@@ -0,0 +1,212 @@
+"""
+Scheduled transitions of flags and values which depend on the current time.
+
+When `CompileOptions.now_variable` is set, checks of this variable are
+compared with the current time instead of the context. For flags and
+values where all such checks are comparisons with fixed timestamps, the
+result of every check is constant between the operands, so the compiler
+precomputes a proc for each of these time segments, without time checks,
+and the state switches between them when the time comes.
+"""
+
+import math
+from bisect import bisect_right
+from typing import Any, Callable, Optional
+
+from featureflags_client.http.conditions import (
+    TIMESTAMP_OPERATIONS_MAP,
+    flag_proc,
+    value_proc,
+)
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.types import (
+    Check,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+)
+from featureflags_client.http.utils import to_timestamp
+
+
+class Timeline:
+    """
+    Procs of a single flag or value for each time segment, `procs[i]` is
+    used from `boundaries[i - 1]` until `boundaries[i]`.
+    """
+
+    __slots__ = ("boundaries", "procs")
+
+    def __init__(self, boundaries: list[float], procs: list[Callable]) -> None:
+        self.boundaries = boundaries
+        self.procs = procs
+
+    def at(self, now: float) -> tuple[Callable, float]:
+        """
+        Returns proc for the given time and time until it is valid.
+        """
+        idx = bisect_right(self.boundaries, now)
+        if idx < len(self.boundaries):
+            return self.procs[idx], self.boundaries[idx]
+        return self.procs[idx], math.inf
+
+
+def _boundaries(op: Operator, operand: float) -> list[float]:
+    # times at which the result of `now <op> operand` changes
+    after = math.nextafter(operand, math.inf)
+    if op is Operator.EQUAL:
+        return [operand, after]
+    if op in {Operator.LESS_OR_EQUAL, Operator.GREATER_THAN}:
+        return [after]
+    return [operand]
+
+
+def _now_operands(
+    conditions: list[Any],
+    now_variable: str,
+) -> Optional[dict[int, tuple[Operator, float]]]:
+    """
+    Returns operators and parsed operands of `now_variable` checks by check
+    id, `None` if there are no such checks or some of them can't be
+    scheduled.
+    """
+    operands = {}
+    for condition in conditions:
+        for check in condition.checks:
+            if check.variable.name != now_variable:
+                continue
+            operand = to_timestamp(check.value)
+            if check.operator not in TIMESTAMP_OPERATIONS_MAP or (
+                operand is None or math.isnan(operand)
+            ):
+                return None
+            operands[id(check)] = (check.operator, operand)
+    return operands or None
+
+
+def _specialize(
+    checks: list[Check],
+    now_variable: str,
+    operands: dict[int, tuple[Operator, float]],
+    now: float,
+) -> Optional[list[Check]]:
+    """
+    Returns checks left after replacing checks of `now_variable` with their
+    results, `None` if some of them is false.
+    """
+    rest = []
+    for check in checks:
+        if check.variable.name != now_variable:
+            rest.append(check)
+        else:
+            op, operand = operands[id(check)]
+            if not TIMESTAMP_OPERATIONS_MAP[op](now, operand):
+                return None
+    return rest
+
+
+def _flag_at(
+    flag: Flag,
+    now_variable: str,
+    operands: dict[int, tuple[Operator, float]],
+    now: float,
+) -> Flag:
+    conditions = []
+    for condition in flag.conditions:
+        rest = _specialize(condition.checks, now_variable, operands, now)
+        if rest is None:
+            continue
+        if not rest and condition.checks:
+            # condition is true for everyone
+            return Flag(flag.name, enabled=True, overridden=True, conditions=[])
+        conditions.append(Condition(checks=rest))
+
+    if not conditions:
+        return Flag(flag.name, enabled=False, overridden=True, conditions=[])
+    return Flag(flag.name, flag.enabled, overridden=True, conditions=conditions)
+
+
+def _value_at(
+    value: Value,
+    now_variable: str,
+    operands: dict[int, tuple[Operator, float]],
+    now: float,
+) -> Value:
+    conditions = []
+    value_override = value.value_override
+    for condition in value.conditions:
+        rest = _specialize(condition.checks, now_variable, operands, now)
+        if rest is None:
+            continue
+        if not rest and condition.checks:
+            # first match wins, following conditions are never checked
+            value_override = condition.value_override
+            break
+        conditions.append(
+            ValueCondition(checks=rest, value_override=condition.value_override)
+        )
+
+    return Value(
+        name=value.name,
+        enabled=value.enabled,
+        overridden=True,
+        value_default=value.value_default,
+        value_override=value_override,
+        conditions=conditions,
+    )
+
+
+def _timeline(
+    item: Any,
+    at: Callable[..., Any],
+    compile_proc: Callable[..., Optional[Callable]],
+    pool: OperandPool,
+    options: CompileOptions,
+) -> Optional[Timeline]:
+    now_variable = options.now_variable
+    if not now_variable or not item.overridden or not item.enabled:
+        return None
+
+    operands = _now_operands(item.conditions, now_variable)
+    if operands is None:
+        return None
+
+    boundaries = sorted(
+        {
+            boundary
+            for op, operand in operands.values()
+            for boundary in _boundaries(op, operand)
+        }
+    )
+
+    # any time within a segment gives the same results
+    points = [math.nextafter(boundaries[0], -math.inf), *boundaries]
+    procs = []
+    for point in points:
+        specialized = at(item, now_variable, operands, point)
+        procs.append(compile_proc(specialized, pool, options))
+    return Timeline(boundaries, procs)
+
+
+def flag_timeline(
+    flag: Flag,
+    pool: OperandPool,
+    options: CompileOptions,
+) -> Optional[Timeline]:
+    """
+    Returns timeline of the flag, `None` if it doesn't depend on time.
+    """
+    return _timeline(flag, _flag_at, flag_proc, pool, options)
+
+
+def value_timeline(
+    value: Value,
+    pool: OperandPool,
+    options: CompileOptions,
+) -> Optional[Timeline]:
+    """
+    Returns timeline of the value, `None` if it doesn't depend on time.
+    """
+    return _timeline(value, _value_at, value_proc, pool, options)
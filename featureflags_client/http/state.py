@@ -1,15 +1,228 @@
+import logging
+import math
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Union
+from collections.abc import Iterable
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Optional, Union
 
 from featureflags_client.http.conditions import (
+    Constant,
+    rejected_pattern,
     update_flags_state,
     update_values_state,
 )
+from featureflags_client.http.context import TypedContext, make_context_type
+from featureflags_client.http.metrics import FLAG, VALUE
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions, SetUniverse
+from featureflags_client.http.schedule import (
+    Timeline,
+    flag_timeline,
+    value_timeline,
+)
 from featureflags_client.http.types import (
     Flag,
+    Operator,
     Value,
     Variable,
 )
+from featureflags_client.http.utils import retained_size
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """
+    Compiled flags and values of a single version. Snapshots are never
+    modified after creation, state update replaces the whole snapshot, so
+    readers which pinned a snapshot always see a consistent version.
+    """
+
+    version: int = 0
+    flags: dict[str, Callable[..., bool]] = field(default_factory=dict)
+    values: dict[str, Callable[..., Union[int, str]]] = field(
+        default_factory=dict
+    )
+    # SET variables compiled into bitmasks, see `CompileOptions`
+    universes: dict[str, SetUniverse] = field(default_factory=dict)
+    # procs of flags and values which depend on the current time, for each
+    # time segment, see `featureflags_client.http.schedule`
+    flag_timelines: dict[str, Timeline] = field(default_factory=dict)
+    value_timelines: dict[str, Timeline] = field(default_factory=dict)
+    # time of the next transition, when procs have to be switched
+    valid_until: float = math.inf
+    # names of variables used by checks of flags and values, see
+    # `LazyContext.resolve`
+    variables: frozenset[str] = frozenset()
+    # procs compiled for contexts of this type, set only when
+    # `CompileOptions.typed_context` is enabled
+    context_type: Optional[type[TypedContext]] = None
+    typed_flags: dict[str, Callable[..., bool]] = field(default_factory=dict)
+    typed_values: dict[str, Callable[..., Union[int, str]]] = field(
+        default_factory=dict
+    )
+    # fingerprints of definitions of flags and values with subscriptions,
+    # see `HttpState.subscribe`
+    fingerprints: dict[str, int] = field(default_factory=dict)
+    # (kind, name, reason) of REGEXP checks compiled into false checks, see
+    # `CompileOptions.reject_unsafe_patterns`
+    rejected: tuple[tuple[str, str, str], ...] = ()
+
+    def retained_size(self) -> int:
+        """
+        Approximate memory in bytes retained by compiled procs of the
+        snapshot, see `featureflags_client.http.utils.retained_size`.
+        """
+        return retained_size(
+            self.flags,
+            self.values,
+            self.flag_timelines,
+            self.value_timelines,
+            self.typed_flags,
+            self.typed_values,
+        )
+
+    def constant_flags(self) -> dict[str, bool]:
+        """
+        Results of flags which don't depend on the context, in the current
+        time segment. Flags which are not in `flags` at all use defaults from
+        the client code, they are constant too.
+        """
+        return {
+            name: proc.value
+            for name, proc in self.flags.items()
+            if type(proc) is Constant
+        }
+
+    def constant_values(self) -> dict[str, Union[int, str]]:
+        """
+        Results of values which don't depend on the context, in the current
+        time segment.
+        """
+        return {
+            name: proc.value
+            for name, proc in self.values.items()
+            if type(proc) is Constant
+        }
+
+    def at(self, now: float) -> "StateSnapshot":
+        """
+        Returns snapshot with procs of time segments for the given time.
+        """
+        if not self.flag_timelines and not self.value_timelines:
+            return self
+
+        valid_until = math.inf
+        flags = dict(self.flags)
+        typed_flags = dict(self.typed_flags)
+        for name, timeline in self.flag_timelines.items():
+            flags[name], until = timeline.at(now)
+            valid_until = min(valid_until, until)
+            if self.context_type is not None:
+                # generic procs support typed contexts too
+                typed_flags[name] = flags[name]
+
+        values = dict(self.values)
+        typed_values = dict(self.typed_values)
+        for name, timeline in self.value_timelines.items():
+            values[name], until = timeline.at(now)
+            valid_until = min(valid_until, until)
+            if self.context_type is not None:
+                typed_values[name] = values[name]
+
+        return replace(
+            self,
+            flags=flags,
+            values=values,
+            typed_flags=typed_flags,
+            typed_values=typed_values,
+            valid_until=valid_until,
+        )
+
+
+def _fingerprints(
+    definitions: Iterable[Union[Flag, Value]],
+    names: frozenset[str],
+) -> dict[str, int]:
+    fingerprints: dict[str, int] = {}
+    for definition in definitions:
+        if definition.name in names:
+            # flag and value could have the same name
+            fingerprints[definition.name] = hash(
+                (fingerprints.get(definition.name), repr(definition))
+            )
+    return fingerprints
+
+
+def _static_result(procs: dict[str, Any], name: str) -> Any:
+    proc = procs.get(name)
+    if not callable(proc):
+        return proc
+    try:
+        return proc({})
+    except Exception:
+        return None
+
+
+class _Subscription:
+    __slots__ = ("callback", "last", "names", "unknown")
+
+    def __init__(
+        self,
+        names: frozenset[str],
+        callback: Callable[[frozenset[str]], None],
+    ) -> None:
+        self.names = names
+        self.callback = callback
+        # name -> (fingerprint, flag result, value result)
+        self.last: dict[str, tuple[Optional[int], Any, Any]] = {}
+        # names with unknown fingerprints, snapshots compiled before the
+        # subscription don't have them, only results of these names are
+        # compared until a snapshot with their fingerprints
+        self.unknown: set[str] = set()
+
+
+def _used_variables(flags: list[Flag], values: list[Value]) -> frozenset[str]:
+    conditions: list[Any] = [
+        *(c for flag in flags for c in flag.conditions),
+        *(c for value in values for c in value.conditions),
+    ]
+    return frozenset(
+        check.variable.name
+        for condition in conditions
+        for check in condition.checks
+    )
+
+
+def _rejected_checks(
+    flags: list[Flag],
+    values: list[Value],
+    options: CompileOptions,
+) -> tuple[tuple[str, str, str], ...]:
+    rejected = []
+    definitions: list[tuple[str, Any]] = [
+        *((FLAG, flag) for flag in flags),
+        *((VALUE, value) for value in values),
+    ]
+    for kind, definition in definitions:
+        for condition in definition.conditions:
+            for check in condition.checks:
+                if check.operator is not Operator.REGEXP or check.value is None:
+                    continue
+                reason = rejected_pattern(check.value, options)
+                if reason is not None:
+                    log.warning(
+                        "Check of %s %s is rejected: %s, pattern %r",
+                        kind,
+                        definition.name,
+                        reason,
+                        check.value,
+                    )
+                    rejected.append((kind, definition.name, reason))
+    return tuple(rejected)
 
 
 class BaseState(ABC):
@@ -17,10 +230,9 @@ class BaseState(ABC):
     flags: list[str]
     values: list[str]
     project: str
-    version: int
-
-    _flags_state: dict[str, Callable[..., bool]]
-    _values_state: dict[str, Callable[..., Union[int, str]]]
+    snapshot: StateSnapshot
+    options: CompileOptions
+    context_type: type[TypedContext]
 
     def __init__(
         self,
@@ -28,23 +240,28 @@ class BaseState(ABC):
         variables: list[Variable],
         flags: list[str],
         values: list[str],
+        options: Optional[CompileOptions] = None,
     ) -> None:
         self.project = project
         self.variables = variables
-        self.version = 0
         self.flags = flags
         self.values = values
+        self.options = options or CompileOptions()
+        self.context_type = make_context_type(variables)
+
+        self.snapshot = StateSnapshot()
 
-        self._flags_state = {}
-        self._values_state = {}
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
 
     def get_flag(self, name: str) -> Optional[Callable[[dict], bool]]:
-        return self._flags_state.get(name)
+        return self.snapshot.flags.get(name)
 
     def get_value(
         self, name: str
     ) -> Optional[Callable[[dict], Union[int, str]]]:
-        return self._values_state.get(name)
+        return self.snapshot.values.get(name)
 
     @abstractmethod
     def update(
@@ -57,6 +274,151 @@ class BaseState(ABC):
 
 
 class HttpState(BaseState):
+    def __init__(
+        self,
+        project: str,
+        variables: list[Variable],
+        flags: list[str],
+        values: list[str],
+        options: Optional[CompileOptions] = None,
+    ) -> None:
+        super().__init__(project, variables, flags, values, options)
+        self._swap_lock = threading.Lock()
+
+        self._subscriptions: list[_Subscription] = []
+        self._subscribed: frozenset[str] = frozenset()
+        # callbacks are called one at a time, they could read the state
+        self._notify_lock = threading.RLock()
+
+    def compile(
+        self,
+        flags: list[Flag],
+        values: list[Value],
+        version: int,
+    ) -> StateSnapshot:
+        # operands are shared between flags and values of a single snapshot
+        pool = OperandPool()
+
+        flag_timelines = {}
+        value_timelines = {}
+        if self.options.now_variable:
+            for flag in flags:
+                timeline = flag_timeline(flag, pool, self.options)
+                if timeline is not None:
+                    flag_timelines[flag.name] = timeline
+            for value in values:
+                timeline = value_timeline(value, pool, self.options)
+                if timeline is not None:
+                    value_timelines[value.name] = timeline
+
+        untimed_flags = [f for f in flags if f.name not in flag_timelines]
+        untimed_values = [v for v in values if v.name not in value_timelines]
+
+        context_type = None
+        typed_flags = {}
+        typed_values = {}
+        if self.options.typed_context:
+            context_type = self.context_type
+            typed_options = self.options.for_context(self.context_type)
+            typed_flags = update_flags_state(untimed_flags, pool, typed_options)
+            typed_values = update_values_state(
+                untimed_values, pool, typed_options
+            )
+
+        snapshot = StateSnapshot(
+            version=version,
+            flags=update_flags_state(untimed_flags, pool, self.options),
+            values=update_values_state(untimed_values, pool, self.options),
+            universes=self.options.universes,
+            flag_timelines=flag_timelines,
+            value_timelines=value_timelines,
+            variables=_used_variables(flags, values),
+            context_type=context_type,
+            typed_flags=typed_flags,
+            typed_values=typed_values,
+            fingerprints=_fingerprints([*flags, *values], self._subscribed),
+            rejected=_rejected_checks(flags, values, self.options),
+        )
+        return snapshot.at(time.time())
+
+    def after_fork(self) -> None:
+        # lock could be held by another thread at the moment of fork
+        self._swap_lock = threading.Lock()
+        self._notify_lock = threading.RLock()
+
+    def swap(self, snapshot: StateSnapshot) -> None:
+        # single reference assignment, readers never see a mix of versions
+        with self._swap_lock:
+            self.snapshot = snapshot
+        if self._subscriptions:
+            self._notify()
+
+    def subscribe(
+        self,
+        names: Iterable[str],
+        callback: Callable[[frozenset[str]], None],
+    ) -> Callable[[], None]:
+        """
+        Calls `callback` with names of changed flags and values, when their
+        definitions or results for an empty context are changed by an
+        update, or by a transition of time for scheduled ones. Returns a
+        function which cancels the subscription.
+        """
+        subscription = _Subscription(frozenset(names), callback)
+        with self._notify_lock:
+            # snapshot which is being swapped is notified after this one
+            with self._swap_lock:
+                snapshot = self.snapshot
+            for name in subscription.names:
+                subscription.last[name] = self._key(snapshot, name)
+                # snapshots compiled before, including the ones which are
+                # compiled right now, don't have fingerprints of these
+                # definitions
+                if name not in snapshot.fingerprints:
+                    subscription.unknown.add(name)
+            self._subscriptions = [*self._subscriptions, subscription]
+            self._subscribed = self._subscribed | subscription.names
+
+        def unsubscribe() -> None:
+            with self._notify_lock:
+                self._subscriptions = [
+                    s for s in self._subscriptions if s is not subscription
+                ]
+
+        return unsubscribe
+
+    def _key(
+        self, snapshot: StateSnapshot, name: str
+    ) -> tuple[Optional[int], Any, Any]:
+        return (
+            snapshot.fingerprints.get(name),
+            _static_result(snapshot.flags, name),
+            _static_result(snapshot.values, name),
+        )
+
+    def _notify(self) -> None:
+        with self._notify_lock:
+            # the latest snapshot, swaps could be notified out of order
+            snapshot = self.snapshot
+            for subscription in self._subscriptions:
+                changed = set()
+                for name in subscription.names:
+                    key = self._key(snapshot, name)
+                    last = subscription.last[name]
+                    if name in subscription.unknown:
+                        if key[0] is not None:
+                            subscription.unknown.discard(name)
+                        last = (key[0], *last[1:])
+                    if key != last:
+                        changed.add(name)
+                    subscription.last[name] = key
+                if not changed:
+                    continue
+                try:
+                    subscription.callback(frozenset(changed))
+                except Exception:
+                    log.exception("Subscription callback failed")
+
     def update(
         self,
         flags: list[Flag],
@@ -64,6 +426,20 @@ class HttpState(BaseState):
         version: int,
     ) -> None:
         if self.version != version:
-            self._flags_state = update_flags_state(flags)
-            self._values_state = update_values_state(values)
-            self.version = version
+            self.swap(self.compile(flags, values, version))
+
+    def advance(self, now: float) -> None:
+        """
+        Switches flags and values which depend on the current time to the
+        procs of the given time, when the next transition has come.
+        """
+        snapshot = self.snapshot
+        if now >= snapshot.valid_until:
+            advanced = snapshot.at(now)
+            with self._swap_lock:
+                # state could be updated in the meantime
+                if self.snapshot is not snapshot:
+                    return
+                self.snapshot = advanced
+            if self._subscriptions:
+                self._notify()
@@ -0,0 +1,126 @@
+import logging
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Optional
+
+from featureflags_client.http.constants import Endpoints
+
+log = logging.getLogger(__name__)
+
+
+class SyncStage(Enum):
+    NETWORK = "network"
+    DECODE = "decode"
+    PARSE = "parse"
+    COMPILE = "compile"
+
+
+@dataclass
+class SyncReport:
+    """
+    Summary of a single `preload` or `sync` call, times are in seconds.
+    """
+
+    endpoint: Endpoints
+    success: bool = False
+    version: Optional[int] = None
+    network_time: float = 0.0
+    decode_time: float = 0.0
+    parse_time: float = 0.0
+    compile_time: float = 0.0
+    response_bytes: int = 0
+    flags_compiled: int = 0
+    values_compiled: int = 0
+    # time the event loop was blocked by decoding, parsing and compiling,
+    # async managers only
+    loop_blocked_time: float = 0.0
+    # age of the last successful sync when this one started, `None` if
+    # there were no successful syncs yet
+    staleness: Optional[float] = None
+    error: Optional[BaseException] = None
+
+
+class SyncHooks:
+    """
+    Hook points around each stage of the managers sync pipeline, override
+    methods you are interested in and pass an instance to the manager.
+
+    Hooks are called synchronously from the sync path and must be cheap.
+    `stage_started` and `stage_finished` are always called in pairs, so they
+    can be used to open and close tracing spans, `sync_started` and
+    `sync_finished` wrap the whole exchange.
+    """
+
+    def sync_started(self, endpoint: Endpoints) -> None:
+        pass
+
+    def stage_started(self, stage: SyncStage, endpoint: Endpoints) -> None:
+        pass
+
+    def stage_finished(
+        self,
+        stage: SyncStage,
+        endpoint: Endpoints,
+        duration: float,
+    ) -> None:
+        pass
+
+    def sync_finished(self, report: SyncReport) -> None:
+        pass
+
+
+_STAGE_FIELDS = {
+    SyncStage.NETWORK: "network_time",
+    SyncStage.DECODE: "decode_time",
+    SyncStage.PARSE: "parse_time",
+    SyncStage.COMPILE: "compile_time",
+}
+
+
+def _safe_call(hook: Callable[..., None], *args: Any) -> None:
+    try:
+        hook(*args)
+    except Exception:
+        log.exception("Sync hook %r failed", hook)
+
+
+class SyncTrace:
+    """
+    Collects `SyncReport` for a single exchange and calls hooks.
+    """
+
+    def __init__(
+        self,
+        hooks: SyncHooks,
+        endpoint: Endpoints,
+        staleness: Optional[float] = None,
+    ) -> None:
+        self._hooks = hooks
+        self.report = SyncReport(endpoint=endpoint, staleness=staleness)
+        _safe_call(hooks.sync_started, endpoint)
+
+    @contextmanager
+    def stage(self, stage: SyncStage) -> Generator[None, None, None]:
+        endpoint = self.report.endpoint
+        _safe_call(self._hooks.stage_started, stage, endpoint)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - started
+            field_name = _STAGE_FIELDS[stage]
+            setattr(
+                self.report,
+                field_name,
+                getattr(self.report, field_name) + duration,
+            )
+            _safe_call(self._hooks.stage_finished, stage, endpoint, duration)
+
+    def finish(self, error: Optional[BaseException] = None) -> SyncReport:
+        self.report.success = error is None
+        self.report.error = error
+        _safe_call(self._hooks.sync_finished, self.report)
+        return self.report
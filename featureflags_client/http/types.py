@@ -1,8 +1,9 @@
+import json
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Union
+from typing import Any, Callable, TypeVar, Union
 
-from dataclass_wizard import JSONWizard
+_R = TypeVar("_R", bound="_Response")
 
 
 class VariableType(Enum):
@@ -90,8 +91,66 @@ class PreloadFlagsRequest:
     values: list[tuple[str, Union[str, int]]] = field(default_factory=list)
 
 
+class _Response:
+    """
+    Conversion of responses from and to JSON, the same methods as of
+    `dataclass_wizard.JSONWizard`. `dataclass_wizard` is imported and
+    builds its loaders on the first sync, instead of at import time, to
+    keep startup fast.
+    """
+
+    @classmethod
+    def from_dict(cls: type[_R], data: dict[str, Any]) -> _R:
+        from dataclass_wizard import fromdict
+
+        return fromdict(cls, data)
+
+    @classmethod
+    def from_list(cls: type[_R], data: list[dict[str, Any]]) -> list[_R]:
+        from dataclass_wizard import fromlist
+
+        return fromlist(cls, data)
+
+    @classmethod
+    def from_json(
+        cls: type[_R],
+        string: Union[str, bytes],
+        *,
+        decoder: Callable[..., Any] = json.loads,
+        **decoder_kwargs: Any,
+    ) -> Union[_R, list[_R]]:
+        data = decoder(string, **decoder_kwargs)
+        if isinstance(data, list):
+            return cls.from_list(data)
+        return cls.from_dict(data)
+
+    def to_dict(self) -> dict[str, Any]:
+        from dataclass_wizard import asdict
+
+        return asdict(self)
+
+    def to_json(
+        self,
+        *,
+        encoder: Callable[..., str] = json.dumps,
+        **encoder_kwargs: Any,
+    ) -> str:
+        return encoder(self.to_dict(), **encoder_kwargs)
+
+    @classmethod
+    def list_to_json(
+        cls: type[_R],
+        instances: list[_R],
+        encoder: Callable[..., str] = json.dumps,
+        **encoder_kwargs: Any,
+    ) -> str:
+        return encoder(
+            [instance.to_dict() for instance in instances], **encoder_kwargs
+        )
+
+
 @dataclass
-class PreloadFlagsResponse(JSONWizard):
+class PreloadFlagsResponse(_Response):
     version: int
     flags: list[Flag] = field(default_factory=list)
     values: list[Value] = field(default_factory=list)
@@ -106,7 +165,7 @@ class SyncFlagsRequest:
 
 
 @dataclass
-class SyncFlagsResponse(JSONWizard):
+class SyncFlagsResponse(_Response):
     version: int
     flags: list[Flag] = field(default_factory=list)
     values: list[Value] = field(default_factory=list)
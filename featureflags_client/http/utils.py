@@ -1,9 +1,11 @@
 import hashlib
-import inspect
 import struct
-from collections.abc import Generator, Mapping
+import sys
+from collections.abc import Generator, Iterable, Mapping
+from datetime import datetime, timezone
 from enum import Enum, EnumMeta
-from typing import Any, Union
+from types import CellType, FunctionType
+from typing import Any, Optional, Union
 
 
 def custom_asdict_factory(data: Any) -> dict:
@@ -20,7 +22,7 @@ def coerce_defaults(
 ) -> dict[str, bool]:
     if isinstance(defaults, EnumMeta):  # deprecated
         defaults = {k: v.value for k, v in defaults.__members__.items()}  # type: ignore[var-annotated]
-    elif inspect.isclass(defaults):
+    elif isinstance(defaults, type):
         defaults = {
             k: getattr(defaults, k)
             for k in dir(defaults)
@@ -47,7 +49,7 @@ def coerce_values_defaults(
 ) -> dict[str, Union[int, str]]:
     if isinstance(defaults, EnumMeta):  # deprecated
         defaults = {k: v.value for k, v in defaults.__members__.items()}  # type: ignore[var-annotated]
-    elif inspect.isclass(defaults):
+    elif isinstance(defaults, type):
         defaults = {
             k: getattr(defaults, k)
             for k in dir(defaults)
@@ -90,3 +92,84 @@ def hash_flag_value(name: str, value: Any) -> int:
     hash_digest = hashlib.md5(f"{name}{value}".encode()).digest()  # noqa: S324
     (hash_int,) = struct.unpack("<L", hash_digest[-4:])
     return hash_int
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """
+    Converts TIMESTAMP variable value into POSIX timestamp: numbers are
+    seconds, strings are either seconds or ISO 8601 dates, naive dates are
+    in UTC. Returns `None` for anything else.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    return None
+
+
+# shared by all procs, not a part of a compiled state
+_NOT_RETAINED = (type, Enum, type(sys), type(None), bool)
+
+
+def _referents(obj: Any) -> Iterable[Any]:
+    if isinstance(obj, FunctionType):
+        return (*(obj.__closure__ or ()), *(obj.__defaults__ or ()))
+    if isinstance(obj, CellType):
+        try:
+            return (obj.cell_contents,)
+        except ValueError:
+            # empty cell
+            return ()
+    if isinstance(obj, dict):
+        return (*obj.keys(), *obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return obj
+
+    referents = []
+    for cls in type(obj).__mro__:
+        slots = getattr(cls, "__slots__", ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            if hasattr(obj, slot):
+                referents.append(getattr(obj, slot))
+    if hasattr(obj, "__dict__"):
+        referents.append(obj.__dict__)
+    return referents
+
+
+def retained_size(*roots: Any) -> int:
+    """
+    Returns approximate size in bytes of objects reachable from the roots:
+    containers, closures of compiled procs, their cells, defaults and
+    operands. Module level functions, classes and enum members are shared
+    and not counted, each object is counted once.
+    """
+    seen: set[int] = set()
+    stack = list(roots)
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_RETAINED):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, FunctionType) and "<locals>" not in obj.__qualname__:
+            continue
+
+        size += sys.getsizeof(obj)
+        stack.extend(_referents(obj))
+    return size
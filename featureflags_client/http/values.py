@@ -1,6 +1,13 @@
+from collections.abc import Mapping
 from typing import Any, Optional, Union
 
+from featureflags_client.http.conditions import Constant
+from featureflags_client.http.context import TypedContext
+from featureflags_client.http.exposures import ExposureLog
 from featureflags_client.http.managers.base import BaseManager
+from featureflags_client.http.metrics import VALUE, EvaluationMetrics
+from featureflags_client.http.options import with_masks
+from featureflags_client.http.state import StateSnapshot
 
 
 class Values:
@@ -8,16 +15,33 @@ class Values:
     Values object to access current feature values state.
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         manager: BaseManager,
-        ctx: Optional[dict[str, Any]] = None,
+        ctx: Union[Mapping[str, Any], TypedContext, None] = None,
         overrides: Optional[dict[str, Union[int, str]]] = None,
+        metrics: Optional[EvaluationMetrics] = None,
+        exposures: Optional[ExposureLog] = None,
+        snapshot: Optional[StateSnapshot] = None,
     ) -> None:
-        self._manager = manager
         self._defaults = manager.values_defaults
+        # pin state for the whole request
+        if snapshot is None:
+            snapshot = manager.get_snapshot()
         self._ctx = ctx or {}
+        if type(self._ctx) is snapshot.context_type:
+            self._procs = snapshot.typed_values
+        else:
+            self._procs = snapshot.values
+            if snapshot.universes and isinstance(self._ctx, dict):
+                self._ctx = with_masks(self._ctx, snapshot.universes)
         self._overrides = overrides or {}
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.observe_rejected(snapshot.rejected)
+        self._exposures = exposures
+        if exposures is not None:
+            self._exposure_key = exposures.context_key(ctx)
 
     def __getattr__(self, name: str) -> Union[int, str]:
         default = self._defaults.get(name)
@@ -26,8 +50,15 @@ class Values:
 
         value = self._overrides.get(name)
         if value is None:
-            check = self._manager.get_value(name)
-            if callable(check):
+            check = self._procs.get(name)
+            if self._metrics is not None:
+                value = self._metrics.resolve(
+                    VALUE, name, check, self._ctx, default
+                )
+            elif type(check) is Constant:
+                # doesn't depend on the context
+                value = check.value
+            elif callable(check):
                 # evaluated value
                 value = check(self._ctx)
             elif check is not None:
@@ -36,7 +67,12 @@ class Values:
             else:
                 # default value from client code
                 value = default
+        elif self._metrics is not None:
+            self._metrics.record(VALUE, name, value)
 
-        # caching/snapshotting
-        setattr(self, name, value)
-        return value
+        if self._exposures is not None:
+            self._exposures.record(VALUE, name, self._exposure_key, value)
+
+        # caching/snapshotting, readers of the same object in other threads
+        # get the value which was stored first
+        return self.__dict__.setdefault(name, value)
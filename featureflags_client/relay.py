@@ -0,0 +1,432 @@
+"""
+Caching relay between processes of a single host and the flags server.
+
+Relay implements ``/flags/load`` and ``/flags/sync`` endpoints, so the
+existing managers can be pointed at it instead of the server without code
+changes. It keeps a single upstream state per project with all flags,
+values and variables requested by local processes, refreshes it in the
+background with sync requests and answers every process from this state,
+so the server sees a single client per host::
+
+    python -m featureflags_client.relay --upstream http://flags.example
+
+Preload requests are sent upstream only when processes request names which
+are not known yet. When the server is not available, processes are answered
+from the last known state. Exposures are forwarded to the server as is.
+
+Sync requests carry only names of flags and values, so processes which
+don't preload through the relay rely on variables already registered on
+the server by other processes of the project.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional, Union
+from urllib.parse import urljoin
+
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.utils import intervals_gen
+
+log = logging.getLogger(__name__)
+
+
+class _UpstreamState:
+    """
+    Upstream response of a single version, replaced as a whole on every
+    refresh, so requests answered concurrently see a consistent state.
+    """
+
+    __slots__ = ("bodies", "flags", "values", "version")
+
+    def __init__(self, response: dict[str, Any]) -> None:
+        self.version: int = response["version"]
+        self.flags = {flag["name"]: flag for flag in response["flags"]}
+        self.values = {value["name"]: value for value in response["values"]}
+        # encoded responses by requested names
+        self.bodies: dict[tuple[tuple[str, ...], tuple[str, ...]], bytes] = {}
+
+    def body(self, flags: tuple[str, ...], values: tuple[str, ...]) -> bytes:
+        body = self.bodies.get((flags, values))
+        if body is None:
+            body = json.dumps(
+                {
+                    "version": self.version,
+                    "flags": [
+                        self.flags[name] for name in flags if name in self.flags
+                    ],
+                    "values": [
+                        self.values[name]
+                        for name in values
+                        if name in self.values
+                    ],
+                }
+            ).encode()
+            self.bodies[(flags, values)] = body
+        return body
+
+
+class _Project:
+    """
+    Names requested by local processes and the last upstream state of a
+    single project.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.variables: dict[str, dict[str, Any]] = {}
+        self.flags: dict[str, None] = {}
+        # value name -> default, `None` until a preload request sends it
+        self.values: dict[str, Any] = {}
+        # names were added since the last upstream request
+        self.pending = True
+        self.state: Optional[_UpstreamState] = None
+
+        # serializes changes of names and upstream requests of the project
+        self.lock = threading.Lock()
+
+    def knows(self, request: dict[str, Any]) -> bool:
+        """
+        Whether all names of the request are already known.
+        """
+        return (
+            all(
+                v["name"] in self.variables
+                for v in request.get("variables", ())
+            )
+            and all(name in self.flags for name in request.get("flags", ()))
+            and all(
+                self._knows_value(value) for value in request.get("values", ())
+            )
+        )
+
+    def _knows_value(self, value: Union[str, list[Any]]) -> bool:
+        # preload requests send defaults, sync requests only names
+        if isinstance(value, list):
+            name, default = value
+            # default is not known when the name came from a sync request
+            return name in self.values and (
+                default is None or self.values[name] is not None
+            )
+        return value in self.values
+
+    def register(self, request: dict[str, Any]) -> None:
+        """
+        Adds names of the request which are not known yet, called with the
+        lock held.
+        """
+        for variable in request.get("variables", ()):
+            if variable["name"] not in self.variables:
+                self.variables[variable["name"]] = variable
+                self.pending = True
+        for name in request.get("flags", ()):
+            if name not in self.flags:
+                self.flags[name] = None
+                self.pending = True
+        for value in request.get("values", ()):
+            # preload requests send defaults, sync requests only names
+            if isinstance(value, list):
+                name, default = value
+            else:
+                name, default = value, None
+            if self.values.get(name) is None and (
+                name not in self.values or default is not None
+            ):
+                self.values[name] = default
+                self.pending = True
+
+    def upstream_request(self) -> tuple[Endpoints, dict[str, Any]]:
+        """
+        Preload request when there are new names, which registers them on
+        the server, sync request of the current version otherwise.
+        """
+        if not self.pending and self.state is not None:
+            return Endpoints.SYNC, {
+                "project": self.name,
+                "version": self.state.version,
+                "flags": list(self.flags),
+                "values": list(self.values),
+            }
+        return Endpoints.PRELOAD, {
+            "project": self.name,
+            "version": self.state.version if self.state is not None else 0,
+            "variables": list(self.variables.values()),
+            "flags": list(self.flags),
+            # the same default as managers send for values without one
+            "values": [
+                [name, "" if default is None else default]
+                for name, default in self.values.items()
+            ],
+        }
+
+    def body(self, request: dict[str, Any]) -> bytes:
+        """
+        Encoded response with flags and values requested by a process.
+        """
+        state = self.state
+        if state is None:
+            raise RuntimeError(f"Project is not loaded: {self.name}")
+        return state.body(
+            tuple(request.get("flags", ())),
+            tuple(
+                value[0] if isinstance(value, list) else value
+                for value in request.get("values", ())
+            ),
+        )
+
+
+class Relay:
+    """
+    Shared upstream state of all projects requested through the relay.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        request_timeout: int = 5,
+        refresh_interval: int = 10,
+    ) -> None:
+        self.upstream = upstream
+        self.request_timeout = request_timeout
+        self.refresh_interval = refresh_interval
+
+        self._projects: dict[str, _Project] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _project(self, name: str) -> _Project:
+        with self._lock:
+            project = self._projects.get(name)
+            if project is None:
+                project = self._projects[name] = _Project(name)
+        return project
+
+    def _post(
+        self,
+        endpoint: Endpoints,
+        payload: bytes,
+        headers: Optional[dict[str, str]] = None,
+    ) -> bytes:
+        """
+        Sends request to the upstream server and returns response body.
+        """
+        import urllib.request
+
+        request = urllib.request.Request(  # noqa: S310
+            urljoin(self.upstream, endpoint.value),
+            data=payload,
+            headers={"Content-Type": "application/json", **(headers or {})},
+            method="POST",
+        )
+        with urllib.request.urlopen(  # noqa: S310
+            request, timeout=self.request_timeout
+        ) as response:
+            return response.read()
+
+    def _refresh(self, project: _Project) -> None:
+        """
+        Requests upstream state of the project, called with its lock held.
+        """
+        endpoint, request = project.upstream_request()
+        response = json.loads(
+            self._post(endpoint, json.dumps(request).encode())
+        )
+        state = project.state
+        # encoded responses are kept while nothing is changed
+        if (
+            project.pending
+            or state is None
+            or state.version != response["version"]
+        ):
+            project.state = _UpstreamState(response)
+        project.pending = False
+
+    def handle(self, endpoint: Endpoints, request: dict[str, Any]) -> bytes:
+        """
+        Answers a request of a local process, the upstream state is loaded
+        when the process requests names which are not known yet.
+        """
+        project = self._project(request["project"])
+        if project.state is None or not project.knows(request):
+            with project.lock:
+                self._load(project, endpoint, request)
+        return project.body(request)
+
+    def forward(self, payload: bytes, headers: dict[str, str]) -> bytes:
+        """
+        Sends exposures of a local process to the server.
+        """
+        return self._post(Endpoints.EXPOSURES, payload, headers)
+
+    def _load(
+        self,
+        project: _Project,
+        endpoint: Endpoints,
+        request: dict[str, Any],
+    ) -> None:
+        project.register(request)
+        # could be loaded while waiting for the lock
+        if not project.pending:
+            return
+
+        log.info(
+            "Loading project %s for %s request with new names",
+            project.name,
+            endpoint.value,
+        )
+        try:
+            self._refresh(project)
+        except Exception as exc:
+            if project.state is None:
+                raise
+            log.error(
+                "Failed to load project %s: %r, answering from the last "
+                "known state",
+                project.name,
+                exc,
+            )
+
+    def refresh_all(self) -> bool:
+        """
+        Refreshes upstream state of all loaded projects, returns whether
+        all of them were refreshed.
+        """
+        with self._lock:
+            projects = list(self._projects.values())
+
+        success = True
+        for project in projects:
+            try:
+                with project.lock:
+                    self._refresh(project)
+            except Exception as exc:
+                success = False
+                log.error("Failed to refresh project %s: %r", project.name, exc)
+        return success
+
+    def _refresh_loop(self) -> None:
+        int_gen = intervals_gen(interval=self.refresh_interval)
+        interval = int_gen.send(None)  # type: ignore
+        while not self._stop.wait(interval):
+            interval = int_gen.send(self.refresh_all())
+
+    def start(self) -> None:
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, name="featureflags-relay", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+
+
+class RelayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    relay: Relay
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        log.debug(f"{self.address_string()} {format % args}")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        content = self.rfile.read(length)
+        try:
+            endpoint = Endpoints(self.path)
+        except ValueError:
+            endpoint = None
+        if endpoint is None:
+            self._reply(HTTPStatus.NOT_FOUND, b"{}")
+            return
+        if endpoint is Endpoints.EXPOSURES:
+            self._forward(content)
+            return
+
+        try:
+            body = self.relay.handle(endpoint, json.loads(content))
+        except (ValueError, KeyError, TypeError) as exc:
+            log.warning("Invalid request: %r", exc)
+            self._reply(HTTPStatus.BAD_REQUEST, b"{}")
+        except Exception:
+            log.exception("Failed to answer %s request", endpoint.value)
+            self._reply(HTTPStatus.BAD_GATEWAY, b"{}")
+        else:
+            self._reply(HTTPStatus.OK, body)
+
+    def _forward(self, content: bytes) -> None:
+        encoding = self.headers.get("Content-Encoding")
+        try:
+            body = self.relay.forward(
+                content, {"Content-Encoding": encoding} if encoding else {}
+            )
+        except Exception as exc:
+            log.error("Failed to forward exposures: %r", exc)
+            self._reply(HTTPStatus.BAD_GATEWAY, b"{}")
+        else:
+            self._reply(HTTPStatus.OK, body)
+
+    def _reply(self, status: HTTPStatus, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(
+    relay: Relay,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+) -> ThreadingHTTPServer:
+    """
+    Creates a server which answers requests with the relay.
+    """
+    handler = type("RelayHandler", (RelayHandler,), {"relay": relay})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Any = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Caching relay for the flags server"
+    )
+    parser.add_argument("--upstream", required=True, help="flags server url")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--request-timeout", type=int, default=5)
+    parser.add_argument("--refresh-interval", type=int, default=10)
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    relay = Relay(
+        args.upstream,
+        request_timeout=args.request_timeout,
+        refresh_interval=args.refresh_interval,
+    )
+    server = make_server(relay, args.host, args.port)
+    log.info("Relaying %s on %s", args.upstream, server.server_address)
+    relay.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        relay.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.exposures import ExposureLog
+from featureflags_client.http.managers.file import (
+    AsyncFileManager,
+    FileManager,
+)
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    PreloadFlagsResponse,
+    Variable,
+    VariableType,
+)
+
+USER_ID = Variable("user.id", VariableType.NUMBER)
+
+
+class Defaults:
+    TEST = False
+
+
+def write_snapshot(path, user_id, version=1):
+    response = PreloadFlagsResponse(
+        version=version,
+        flags=[
+            Flag(
+                name="TEST",
+                enabled=True,
+                overridden=True,
+                conditions=[
+                    Condition(
+                        checks=[
+                            Check(
+                                operator=Operator.EQUAL,
+                                variable=CheckVariable(
+                                    USER_ID.name, USER_ID.type
+                                ),
+                                value=float(user_id),
+                            )
+                        ]
+                    )
+                ],
+            )
+        ],
+        values=[],
+    )
+    path.write_text(json.dumps(response.to_dict()))
+    # make sure modification time is changed
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_file_manager(tmp_path):
+    path = tmp_path / "flags.json"
+    write_snapshot(path, user_id=1)
+
+    manager = FileManager(
+        path=path,
+        project="test",
+        variables=[USER_ID],
+        defaults=Defaults,
+    )
+    # Disable auto sync.
+    manager._next_sync = datetime.utcnow() + timedelta(hours=1)
+    client = FeatureFlagsClient(manager)
+
+    client.preload()
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.TEST is True
+
+    snapshot = manager.get_snapshot()
+    manager.sync()
+    assert manager.get_snapshot() is snapshot
+
+    # same content, only modification time is changed
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    manager.sync()
+    assert manager.get_snapshot() is snapshot
+
+    # version is not changed, content is
+    write_snapshot(path, user_id=2)
+    manager.sync()
+    assert manager.get_snapshot() is not snapshot
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.TEST is False
+    with client.flags({"user.id": 2}) as flags:
+        assert flags.TEST is True
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "flags.json"
+    write_snapshot(path, user_id=1)
+    manager = FileManager(
+        path=path,
+        project="test",
+        variables=[USER_ID],
+        defaults=Defaults,
+    )
+    manager.preload()
+    snapshot = manager.get_snapshot()
+
+    path.write_text("{")
+    with pytest.raises(json.JSONDecodeError):
+        manager.sync()
+    # current state is kept
+    assert manager.get_snapshot() is snapshot
+
+    path.unlink()
+    with pytest.raises(FileNotFoundError):
+        manager.sync()
+
+
+def test_exposures_are_not_sent(tmp_path):
+    path = tmp_path / "flags.json"
+    write_snapshot(path, user_id=1)
+    manager = FileManager(
+        path=path,
+        project="test",
+        variables=[USER_ID],
+        defaults=Defaults,
+    )
+    exposures = ExposureLog("user.id")
+    client = FeatureFlagsClient(manager, exposures=exposures)
+    client.preload()
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.TEST is True
+
+    exposures.flush(manager)
+    assert exposures.sent == 0
+    assert exposures.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_async_file_manager(tmp_path):
+    path = tmp_path / "flags.json"
+    write_snapshot(path, user_id=1)
+
+    manager = AsyncFileManager(
+        path=path,
+        project="test",
+        variables=[USER_ID],
+        defaults=Defaults,
+    )
+    client = FeatureFlagsClient(manager)
+
+    await client.preload_async()
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.TEST is True
+
+    write_snapshot(path, user_id=2, version=2)
+    await manager.sync()
+    assert manager.get_snapshot().version == 2
+    with client.flags({"user.id": 2}) as flags:
+        assert flags.TEST is True
+
+    await manager.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_async_exposures_are_not_sent(tmp_path):
+    path = tmp_path / "flags.json"
+    write_snapshot(path, user_id=1)
+    manager = AsyncFileManager(
+        path=path,
+        project="test",
+        variables=[USER_ID],
+        defaults=Defaults,
+    )
+    exposures = ExposureLog("user.id")
+    client = FeatureFlagsClient(manager, exposures=exposures)
+    await client.preload_async()
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.TEST is True
+
+    await exposures.flush_async(manager)
+    assert exposures.sent == 0
+    assert exposures.failed == 1
+
+    # file is still read by the fallback request method
+    response = await manager._post(Endpoints.PRELOAD, {}, 5)
+    assert response["version"] == 1
+    await manager.wait_closed()
@@ -0,0 +1,97 @@
+import gc
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from featureflags_client.http.managers import base
+from featureflags_client.http.managers.httpx import HttpxManager
+from featureflags_client.http.managers.requests import RequestsManager
+from featureflags_client.http.types import Flag
+
+
+class Defaults:
+    TEST = False
+
+
+def make_manager(manager_class):
+    manager = manager_class(
+        url="http://flags.server.example",
+        project="test",
+        variables=[],
+        defaults=Defaults,
+    )
+    manager._state.update(
+        [Flag(name="TEST", enabled=True, overridden=True, conditions=[])],
+        [],
+        1,
+    )
+    # Disable auto sync.
+    manager._next_sync = datetime.utcnow() + timedelta(hours=1)
+    return manager
+
+
+def test_after_fork_resets_session():
+    manager = make_manager(RequestsManager)
+    session = manager._get_session()
+    lock = manager._state._swap_lock
+
+    manager._after_fork()
+    assert manager._session is None
+    assert manager._state._swap_lock is not lock
+    assert manager._get_session() is not session
+    # compiled state is kept
+    assert manager.get_flag("TEST")({}) is True
+
+
+@pytest.mark.asyncio
+async def test_after_fork_restarts_refresh():
+    manager = make_manager(HttpxManager)
+    with patch.object(manager, "_refresh_loop") as refresh_loop:
+        manager.start()
+        task = manager._refresh_task
+
+        manager._after_fork()
+        assert manager._refresh_task is None
+        assert manager.get_flag("TEST")({}) is True
+        assert manager._refresh_task is not None
+        assert manager._refresh_task is not task
+        assert refresh_loop.call_count == 2
+
+    await manager.wait_closed()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not supported")
+def test_fork():
+    manager = make_manager(RequestsManager)
+    manager._get_session()
+    manager.freeze()
+    try:
+        pid = os.fork()
+    finally:
+        gc.unfreeze()
+
+    if pid == 0:
+        ok = manager._session is None and manager.get_flag("TEST")({})
+        os._exit(0 if ok else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert manager._session is not None
+
+
+def test_single_fork_hook():
+    make_manager(RequestsManager)
+    with patch("os.register_at_fork") as register_at_fork:
+        managers = [make_manager(RequestsManager) for _ in range(3)]
+    # hook is registered once, by the first manager
+    register_at_fork.assert_not_called()
+    assert all(manager in base._managers for manager in managers)
+
+    gc.collect()
+    count = len(base._managers)
+    # dead managers are not kept
+    del managers
+    gc.collect()
+    assert len(base._managers) == count - 3
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
@@ -5,6 +6,8 @@ import faker
 import pytest
 
 from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.managers.base import BaseManager
 from featureflags_client.http.managers.requests import RequestsManager
 from featureflags_client.http.types import (
     Flag,
@@ -142,3 +145,78 @@ def test_values_manager(
     with client.values({variable.name: check.value}) as values:
         assert values.TEST is value_condition.value_override
         assert values.TEST_INT is value_condition_int_value.value_override
+
+
+def test_request_payload(variable):
+    manager = RequestsManager(
+        url="http://flags.server.example",
+        project="test",
+        variables=[Variable(variable.name, variable.type)],
+        defaults=Defaults,
+        values_defaults=ValuesDefaults,
+    )
+
+    def sent_payload(method, url):
+        with patch.object(manager, "_post_raw") as mock_post_raw:
+            mock_post_raw.return_value = b'{"version": 7}'
+            method()
+        sent_url, payload, _ = mock_post_raw.call_args.args
+        assert sent_url is url
+        return json.loads(payload)
+
+    assert sent_payload(manager.preload, Endpoints.PRELOAD) == {
+        "project": "test",
+        "version": 0,
+        "variables": [{"name": variable.name, "type": variable.type.value}],
+        "flags": ["TEST"],
+        "values": [["TEST", "test"], ["TEST_INT", 1]],
+    }
+    # version is spliced into the pre-encoded body
+    assert sent_payload(manager.sync, Endpoints.SYNC) == {
+        "project": "test",
+        "version": 7,
+        "flags": ["TEST"],
+        "values": ["TEST", "TEST_INT"],
+    }
+
+
+def test_manager_with_post_only(flag):
+    class PostManager(BaseManager):
+        # implements only the `_post` hook, like managers written before
+        # `_post_raw` was added
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.requests = []
+
+        def _post(self, url, payload, timeout):
+            self.requests.append((url, payload))
+            return PreloadFlagsResponse(version=1, flags=[flag]).to_dict()
+
+    manager = PostManager(
+        url="http://flags.server.example",
+        project="test",
+        variables=[],
+        defaults={flag.name: False},
+    )
+    manager.preload()
+
+    ((url, payload),) = manager.requests
+    assert url is Endpoints.PRELOAD
+    assert payload["flags"] == [flag.name]
+    assert manager._state.version == 1
+
+
+def test_requests_manager_with_post_override(flag):
+    class PostManager(RequestsManager):
+        def _post(self, url, payload, timeout):
+            return PreloadFlagsResponse(version=1, flags=[flag]).to_dict()
+
+    manager = PostManager(
+        url="http://flags.server.example",
+        project="test",
+        variables=[],
+        defaults={flag.name: False},
+    )
+    # overridden `_post` is used instead of the session
+    manager.preload()
+    assert manager._state.version == 1
@@ -1,8 +1,13 @@
+from datetime import datetime, timezone
 from typing import Any, Callable
 
+import pytest
+
 from featureflags_client.http.conditions import (
     _UNDEFINED,
+    EQUAL_INDEX_MIN_SIZE,
     OPERATIONS_MAP,
+    Constant,
     check_proc,
     contains,
     equal,
@@ -19,8 +24,21 @@ from featureflags_client.http.conditions import (
     value_proc,
     wildcard,
 )
-from featureflags_client.http.types import Operator
+from featureflags_client.http.context import make_context_type
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+    Variable,
+    VariableType,
+)
 from featureflags_client.http.utils import hash_flag_value
+from featureflags_client.tests.utils import make_check
 
 TEST_OPERATOR_NAME = "test_operator"
 TEST_VARIABLE_NAME = "test_operator"
@@ -182,3 +200,209 @@ def test_valid_int_value_proc(value_int, check, variable):
         proc({variable.name: check.value})
         is value_int.conditions[0].value_override
     )
+
+
+def test_flag_proc_equal_index():
+    ids = [float(i) for i in range(EQUAL_INDEX_MIN_SIZE * 2)]
+    flag = Flag(
+        name="TEST",
+        enabled=True,
+        overridden=True,
+        conditions=[
+            Condition(
+                checks=[
+                    make_check(
+                        "user.id", VariableType.NUMBER, Operator.EQUAL, i
+                    )
+                ]
+            )
+            for i in ids
+        ]
+        + [
+            Condition(
+                checks=[
+                    make_check(
+                        "age", VariableType.NUMBER, Operator.GREATER_THAN, 60
+                    )
+                ]
+            ),
+            # too few conditions on this variable to be indexed
+            Condition(
+                checks=[
+                    make_check(
+                        "company.id", VariableType.NUMBER, Operator.EQUAL, 1
+                    )
+                ]
+            ),
+        ],
+    )
+    proc = flag_proc(flag)
+
+    assert all(proc({"user.id": i}) is True for i in ids)
+    assert proc({"user.id": int(ids[-1])}) is True
+    assert proc({"user.id": -1}) is False
+    assert proc({"user.id": [1]}) is False
+    assert proc({}) is False
+    assert proc({"age": 61}) is True
+    assert proc({"company.id": 1}) is True
+
+    flag.enabled = False
+    assert flag_proc(flag)({"user.id": ids[0]}) is False
+
+
+def test_value_proc_equal_index():
+    def condition(name, value, override):
+        return ValueCondition(
+            checks=[
+                make_check(name, VariableType.NUMBER, Operator.EQUAL, value)
+            ],
+            value_override=override,
+        )
+
+    run = [condition("user.id", i, f"user-{i}") for i in range(10)]
+    value = Value(
+        name="TEST",
+        enabled=True,
+        overridden=True,
+        value_default="default",
+        value_override="override",
+        conditions=[
+            condition("company.id", 1, "company"),
+            *run,
+            # duplicate, first match wins
+            condition("user.id", 1, "duplicate"),
+            condition("company.id", 2, "company-2"),
+            *[condition("user.id", i, "later") for i in range(20)],
+        ],
+    )
+    proc = value_proc(value)
+
+    assert proc({"user.id": 3}) == "user-3"
+    assert proc({"user.id": 1}) == "user-1"
+    # conditions before the run are checked first
+    assert proc({"company.id": 1, "user.id": 3}) == "company"
+    # and conditions after the run are checked later
+    assert proc({"company.id": 2, "user.id": 3}) == "user-3"
+    assert proc({"company.id": 2, "user.id": 15}) == "company-2"
+    assert proc({"user.id": 15}) == "later"
+    assert proc({"user.id": {}}) == "override"
+    assert proc({}) == "override"
+
+
+@pytest.mark.parametrize(
+    "size", [EQUAL_INDEX_MIN_SIZE - 1, EQUAL_INDEX_MIN_SIZE]
+)
+def test_equal_index_coercion(size):
+    def flag(variable_type, name, values):
+        return Flag(
+            name="TEST",
+            enabled=True,
+            overridden=True,
+            conditions=[
+                Condition(
+                    checks=[
+                        Check(
+                            operator=Operator.EQUAL,
+                            variable=CheckVariable(
+                                name=name, type=variable_type
+                            ),
+                            value=value,
+                        )
+                    ]
+                )
+                for value in values
+            ],
+        )
+
+    # results don't depend on whether conditions are indexed
+    dates = [f"2024-01-0{day}T00:00:00Z" for day in range(1, size + 1)]
+    proc = flag_proc(flag(VariableType.TIMESTAMP, "created", dates))
+    assert proc({"created": datetime(2024, 1, 1, tzinfo=timezone.utc)})
+    assert proc({"created": "2024-01-01T00:00:00+00:00"})
+
+    options = CompileOptions(now_variable="now")
+    proc = flag_proc(
+        flag(VariableType.NUMBER, "now", [0] * size), None, options
+    )
+    assert proc({"now": 0}) is False
+
+    context_type = make_context_type([Variable("user.id", VariableType.NUMBER)])
+    options = CompileOptions().for_context(context_type)
+    ids = list(range(size))
+    proc = flag_proc(flag(VariableType.NUMBER, "user.id", ids), None, options)
+    assert proc(context_type({"user.id": 0})) is True
+    assert proc(context_type({"user.id": 1.0})) is True
+    assert proc(context_type({"user.id": size})) is False
+    # strings are not numbers, as for plain dict contexts
+    assert proc(context_type({"user.id": "1"})) is False
+    assert (
+        flag_proc(flag(VariableType.NUMBER, "user.id", ids))({"user.id": "1"})
+        is False
+    )
+
+    value = Value(
+        name="TEST",
+        enabled=True,
+        overridden=True,
+        value_default="default",
+        value_override="override",
+        conditions=[
+            ValueCondition(checks=condition.checks, value_override=date)
+            for condition, date in zip(
+                flag(VariableType.TIMESTAMP, "created", dates).conditions,
+                dates,
+            )
+        ],
+    )
+    proc = value_proc(value)
+    assert proc({"created": "2024-01-02T00:00:00+00:00"}) == dates[1]
+
+
+def test_constant_folding():
+    def flag(enabled, conditions):
+        return Flag(
+            name="TEST", enabled=enabled, overridden=True, conditions=conditions
+        )
+
+    def percent_condition(value):
+        return Condition(
+            checks=[
+                make_check(
+                    "user.id", VariableType.NUMBER, Operator.PERCENT, value
+                )
+            ]
+        )
+
+    assert flag_proc(flag(False, [percent_condition(50)])).value is False
+    assert flag_proc(flag(True, [])).value is True
+    # conditions which are never true are dropped
+    assert flag_proc(flag(True, [percent_condition(0)])).value is False
+    assert flag_proc(flag(True, [Condition(checks=[])])).value is False
+
+    proc = flag_proc(flag(True, [percent_condition(0), percent_condition(100)]))
+    assert not isinstance(proc, Constant)
+    assert proc({"user.id": 1}) is True
+    assert proc({}) is False
+
+    value = Value(
+        name="TEST",
+        enabled=True,
+        overridden=False,
+        value_default="1",
+        value_override="override",
+        conditions=[
+            ValueCondition(
+                checks=[
+                    make_check(
+                        "user.id", VariableType.NUMBER, Operator.PERCENT, 0
+                    )
+                ],
+                value_override="never",
+            ),
+        ],
+    )
+    assert value_proc(value).value == 1
+    value.overridden = True
+    assert value_proc(value).value == "override"
+    value.conditions[0].checks[0].value = 100
+    assert value_proc(value)({"user.id": 1}) == "never"
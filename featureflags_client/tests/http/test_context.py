@@ -0,0 +1,259 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.conditions import check_proc
+from featureflags_client.http.context import LazyContext, make_context_type
+from featureflags_client.http.managers.dummy import DummyManager
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.types import (
+    Condition,
+    Flag,
+    Operator,
+    Variable,
+    VariableType,
+)
+from featureflags_client.tests.utils import make_check
+
+VARIABLES = [
+    Variable("user.id", VariableType.NUMBER),
+    Variable("user.name", VariableType.STRING),
+    Variable("created", VariableType.TIMESTAMP),
+    Variable("roles", VariableType.SET),
+]
+
+Context = make_context_type(VARIABLES)
+
+TYPED = CompileOptions().for_context(Context)
+
+
+def test_attr_names():
+    context_type = make_context_type(
+        [
+            Variable("user.id", VariableType.NUMBER),
+            Variable("user-id", VariableType.NUMBER),
+            Variable("1st", VariableType.STRING),
+            Variable("class", VariableType.STRING),
+            Variable("get", VariableType.STRING),
+        ]
+    )
+    assert context_type.attr("user.id") == "user_id"
+    assert context_type.attr("user-id") == "user_id_2"
+    assert context_type.attr("1st") == "var_1st"
+    assert context_type.attr("class") == "var_class"
+    assert context_type.attr("get") == "var_get"
+    assert context_type.attr("unknown") is None
+
+
+def test_coercion():
+    ctx = Context(
+        {"user.id": "42", "created": "2030-01-01T00:00:00Z"},
+        user_name=1,
+        roles=["admin"],
+    )
+    assert ctx.user_id is None
+    assert ctx.user_name is None
+    assert ctx.created == datetime(2030, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert ctx.roles == frozenset(["admin"])
+
+    assert ctx.get("user.id") is None
+    assert Context().get("user.name", "") == ""
+    assert ctx.get("unknown") is None
+
+    # values are not converted, as checks of plain dicts don't convert them
+    assert Context(user_id=42).user_id == 42
+    assert Context(user_id=1.5).user_id == 1.5
+    assert Context(user_id=True).user_id is True
+    assert Context(user_name="bob").user_name == "bob"
+    assert Context(user_name=["bob"]).user_name is None
+    assert Context(roles="admin").roles == frozenset(["admin"])
+    assert Context(roles=1).roles is None
+
+
+def test_immutable_and_unknown():
+    ctx = Context()
+    with pytest.raises(AttributeError):
+        ctx.user_id = 1
+    with pytest.raises(TypeError):
+        Context(unknown=1)
+
+
+CHECKS = [
+    make_check("user.id", VariableType.NUMBER, Operator.EQUAL, 42),
+    make_check("user.id", VariableType.NUMBER, Operator.LESS_THAN, 100),
+    make_check("user.id", VariableType.NUMBER, Operator.GREATER_OR_EQUAL, 42.0),
+    make_check("user.id", VariableType.NUMBER, Operator.PERCENT, 50),
+    make_check("user.name", VariableType.STRING, Operator.EQUAL, "bob"),
+    make_check("user.name", VariableType.STRING, Operator.CONTAINS, "o"),
+    make_check("user.name", VariableType.STRING, Operator.REGEXP, "^b.b$"),
+    make_check("user.name", VariableType.STRING, Operator.WILDCARD, "b*"),
+    make_check("user.name", VariableType.STRING, Operator.PERCENT, 30),
+    make_check(
+        "created",
+        VariableType.TIMESTAMP,
+        Operator.LESS_THAN,
+        "2030-01-01T00:00:00Z",
+    ),
+    make_check("roles", VariableType.SET, Operator.SUBSET, ["admin", "editor"]),
+    make_check("roles", VariableType.SET, Operator.SUPERSET, ["admin"]),
+    make_check("roles", VariableType.SET, Operator.SUPERSET, []),
+]
+
+CONTEXTS = [
+    {},
+    {"user.id": 42, "user.name": "bob"},
+    {"user.id": 7, "user.name": "alice"},
+    {"user.id": 420, "user.name": "robert"},
+    {"created": datetime(2029, 1, 1, tzinfo=timezone.utc)},
+    {"created": datetime(2031, 1, 1, tzinfo=timezone.utc)},
+    {"roles": {"admin"}},
+    {"roles": {"admin", "editor"}},
+    {"roles": {"admin", "guest"}},
+    {"roles": set()},
+    # values of other types than their variables
+    {"user.id": "42", "user.name": 5},
+    {"user.id": True, "user.name": 42.0},
+    {"user.id": "bob", "user.name": ["bob"]},
+    {"user.name": True, "created": 1},
+]
+
+
+@pytest.mark.parametrize("check", CHECKS, ids=lambda c: c.operator.name)
+def test_typed_procs_match_dict_procs(check):
+    expected = check_proc(check)
+    proc = check_proc(check, OperandPool(), TYPED)
+
+    for values in CONTEXTS:
+        assert proc(Context(values)) is expected(values), values
+
+
+@pytest.mark.parametrize("value", [5, 7.5, 100, "5"])
+def test_typed_string_percent_of_numbers(value):
+    for threshold in (30, 50, 100):
+        percent = make_check(
+            "user.name", VariableType.STRING, Operator.PERCENT, threshold
+        )
+        expected = check_proc(percent)({"user.name": value})
+        proc = check_proc(percent, OperandPool(), TYPED)
+        assert proc(Context({"user.name": value})) is expected
+
+
+def test_invalid_operand():
+    proc = check_proc(
+        make_check("user.id", VariableType.NUMBER, Operator.LESS_THAN, "many"),
+        OperandPool(),
+        TYPED,
+    )
+    assert proc(Context(user_id=1)) is False
+
+
+def test_flags_with_typed_context():
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=VARIABLES,
+        defaults={"TEST": False},
+        compile_options=CompileOptions(typed_context=True),
+    )
+    manager._state.update(
+        [
+            Flag(
+                name="TEST",
+                enabled=True,
+                overridden=True,
+                conditions=[
+                    Condition(
+                        checks=[
+                            make_check(
+                                "user.id",
+                                VariableType.NUMBER,
+                                Operator.EQUAL,
+                                42,
+                            )
+                        ]
+                    )
+                ],
+            ),
+        ],
+        [],
+        1,
+    )
+    snapshot = manager.get_snapshot()
+    assert snapshot.typed_flags["TEST"] is not snapshot.flags["TEST"]
+
+    client = FeatureFlagsClient(manager)
+    with client.flags(manager.make_context(user_id=42)) as flags:
+        assert flags.TEST is True
+    with client.flags(manager.make_context(user_id="42")) as flags:
+        assert flags.TEST is False
+    with client.flags(manager.make_context({"user.id": 1})) as flags:
+        assert flags.TEST is False
+    # plain dicts are still supported
+    with client.flags({"user.id": 42}) as flags:
+        assert flags.TEST is True
+
+
+def test_lazy_context():
+    calls = []
+
+    def provider():
+        calls.append(1)
+        return 42
+
+    def failing():
+        raise RuntimeError("GeoIP is down")
+
+    ctx = LazyContext(
+        {"user.id": provider, "user.name": "bob", "country": failing}
+    )
+    assert calls == []
+
+    for _ in range(3):
+        assert check_proc(CHECKS[0])(ctx) is True
+    assert calls == [1]
+
+    assert ctx["user.name"] == "bob"
+    assert ctx.get("country", "unknown") == "unknown"
+    with pytest.raises(KeyError):
+        ctx["country"]
+    assert dict(ctx) == {"user.id": 42, "user.name": "bob"}
+
+
+@pytest.mark.asyncio
+async def test_lazy_context_resolve():
+    async def provider():
+        return 42
+
+    async def unused():
+        raise AssertionError("not used")
+
+    ctx = LazyContext({"user.id": provider, "unused": unused})
+    # async providers are not called by checks
+    assert ctx.get("user.id") is None
+
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=VARIABLES,
+        defaults={"TEST": False},
+    )
+    manager._state.update(
+        [
+            Flag(
+                name="TEST",
+                enabled=True,
+                overridden=True,
+                conditions=[Condition(checks=[CHECKS[0]])],
+            ),
+        ],
+        [],
+        1,
+    )
+    snapshot = manager.get_snapshot()
+    assert snapshot.variables == {"user.id"}
+
+    await ctx.resolve(snapshot.variables)
+    with FeatureFlagsClient(manager).flags(ctx) as flags:
+        assert flags.TEST is True
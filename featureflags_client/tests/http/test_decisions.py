@@ -0,0 +1,126 @@
+from unittest.mock import patch
+
+import pytest
+
+from featureflags_client.http.decisions import decode, encode
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+    VariableType,
+)
+from featureflags_client.tests.utils import make_client
+
+USER_ID = CheckVariable("user.id", VariableType.NUMBER)
+SECRET = b"secret"
+
+
+def decisions_client(
+    defaults, values_defaults, version, user_id, secret=SECRET
+):
+    check = Check(operator=Operator.EQUAL, variable=USER_ID, value=user_id)
+    return make_client(
+        defaults,
+        values_defaults,
+        [Flag("NEW", True, True, [Condition([check])])],
+        [Value("LIMIT", True, True, "10", "20", [ValueCondition([check], 30)])],
+        version=version,
+        decisions_secret=secret,
+    )
+
+
+def test_propagation():
+    defaults = {"NEW": False, "OLD": True}
+    values_defaults = {"LIMIT": 10, "TITLE": "title"}
+    upstream = decisions_client(defaults, values_defaults, 2, 1.0)
+    token = upstream.encode_decisions({"user.id": 1})
+
+    # downstream service is still on the previous version of the rollout
+    downstream = decisions_client(defaults, values_defaults, 1, 2.0)
+    decisions = downstream.decode_decisions(token)
+    assert decisions is not None
+    assert decisions.version == 2
+    with downstream.flags({"user.id": 1}, decisions=decisions) as flags:
+        assert (flags.NEW, flags.OLD) == (True, True)
+    with downstream.values({"user.id": 1}, decisions=decisions) as values:
+        assert (values.LIMIT, values.TITLE) == (30, "title")
+    # explicit overrides win
+    with downstream.flags(decisions=decisions, overrides={"NEW": False}) as f:
+        assert f.NEW is False
+
+    # different set of flags is evaluated locally
+    other = decisions_client({"NEW": False}, values_defaults, 1, 2.0)
+    decisions = other.decode_decisions(token)
+    assert decisions is not None
+    assert decisions.flags == {}
+    assert decisions.values == {"LIMIT": 30, "TITLE": "title"}
+    with other.flags({"user.id": 1}, decisions=decisions) as flags:
+        assert flags.NEW is False
+
+    for invalid in (None, "", "2.1", token.replace(".", "!"), token[:-2]):
+        assert other.decode_decisions(invalid) is None
+
+
+def test_single_snapshot():
+    defaults = {"NEW": False}
+    values_defaults = {"LIMIT": 10}
+    client = decisions_client(defaults, values_defaults, 1, 1.0)
+    manager = client._manager
+    old = manager.get_snapshot()
+    # state is updated while the token is encoded
+    check = Check(operator=Operator.EQUAL, variable=USER_ID, value=2.0)
+    manager._state.update(
+        [Flag("NEW", True, True, [Condition([check])])],
+        [Value("LIMIT", True, True, "10", "20", [ValueCondition([check], 30)])],
+        2,
+    )
+    new = manager.get_snapshot()
+
+    with patch.object(manager, "get_snapshot", side_effect=[old, new, new]):
+        token = client.encode_decisions({"user.id": 1})
+
+    decisions = client.decode_decisions(token)
+    assert decisions is not None
+    assert decisions.version == 1
+    assert decisions.flags == {"NEW": True}
+    assert decisions.values == {"LIMIT": 30}
+
+
+def test_token_size():
+    flags = {f"FLAG_{i}": i % 3 == 0 for i in range(100)}
+    values = {"LIMIT": 100, "VARIANT": "b"}
+    token = encode(7, flags, values, SECRET)
+    assert len(token) < 96
+
+    decisions = decode(token, list(flags), list(values), SECRET)
+    assert decisions is not None
+    assert decisions.flags == flags
+    assert decisions.values == values
+
+
+def test_signature():
+    defaults = {"NEW": False}
+    values_defaults = {"LIMIT": 10}
+    upstream = decisions_client(defaults, values_defaults, 1, 1.0)
+    token = upstream.encode_decisions({"user.id": 1})
+    assert upstream.decode_decisions(token) is not None
+
+    other = decisions_client(defaults, values_defaults, 1, 1.0, secret="other")
+    assert other.decode_decisions(token) is None
+
+    # results can't be changed without the secret
+    body, _, signature = token.rpartition(".")
+    forged = encode(1, {"NEW": False}, {"LIMIT": 0}, b"guess")
+    forged_body = forged.rpartition(".")[0]
+    assert upstream.decode_decisions(f"{forged_body}.{signature}") is None
+    assert upstream.decode_decisions(body) is None
+
+    # tokens are neither encoded nor accepted without a secret
+    unsigned = decisions_client(defaults, values_defaults, 1, 1.0, secret=None)
+    with pytest.raises(RuntimeError):
+        unsigned.encode_decisions({"user.id": 1})
+    assert unsigned.decode_decisions(token) is None
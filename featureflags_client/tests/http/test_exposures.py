@@ -0,0 +1,144 @@
+import gzip
+import json
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.exposures import ExposureLog
+from featureflags_client.http.managers.dummy import AsyncDummyManager
+from featureflags_client.tests.utils import make_client
+
+DEFAULTS = {"A": False, "B": True}
+VALUES_DEFAULTS = {"V": "default"}
+
+
+def sent_exposures(post_raw):
+    exposures = []
+    for call in post_raw.call_args_list:
+        url, payload, _, headers = call.args
+        assert url is Endpoints.EXPOSURES
+        assert headers == {"Content-Encoding": "gzip"}
+        batch = json.loads(gzip.decompress(payload))
+        assert batch["project"] == "test"
+        exposures.extend(batch["exposures"])
+    return exposures
+
+
+def test_deduplication():
+    exposures = ExposureLog("user.id")
+    client = make_client(DEFAULTS, VALUES_DEFAULTS, exposures=exposures)
+
+    for user_id in (1, 1, 2):
+        with client.flags({"user.id": user_id}) as flags:
+            assert flags.A is False
+            assert flags.A is False
+            assert flags.B is True
+    with client.values({"user.id": 1}) as values:
+        assert values.V == "default"
+
+    assert [exposure[:4] for exposure in exposures._buffer] == [
+        ("flag", "A", 1, False),
+        ("flag", "B", 1, True),
+        ("flag", "A", 2, False),
+        ("flag", "B", 2, True),
+        ("value", "V", 1, "default"),
+    ]
+
+
+def test_overflow():
+    exposures = ExposureLog(capacity=2, dedupe_window=0)
+    client = make_client(DEFAULTS, VALUES_DEFAULTS, exposures=exposures)
+    with client.flags() as flags:
+        assert flags.A is False
+        assert flags.B is True
+    with client.values() as values:
+        assert values.V == "default"
+
+    assert len(exposures) == 2
+    assert exposures.dropped == 1
+
+
+def test_flush():
+    exposures = ExposureLog("user.id", batch_size=2)
+    client = make_client(DEFAULTS, VALUES_DEFAULTS, exposures=exposures)
+    manager = client._manager
+    with client.flags({"user.id": [1]}) as flags:
+        assert flags.A is False
+        assert flags.B is True
+    with client.values({"user.id": 2}) as values:
+        assert values.V == "default"
+
+    with patch.object(manager, "_post_raw") as post_raw:
+        exposures.flush(manager)
+    assert post_raw.call_count == 2
+    assert [
+        (e["kind"], e["name"], e["key"], e["result"])
+        for e in sent_exposures(post_raw)
+    ] == [
+        # unhashable keys are sent, but not deduplicated
+        ("flag", "A", [1], False),
+        ("flag", "B", [1], True),
+        ("value", "V", 2, "default"),
+    ]
+    assert exposures.sent == 3
+    assert len(exposures) == 0
+
+    with client.flags({"user.id": 3}) as flags:
+        assert flags.A is False
+    with patch.object(manager, "_post_raw", side_effect=OSError("down")):
+        exposures.flush(manager)
+    assert exposures.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_async_flush():
+    exposures = ExposureLog("user.id", flush_interval=3600)
+    client = make_client(
+        DEFAULTS,
+        VALUES_DEFAULTS,
+        manager_class=AsyncDummyManager,
+        exposures=exposures,
+    )
+    manager = client._manager
+    with patch.object(manager, "_post_raw", new_callable=AsyncMock) as post:
+        exposures.start(manager)
+        with client.flags({"user.id": 1}) as flags:
+            assert flags.A is False
+
+        # remaining exposures are sent on close
+        await exposures.wait_closed()
+
+    assert [e["name"] for e in sent_exposures(post)] == ["A"]
+
+
+def test_thread_flush():
+    exposures = ExposureLog(flush_interval=3600)
+    client = make_client(DEFAULTS, VALUES_DEFAULTS, exposures=exposures)
+    manager = client._manager
+    with patch.object(manager, "_post_raw") as post_raw:
+        exposures.start(manager)
+        with client.flags() as flags:
+            assert flags.B is True
+        exposures.close()
+
+    assert [e["name"] for e in sent_exposures(post_raw)] == ["B"]
+
+
+def test_flush_loop_survives_errors():
+    exposures = ExposureLog(flush_interval=0.01)
+    manager = make_client(DEFAULTS, VALUES_DEFAULTS)._manager
+    flushed = threading.Event()
+    calls = []
+
+    def flush(manager):
+        calls.append(manager)
+        if len(calls) == 1:
+            raise RuntimeError("dictionary changed size during iteration")
+        flushed.set()
+
+    with patch.object(exposures, "flush", side_effect=flush):
+        exposures.start(manager)
+        assert flushed.wait(5)
+        exposures.close()
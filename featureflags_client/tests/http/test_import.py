@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from featureflags_client.http.types import Flag, PreloadFlagsResponse
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "featureflags_client.http.client",
+        "featureflags_client.http.managers.requests",
+        "featureflags_client.http.managers.httpx",
+        "featureflags_client.http.managers.aiohttp",
+        "featureflags_client.http.managers.file",
+    ],
+)
+def test_heavy_modules_are_not_imported(module):
+    code = (
+        f"import sys, {module}; "
+        "print(' '.join(m for m in "
+        "('asyncio', 'dataclass_wizard', 'requests', 'httpx', 'aiohttp') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_json_methods():
+    response = PreloadFlagsResponse(
+        version=1,
+        flags=[Flag(name="A", enabled=True, overridden=True, conditions=[])],
+    )
+    # methods of `JSONWizard` are still there
+    assert PreloadFlagsResponse.from_json(response.to_json()) == response
+    assert PreloadFlagsResponse.from_json(
+        PreloadFlagsResponse.list_to_json([response])
+    ) == [response]
+    assert PreloadFlagsResponse.from_list([response.to_dict()]) == [response]
+    assert json.loads(response.to_json(indent=2)) == response.to_dict()
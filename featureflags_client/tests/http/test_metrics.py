@@ -0,0 +1,131 @@
+from featureflags_client.http.metrics import (
+    FLAG,
+    VALUE,
+    EvaluationMetrics,
+    PrometheusMetrics,
+)
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    VariableType,
+)
+from featureflags_client.tests.utils import make_client
+
+
+def metrics_client(flag, value, metrics):
+    return make_client(
+        {"TEST": False, "UNUSED": False, flag.name: False},
+        {"TEST": "test", value.name: "default"},
+        [flag],
+        [value],
+        metrics=metrics,
+    )
+
+
+def test_evaluation_metrics(flag, value, check, variable):
+    sink = PrometheusMetrics()
+    client = metrics_client(flag, value, EvaluationMetrics(sink, 1.0))
+
+    with client.flags({variable.name: check.value}) as flags:
+        assert getattr(flags, flag.name) is True
+        assert flags.TEST is False
+        # cached reads are not counted
+        assert getattr(flags, flag.name) is True
+
+    with client.flags({}, overrides={flag.name: False}) as flags:
+        assert getattr(flags, flag.name) is False
+
+    with client.values({variable.name: check.value}) as values:
+        assert getattr(values, value.name) == value.conditions[0].value_override
+
+    assert sink.evaluations[(FLAG, flag.name)] == 2
+    assert sink.evaluations[(FLAG, "TEST")] == 1
+    assert sink.evaluations[(FLAG, "UNUSED")] == 0
+    assert sink.evaluations[(VALUE, value.name)] == 1
+    assert sink.evaluations[(VALUE, "TEST")] == 0
+
+    assert sink.results[(FLAG, flag.name, "true")] == 1
+    assert sink.results[(FLAG, flag.name, "false")] == 1
+
+    # only evaluated procs are timed
+    assert set(sink.latencies) == {(FLAG, flag.name), (VALUE, value.name)}
+    _, _, count = sink.latencies[(FLAG, flag.name)]
+    assert count == 1
+
+
+def test_latency_sampling(flag, value, variable):
+    sink = PrometheusMetrics()
+    client = metrics_client(flag, value, EvaluationMetrics(sink, 0.0))
+
+    with client.flags({variable.name: None}) as flags:
+        getattr(flags, flag.name)
+
+    assert sink.evaluations[(FLAG, flag.name)] == 1
+    assert sink.latencies == {}
+
+
+def test_prometheus_render():
+    sink = PrometheusMetrics(buckets=[0.001])
+    sink.declare(FLAG, ["A", "B"])
+    sink.record_evaluation(FLAG, "A", True)
+    sink.record_evaluation(VALUE, "C", 'say "hi"')
+    sink.record_latency(FLAG, "A", 0.0005)
+    sink.record_latency(FLAG, "A", 0.5)
+
+    lines = sink.render().splitlines()
+    assert 'featureflags_evaluations_total{kind="flag",name="A"} 1' in lines
+    assert 'featureflags_evaluations_total{kind="flag",name="B"} 0' in lines
+    assert (
+        'featureflags_results_total{kind="flag",name="A",result="true"} 1'
+        in lines
+    )
+    assert (
+        'featureflags_results_total{kind="value",name="C",'
+        'result="say \\"hi\\""} 1'
+    ) in lines
+    assert (
+        "featureflags_evaluation_duration_seconds_bucket"
+        '{kind="flag",name="A",le="0.001"} 1'
+    ) in lines
+    assert (
+        "featureflags_evaluation_duration_seconds_bucket"
+        '{kind="flag",name="A",le="+Inf"} 2'
+    ) in lines
+    assert (
+        'featureflags_evaluation_duration_seconds_count{kind="flag",name="A"} 2'
+    ) in lines
+
+
+def test_rejected_checks():
+    def regexp_flag(pattern):
+        check = Check(
+            operator=Operator.REGEXP,
+            variable=CheckVariable("email", VariableType.STRING),
+            value=pattern,
+        )
+        return Flag("TEST", True, True, [Condition([check])])
+
+    sink = PrometheusMetrics()
+    client = metrics_client(
+        regexp_flag("(a+)+$"),
+        Value("VALUE", True, False, "a", "b", []),
+        EvaluationMetrics(sink),
+    )
+    with client.flags({"email": "aaa"}) as flags:
+        assert flags.TEST is False
+
+    assert sink.rejected == {(FLAG, "TEST", "nested quantifiers"): 1}
+    assert (
+        'featureflags_rejected_checks{kind="flag",name="TEST",'
+        'reason="nested quantifiers"} 1'
+    ) in sink.render().splitlines()
+
+    # gauge is cleared when checks are fixed
+    client._manager._state.update([regexp_flag("^a+$")], [], 2)
+    with client.flags({"email": "aaa"}) as flags:
+        assert flags.TEST is True
+    assert sink.rejected == {}
@@ -0,0 +1,105 @@
+import pytest
+
+from featureflags_client.http.conditions import (
+    check_proc,
+    subset,
+    superset,
+    update_flags_state,
+)
+from featureflags_client.http.operands import (
+    COMPACT_MIN_SIZE,
+    IntOperand,
+    OperandPool,
+    StrOperand,
+    compact,
+)
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    VariableType,
+)
+
+IDS = [str(i * 7) for i in range(COMPACT_MIN_SIZE * 2)]
+NAMES = [f"name-{i}" for i in range(COMPACT_MIN_SIZE * 2)]
+
+
+@pytest.mark.parametrize(
+    ("items", "operand_cls"),
+    [
+        (IDS, IntOperand),
+        (NAMES, StrOperand),
+        (IDS[:4], frozenset),
+        ([*IDS, 1], frozenset),
+        # not canonical integers
+        ([*IDS, "07"], StrOperand),
+        ([*IDS, str(2**64)], StrOperand),
+    ],
+)
+def test_compact(items, operand_cls):
+    operand = compact(tuple(items))
+    assert isinstance(operand, operand_cls)
+    assert set(operand) == set(items)
+    assert len(operand) == len(set(items))
+
+
+@pytest.mark.parametrize("items", [IDS, NAMES])
+def test_sorted_operand_semantics(items):
+    operand = compact(tuple(items + items[:3]))
+    expected = set(items)
+
+    for other in [
+        items[:3],
+        [items[0], "missing"],
+        ["07", " 7", "7_0", 7, 7.0, None],
+        items,
+        [*items, "extra"],
+        set(items[1:]),
+        "abc",
+    ]:
+        assert operand.issuperset(other) is expected.issuperset(other)
+        assert operand.issubset(other) is expected.issubset(other)
+
+
+def test_pool_shares_operands():
+    def flag(name, operator):
+        return Flag(
+            name=name,
+            enabled=True,
+            overridden=True,
+            conditions=[
+                Condition(
+                    checks=[
+                        Check(
+                            operator=operator,
+                            variable=CheckVariable("ids", VariableType.SET),
+                            value=list(IDS),
+                        ),
+                    ],
+                ),
+            ],
+        )
+
+    pool = OperandPool()
+    procs = update_flags_state(
+        [flag("A", Operator.SUBSET), flag("B", Operator.SUPERSET)], pool
+    )
+    assert len(pool) == 1
+
+    assert procs["A"]({"ids": {IDS[0], IDS[-1]}}) is True
+    assert procs["A"]({"ids": {IDS[0], "missing"}}) is False
+    assert procs["B"]({"ids": set(IDS)}) is True
+    assert procs["B"]({"ids": set(IDS[1:])}) is False
+
+
+def test_unhashable_operand():
+    check = Check(
+        operator=Operator.SUBSET,
+        variable=CheckVariable("ids", VariableType.SET),
+        value=[["a"]],
+    )
+    assert check_proc(check, OperandPool())({"ids": {"a"}}) is False
+    assert subset("ids", [["a"]])({"ids": {"a"}}) is False
+    assert superset("ids", [["a"]])({"ids": {"a"}}) is False
@@ -0,0 +1,98 @@
+import itertools
+from functools import partial
+
+import pytest
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.conditions import check_proc
+from featureflags_client.http.managers.dummy import DummyManager
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions, with_masks
+from featureflags_client.http.types import (
+    Condition,
+    Flag,
+    Operator,
+    VariableType,
+)
+from featureflags_client.tests.utils import make_check
+
+ROLES = ["admin", "editor", "viewer"]
+
+OPTIONS = CompileOptions(set_universes={"roles": ROLES})
+
+
+roles_check = partial(make_check, "roles", VariableType.SET)
+
+
+def contexts():
+    members = [*ROLES, "guest", "owner"]
+    for size in range(len(members) + 1):
+        for items in itertools.combinations(members, size):
+            yield {"roles": set(items)}
+    yield {"roles": ["admin", "admin"]}
+    yield {"roles": "admin"}
+    yield {"roles": 1}
+    yield {"roles": [["admin"]]}
+    yield {"roles": None}
+    yield {}
+
+
+@pytest.mark.parametrize("operator", [Operator.SUBSET, Operator.SUPERSET])
+@pytest.mark.parametrize(
+    "value",
+    [
+        ["admin"],
+        ["admin", "editor"],
+        ROLES,
+        # members which are not in the universe
+        ["admin", "guest"],
+        ["guest"],
+        [],
+    ],
+)
+def test_mask_procs_match_set_procs(operator, value):
+    check = roles_check(operator, value)
+    expected = check_proc(check)
+    proc = check_proc(check, OperandPool(), OPTIONS)
+    if value:
+        assert proc is not expected
+
+    for ctx in contexts():
+        result = expected(ctx)
+        # with and without prepared masks
+        assert proc(ctx) is result, ctx
+        assert proc(with_masks(ctx, OPTIONS.universes)) is result, ctx
+
+
+def test_flags_prepare_masks():
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=[],
+        defaults={"TEST": False},
+        compile_options=OPTIONS,
+    )
+    manager._state.update(
+        [
+            Flag(
+                name="TEST",
+                enabled=True,
+                overridden=True,
+                conditions=[
+                    Condition(checks=[roles_check(Operator.SUBSET, ROLES)])
+                ],
+            ),
+        ],
+        [],
+        1,
+    )
+    client = FeatureFlagsClient(manager)
+
+    ctx = {"roles": {"admin"}}
+    with client.flags(ctx) as flags:
+        assert flags.TEST is True
+    # context passed by the user is not modified
+    assert ctx == {"roles": {"admin"}}
+
+    with client.flags({"roles": {"guest"}}) as flags:
+        assert flags.TEST is False
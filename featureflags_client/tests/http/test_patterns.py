@@ -0,0 +1,129 @@
+import itertools
+import re
+import time
+from functools import partial
+
+import pytest
+
+from featureflags_client.http.conditions import (
+    check_proc,
+    false,
+    wildcard_pattern,
+)
+from featureflags_client.http.context import make_context_type
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.patterns import (
+    INVALID,
+    NESTED_QUANTIFIERS,
+    pattern_problem,
+    wildcard_matcher,
+)
+from featureflags_client.http.types import (
+    Operator,
+    Variable,
+    VariableType,
+)
+from featureflags_client.tests.utils import make_check
+
+PATH = "request.path"
+
+
+check = partial(make_check, PATH, VariableType.STRING)
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"(a+)+$",
+        r"(\w+\s?)*$",
+        r"(?:.*,)+x",
+        r"(?i)(a+A)+$",
+        r"^(x+x+)+y",
+        r"(?=(a+)+b)",
+    ],
+)
+def test_nested_quantifiers(pattern):
+    assert pattern_problem(pattern) == NESTED_QUANTIFIERS
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"^/\w+/\d+/?$",
+        r"(\d+\.)+\d+",
+        r"(?:[^,]+,)*",
+        r"(a+A)+",
+        r"(a|b)*c",
+        r"((ab)+c)+",
+    ],
+)
+def test_safe_patterns(pattern):
+    assert pattern_problem(pattern) is None
+
+
+def test_rejected_checks():
+    assert pattern_problem("(") == INVALID
+    assert pattern_problem(["a"]) == INVALID
+    assert check_proc(check(Operator.REGEXP, "(")) is false
+    assert check_proc(check(Operator.REGEXP, "(a+)+$")) is false
+
+    # rejection could be disabled, for patterns which are known to be safe
+    options = CompileOptions(reject_unsafe_patterns=False)
+    proc = check_proc(check(Operator.REGEXP, "(a+)+$"), options=options)
+    assert proc({PATH: "aaa"}) is True
+
+    context_type = make_context_type([Variable(PATH, VariableType.STRING)])
+    typed_options = CompileOptions().for_context(context_type)
+    assert check_proc(
+        check(Operator.REGEXP, "(a+)+$"), None, typed_options
+    ) is (false)
+
+
+def test_wildcard_matcher():
+    values = [
+        "".join(chars)
+        for size in range(6)
+        for chars in itertools.product("abc\n", repeat=size)
+    ]
+    patterns = [
+        "",
+        "*",
+        "a",
+        "a*",
+        "*a",
+        "a*b",
+        "*a*",
+        "a*b*c",
+        "ab**ba",
+        "a*a",
+        "\n",
+        "a\n",
+        "*\n",
+        "a*\n*b",
+        "\n*a*",
+        "a*\n\n",
+    ]
+    for pattern in patterns:
+        match = wildcard_matcher(pattern)
+        regex = re.compile(wildcard_pattern(pattern))
+        for value in values:
+            assert match(value) == (regex.match(value) is not None), (
+                pattern,
+                value,
+            )
+
+    # linear time, regular expression would take minutes
+    value = "a" * 100_000
+    started = time.perf_counter()
+    assert wildcard_matcher("*a*a*a*a*a*b")(value) is False
+    assert time.perf_counter() - started < 1.0
+
+
+def test_max_match_length():
+    options = CompileOptions(max_match_length=8)
+    regexp = check_proc(check(Operator.REGEXP, "^/api/"), options=options)
+    wildcard = check_proc(check(Operator.WILDCARD, "/api/*"), options=options)
+    for proc in (regexp, wildcard):
+        assert proc({PATH: "/api/1"}) is True
+        assert proc({PATH: "/api/123456"}) is False
+        assert proc({PATH: 1}) is False
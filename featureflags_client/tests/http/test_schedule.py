@@ -0,0 +1,201 @@
+import math
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from featureflags_client.http.conditions import check_proc
+from featureflags_client.http.operands import OperandPool
+from featureflags_client.http.options import CompileOptions
+from featureflags_client.http.schedule import flag_timeline, value_timeline
+from featureflags_client.http.state import HttpState
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+    VariableType,
+)
+
+START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+END = START + timedelta(days=7)
+
+OPTIONS = CompileOptions(now_variable="now")
+
+
+def now_check(operator, value):
+    return Check(
+        operator=operator,
+        variable=CheckVariable("now", VariableType.TIMESTAMP),
+        value=value,
+    )
+
+
+def user_check(user_id):
+    return Check(
+        operator=Operator.EQUAL,
+        variable=CheckVariable("user.id", VariableType.NUMBER),
+        value=user_id,
+    )
+
+
+def window_flag():
+    return Flag(
+        name="LAUNCH",
+        enabled=True,
+        overridden=True,
+        conditions=[
+            # everyone during the launch week
+            Condition(
+                checks=[
+                    now_check(Operator.GREATER_OR_EQUAL, START.isoformat()),
+                    now_check(Operator.LESS_THAN, END.timestamp()),
+                ]
+            ),
+            # beta testers since the day before
+            Condition(
+                checks=[
+                    now_check(
+                        Operator.GREATER_THAN,
+                        (START - timedelta(days=1)).isoformat(),
+                    ),
+                    user_check(1),
+                ]
+            ),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    ("ctx_value", "expected"),
+    [
+        (START, True),
+        (START.replace(tzinfo=None), True),
+        (START.timestamp(), True),
+        (str(START.timestamp()), True),
+        (START.isoformat().replace("+00:00", "Z"), True),
+        (START - timedelta(seconds=1), False),
+        ("not a date", False),
+        (True, False),
+        (None, False),
+    ],
+)
+def test_timestamp_check(ctx_value, expected):
+    check = Check(
+        operator=Operator.GREATER_OR_EQUAL,
+        variable=CheckVariable("created", VariableType.TIMESTAMP),
+        value="2030-01-01T00:00:00Z",
+    )
+    assert check_proc(check)({"created": ctx_value}) is expected
+
+
+def test_invalid_timestamp_operand():
+    check = Check(
+        operator=Operator.LESS_THAN,
+        variable=CheckVariable("created", VariableType.TIMESTAMP),
+        value="soon",
+    )
+    assert check_proc(check)({"created": START}) is False
+
+
+def test_flag_timeline():
+    timeline = flag_timeline(window_flag(), OperandPool(), OPTIONS)
+    assert timeline is not None
+
+    def at(moment, ctx):
+        proc, _ = timeline.at(moment.timestamp())
+        return proc(ctx)
+
+    day_before = START - timedelta(hours=12)
+    assert at(day_before - timedelta(days=1), {"user.id": 1}) is False
+    assert at(day_before, {"user.id": 1}) is True
+    assert at(day_before, {"user.id": 2}) is False
+    assert at(START, {"user.id": 2}) is True
+    assert at(END - timedelta(seconds=1), {}) is True
+    assert at(END, {}) is False
+    assert at(END, {"user.id": 1}) is True
+
+    _, until = timeline.at(START.timestamp())
+    assert until == END.timestamp()
+    _, until = timeline.at(END.timestamp())
+    assert until == math.inf
+
+
+def test_value_timeline():
+    value = Value(
+        name="BANNER",
+        enabled=True,
+        overridden=True,
+        value_default="none",
+        value_override="default",
+        conditions=[
+            ValueCondition(checks=[user_check(1)], value_override="beta"),
+            ValueCondition(
+                checks=[
+                    now_check(Operator.GREATER_OR_EQUAL, START.isoformat())
+                ],
+                value_override="launch",
+            ),
+            ValueCondition(checks=[user_check(2)], value_override="never"),
+        ],
+    )
+    timeline = value_timeline(value, OperandPool(), OPTIONS)
+    before, _ = timeline.at((START - timedelta(days=1)).timestamp())
+    after, _ = timeline.at(START.timestamp())
+
+    assert before({"user.id": 1}) == "beta"
+    assert before({"user.id": 2}) == "never"
+    assert after({"user.id": 1}) == "beta"
+    # first match wins
+    assert after({"user.id": 2}) == "launch"
+
+
+def test_not_scheduled():
+    flag = window_flag()
+    flag.conditions[0].checks.append(
+        Check(
+            operator=Operator.PERCENT,
+            variable=CheckVariable("now", VariableType.TIMESTAMP),
+            value=50,
+        )
+    )
+    assert flag_timeline(flag, OperandPool(), OPTIONS) is None
+    assert flag_timeline(window_flag(), OperandPool(), CompileOptions()) is None
+
+
+def test_state_advance():
+    state = HttpState(
+        project="test",
+        variables=[],
+        flags=["LAUNCH"],
+        values=[],
+        options=OPTIONS,
+    )
+    changes = []
+    state.subscribe(["LAUNCH"], changes.append)
+    with patch("time.time", return_value=START.timestamp() - 1):
+        state.update([window_flag()], [], 1)
+    assert changes == [{"LAUNCH"}]
+
+    snapshot = state.snapshot
+    assert snapshot.valid_until == START.timestamp()
+    assert state.get_flag("LAUNCH")({}) is False
+
+    state.advance(START.timestamp() - 1)
+    assert state.snapshot is snapshot
+    assert len(changes) == 1
+
+    state.advance(START.timestamp())
+    assert state.snapshot is not snapshot
+    assert state.snapshot.version == 1
+    assert state.snapshot.valid_until == END.timestamp()
+    assert state.get_flag("LAUNCH")({}) is True
+    # result for an empty context is changed by the transition
+    assert len(changes) == 2
+
+    state.advance(END.timestamp() + 1)
+    assert state.get_flag("LAUNCH")({}) is False
+    assert state.snapshot.valid_until == math.inf
@@ -0,0 +1,223 @@
+import gc
+import weakref
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.managers.dummy import DummyManager
+from featureflags_client.http.state import HttpState, StateSnapshot
+from featureflags_client.http.types import (
+    Check,
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    Value,
+    ValueCondition,
+    VariableType,
+)
+
+
+def test_update_swaps_snapshot(flag, value):
+    state = HttpState(project="test", variables=[], flags=[], values=[])
+    empty = state.snapshot
+    assert empty == StateSnapshot()
+
+    state.update([flag], [value], 1)
+    first = state.snapshot
+    assert first is not empty
+    assert first.version == state.version == 1
+    assert set(first.flags) == {flag.name}
+    assert set(first.values) == {value.name}
+
+    # same version is not recompiled
+    state.update([], [], 1)
+    assert state.snapshot is first
+
+    state.update([], [], 2)
+    assert state.snapshot.version == 2
+    assert state.snapshot.flags == {}
+    # previous snapshot is left intact
+    assert set(first.flags) == {flag.name}
+
+
+def test_flags_and_values_pin_snapshot():
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=[],
+        defaults={"TEST": False},
+        values_defaults={"TEST": "default"},
+    )
+    client = FeatureFlagsClient(manager)
+
+    def update(version, enabled, value):
+        manager._state.update(
+            [Flag("TEST", enabled, True, [])],
+            [Value("TEST", True, True, "default", value, [])],
+            version,
+        )
+
+    update(1, True, "one")
+
+    with client.flags() as flags, client.values() as values:
+        # state changes in the middle of the request
+        update(2, False, "two")
+        assert flags.TEST is True
+        assert values.TEST == "one"
+
+    with client.flags() as flags, client.values() as values:
+        assert flags.TEST is False
+        assert values.TEST == "two"
+
+
+def test_procs_drop_source_objects():
+    def check():
+        return Check(
+            operator=Operator.EQUAL,
+            variable=CheckVariable("user.id", VariableType.NUMBER),
+            value=1,
+        )
+
+    flags = [
+        Flag("ON", True, True, [Condition([check()])]),
+        Flag("OFF", False, True, [Condition([check()])]),
+    ]
+    values = [
+        Value("ON", True, True, "a", "b", [ValueCondition([check()], "c")]),
+        Value("OFF", False, True, "a", "b", [ValueCondition([check()], "c")]),
+        Value("DEFAULT", True, False, "a", "b", []),
+    ]
+    state = HttpState(project="test", variables=[], flags=[], values=[])
+    state.update(flags, values, 1)
+
+    refs = [weakref.ref(obj) for obj in (*flags, *values)]
+    del flags, values
+    gc.collect()
+    assert [ref() for ref in refs] == [None] * len(refs)
+
+    assert state.get_flag("ON")({"user.id": 1}) is True
+    assert state.get_value("ON")({"user.id": 1}) == "c"
+    assert state.snapshot.retained_size() > StateSnapshot().retained_size()
+
+
+def test_constants():
+    check = Check(
+        operator=Operator.EQUAL,
+        variable=CheckVariable("user.id", VariableType.NUMBER),
+        value=1,
+    )
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=[],
+        defaults={"ON": False, "OFF": True, "USER": False},
+        values_defaults={"SIZE": 1, "USER": "default"},
+    )
+    manager._state.update(
+        [
+            Flag("ON", True, True, []),
+            Flag("OFF", False, True, [Condition([check])]),
+            Flag("USER", True, True, [Condition([check])]),
+        ],
+        [
+            Value("SIZE", True, True, "1", "10", []),
+            Value("USER", True, True, "a", "b", [ValueCondition([check], "c")]),
+        ],
+        1,
+    )
+    snapshot = manager.get_snapshot()
+    assert snapshot.constant_flags() == {"ON": True, "OFF": False}
+    assert snapshot.constant_values() == {"SIZE": 10}
+
+    client = FeatureFlagsClient(manager)
+    with client.flags({"user.id": 1}) as flags:
+        assert (flags.ON, flags.OFF, flags.USER) == (True, False, True)
+    with client.values({"user.id": 1}) as values:
+        assert (values.SIZE, values.USER) == (10, "c")
+
+
+def test_subscribe():
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=[],
+        defaults={"TEST": False, "OTHER": False},
+        values_defaults={"POOL_SIZE": 1},
+    )
+    changes = []
+    unsubscribe = manager.subscribe(["TEST", "POOL_SIZE"], changes.append)
+
+    def check(user_id):
+        return Check(
+            operator=Operator.EQUAL,
+            variable=CheckVariable("user.id", VariableType.NUMBER),
+            value=user_id,
+        )
+
+    def update(version, pool_size=10, other=True, user_id=1.0):
+        manager._state.update(
+            [
+                Flag("TEST", True, True, [Condition([check(user_id)])]),
+                Flag("OTHER", other, True, []),
+            ],
+            [Value("POOL_SIZE", True, True, 1, pool_size, [])],
+            version,
+        )
+
+    update(1)
+    assert changes == [{"TEST", "POOL_SIZE"}]
+
+    # nothing subscribed is changed
+    update(2, other=False)
+    assert len(changes) == 1
+
+    update(3, pool_size=20)
+    assert changes[-1] == {"POOL_SIZE"}
+
+    # result for an empty context is the same, definition is not
+    update(4, pool_size=20, user_id=2.0)
+    assert changes[-1] == {"TEST"}
+
+    # subscribed after the state is loaded
+    late = []
+    manager.subscribe(["TEST"], late.append)
+    update(5, pool_size=20, user_id=2.0)
+    assert late == []
+    update(6, pool_size=20, user_id=3.0)
+    assert late == [{"TEST"}]
+
+    unsubscribe()
+    update(7, pool_size=30)
+    assert changes[-1] == {"TEST"}
+
+
+def test_subscribe_during_compile():
+    manager = DummyManager(
+        url="",
+        project="test",
+        variables=[],
+        defaults={"TEST": False},
+    )
+    state = manager._state
+
+    def flags(user_id):
+        check = Check(
+            operator=Operator.EQUAL,
+            variable=CheckVariable("user.id", VariableType.NUMBER),
+            value=user_id,
+        )
+        return [Flag("TEST", True, True, [Condition([check])])]
+
+    state.update(flags(1.0), [], 1)
+    # compiled before the subscription, without fingerprints
+    compiled = state.compile(flags(1.0), [], 2)
+    changes = []
+    manager.subscribe(["TEST"], changes.append)
+    state.swap(compiled)
+    assert changes == []
+
+    # the first snapshot with fingerprints, definitions are the same
+    state.update(flags(1.0), [], 3)
+    assert changes == []
+
+    state.update(flags(2.0), [], 4)
+    assert changes == [{"TEST"}]
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import count
+from unittest.mock import patch
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.context import LazyContext
+from featureflags_client.http.managers.requests import RequestsManager
+from featureflags_client.http.types import Flag
+
+THREADS = 8
+
+
+def run_concurrently(fn):
+    barrier = threading.Barrier(THREADS)
+
+    def target(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        return list(executor.map(target, range(THREADS)))
+
+
+def test_single_sync():
+    manager = RequestsManager(
+        url="http://flags.server.example",
+        project="test",
+        variables=[],
+        defaults={"TEST": False},
+    )
+    calls = []
+
+    def sync(enabled, version):
+        calls.append(version)
+        time.sleep(0.1)
+        manager._state.update(
+            [
+                Flag(
+                    name="TEST",
+                    enabled=enabled,
+                    overridden=True,
+                    conditions=[],
+                )
+            ],
+            [],
+            version,
+        )
+
+    client = FeatureFlagsClient(manager)
+
+    def read():
+        with client.flags() as flags:
+            return flags.TEST
+
+    # readers wait for the first sync
+    with patch.object(manager, "sync", side_effect=lambda: sync(True, 1)):
+        results = run_concurrently(read)
+
+    assert calls == [1]
+    assert results == [True] * THREADS
+
+    # and don't wait for the next ones
+    manager._next_sync = datetime.utcnow()
+    with patch.object(manager, "sync", side_effect=lambda: sync(False, 2)):
+        results = run_concurrently(read)
+
+    assert calls == [1, 2]
+    assert True in results
+    assert read() is False
+
+
+def test_lazy_context_provider():
+    counter = count()
+
+    def provider():
+        value = next(counter)
+        time.sleep(0.01)
+        return value
+
+    ctx = LazyContext({"user.id": provider})
+    results = run_concurrently(lambda: ctx["user.id"])
+    assert len(set(results)) == 1
+    assert dict(ctx) == {"user.id": results[0]}
@@ -0,0 +1,218 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.managers.httpx import HttpxManager
+from featureflags_client.http.managers.requests import RequestsManager
+from featureflags_client.http.tracing import SyncHooks, SyncStage
+from featureflags_client.http.types import (
+    Flag,
+    PreloadFlagsResponse,
+    Variable,
+)
+
+
+class RecordingHooks(SyncHooks):
+    def __init__(self):
+        self.events = []
+        self.reports = []
+
+    def sync_started(self, endpoint):
+        self.events.append(("sync", endpoint))
+
+    def stage_started(self, stage, endpoint):
+        self.events.append(("start", stage))
+
+    def stage_finished(self, stage, endpoint, duration):
+        assert duration >= 0
+        self.events.append(("finish", stage))
+
+    def sync_finished(self, report):
+        self.reports.append(report)
+
+
+def make_content(condition, version=1):
+    response = PreloadFlagsResponse(
+        version=version,
+        flags=[
+            Flag(
+                name="TEST",
+                enabled=True,
+                overridden=True,
+                conditions=[condition],
+            ),
+        ],
+        values=[],
+    )
+    return json.dumps(response.to_dict()).encode()
+
+
+def make_manager(manager_class, variable, hooks, **kwargs):
+    return manager_class(
+        url="http://flags.server.example",
+        project="test",
+        variables=[Variable(variable.name, variable.type)],
+        defaults={"TEST": False},
+        request_timeout=1,
+        refresh_interval=1,
+        sync_hooks=hooks,
+        **kwargs,
+    )
+
+
+STAGES = [
+    ("sync", Endpoints.PRELOAD),
+    ("start", SyncStage.NETWORK),
+    ("finish", SyncStage.NETWORK),
+    ("start", SyncStage.DECODE),
+    ("finish", SyncStage.DECODE),
+    ("start", SyncStage.PARSE),
+    ("finish", SyncStage.PARSE),
+    ("start", SyncStage.COMPILE),
+    ("finish", SyncStage.COMPILE),
+]
+
+
+def test_sync_hooks(variable, condition):
+    hooks = RecordingHooks()
+    manager = make_manager(RequestsManager, variable, hooks)
+    content = make_content(condition)
+
+    assert manager.staleness is None
+
+    with patch.object(manager, "_post_raw") as mock_post_raw:
+        mock_post_raw.return_value = content
+        manager.preload()
+        manager.sync()
+
+    assert hooks.events[: len(STAGES)] == STAGES
+
+    preload, sync = hooks.reports
+    assert preload.success is True
+    assert preload.endpoint is Endpoints.PRELOAD
+    assert preload.version == 1
+    assert preload.response_bytes == len(content)
+    assert preload.flags_compiled == 1
+    assert preload.staleness is None
+    assert preload.network_time > 0
+    assert preload.compile_time > 0
+
+    # same version, nothing to compile
+    assert sync.endpoint is Endpoints.SYNC
+    assert sync.flags_compiled == 0
+    assert sync.staleness is not None
+    assert manager.staleness is not None
+
+
+def test_sync_hooks_error(variable):
+    hooks = RecordingHooks()
+    manager = make_manager(RequestsManager, variable, hooks)
+
+    with patch.object(manager, "_post_raw") as mock_post_raw:
+        mock_post_raw.side_effect = ConnectionError("boom")
+        with pytest.raises(ConnectionError):
+            manager.sync()
+
+    (report,) = hooks.reports
+    assert report.success is False
+    assert isinstance(report.error, ConnectionError)
+    assert hooks.events[-1] == ("finish", SyncStage.NETWORK)
+    assert manager.staleness is None
+
+
+def test_failing_hook_does_not_break_sync(variable, condition):
+    class FailingHooks(SyncHooks):
+        def stage_started(self, stage, endpoint):
+            raise RuntimeError("hook")
+
+    manager = make_manager(RequestsManager, variable, FailingHooks())
+
+    with patch.object(manager, "_post_raw") as mock_post_raw:
+        mock_post_raw.return_value = make_content(condition)
+        manager.preload()
+
+    assert manager._state.version == 1
+
+
+@pytest.mark.asyncio
+async def test_async_sync_hooks(variable, condition):
+    hooks = RecordingHooks()
+    manager = make_manager(HttpxManager, variable, hooks)
+
+    with patch.object(manager, "_post_raw") as mock_post_raw:
+        mock_post_raw.return_value = make_content(condition)
+        await manager.preload()
+
+    assert hooks.events == STAGES
+    (report,) = hooks.reports
+    assert report.success is True
+    assert report.flags_compiled == 1
+
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_async_executor(variable, condition):
+    hooks = RecordingHooks()
+
+    with ThreadPoolExecutor(1) as executor:
+        manager = make_manager(HttpxManager, variable, hooks, executor=executor)
+        with patch.object(manager, "_post_raw") as mock_post_raw:
+            mock_post_raw.return_value = make_content(condition)
+            await manager.preload()
+            mock_post_raw.return_value = make_content(condition, version=2)
+            await manager.sync()
+
+    assert hooks.events[: len(STAGES)] == STAGES
+    preload, sync = hooks.reports
+    assert preload.success is True
+    assert preload.flags_compiled == 1
+    assert sync.version == 2
+    assert manager._state.version == 2
+    assert "TEST" in manager.get_snapshot().flags
+    # only the swap of compiled state is done on the loop
+    assert preload.loop_blocked_time < preload.compile_time
+
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_async_process_executor(variable, condition):
+    hooks = RecordingHooks()
+
+    with ProcessPoolExecutor(1) as executor:
+        manager = make_manager(HttpxManager, variable, hooks, executor=executor)
+        with patch.object(manager, "_post_raw") as mock_post_raw:
+            # parse errors of a malformed response don't break the pool
+            mock_post_raw.return_value = b'{"flags": []}'
+            with pytest.raises(ValueError, match="version"):
+                await manager.preload()
+
+            mock_post_raw.return_value = make_content(condition)
+            await manager.preload()
+
+    failed, preload = hooks.reports
+    assert failed.success is False
+    assert preload.success is True
+    assert preload.flags_compiled == 1
+    assert "TEST" in manager.get_snapshot().flags
+
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_async_loop_blocked_time(variable, condition):
+    hooks = RecordingHooks()
+    manager = make_manager(HttpxManager, variable, hooks)
+
+    with patch.object(manager, "_post_raw") as mock_post_raw:
+        mock_post_raw.return_value = make_content(condition)
+        await manager.preload()
+
+    (report,) = hooks.reports
+    assert report.loop_blocked_time >= report.parse_time > 0
+
+    await manager.close()
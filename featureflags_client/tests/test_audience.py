@@ -0,0 +1,171 @@
+import io
+import json
+from functools import partial
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from featureflags_client.audience import audience, main
+from featureflags_client.http.types import (
+    CheckVariable,
+    Condition,
+    Flag,
+    Operator,
+    PreloadFlagsResponse,
+    Value,
+    ValueCondition,
+    VariableType,
+)
+from featureflags_client.http.utils import hash_flag_value
+from featureflags_client.tests.utils import make_check
+
+USER_ID = CheckVariable("user.id", VariableType.NUMBER)
+USERS = range(1, 1001)
+
+
+check = partial(make_check, USER_ID.name, USER_ID.type)
+
+
+@pytest.fixture
+def response():
+    return PreloadFlagsResponse(
+        version=1,
+        flags=[
+            Flag(
+                "HALF", True, True, [Condition([check(Operator.PERCENT, 50.0)])]
+            ),
+            Flag(
+                "NEVER", True, True, [Condition([check(Operator.PERCENT, 0.0)])]
+            ),
+            Flag("ON", True, True, []),
+            Flag("DEFAULT", True, False, []),
+        ],
+        values=[
+            Value(
+                "LIMIT",
+                True,
+                True,
+                "10",
+                "20",
+                [ValueCondition([check(Operator.LESS_THAN, 101.0)], "30")],
+            ),
+        ],
+    ).to_dict()
+
+
+def jsonl_contexts():
+    lines = [json.dumps({"user.id": user_id}) for user_id in USERS]
+    return io.StringIO("\n".join([*lines, "not json", ""]))
+
+
+def csv_contexts():
+    return io.StringIO(
+        "user.id,email\n" + "".join(f"{i},user{i}@example.com\n" for i in USERS)
+    )
+
+
+def test_audience(response):
+    half = sum(hash_flag_value("user.id", i) % 100 < 50 for i in USERS)
+
+    report = audience(response, jsonl_contexts(), chunk_size=100)
+    assert report["rows"] == len(USERS)
+    assert report["invalid"] == 1
+    assert report["flags"]["HALF"]["matched"] == half
+    assert report["flags"]["HALF"]["constant"] is False
+    assert report["flags"]["NEVER"] == {
+        "matched": 0,
+        "share": 0,
+        "constant": True,
+    }
+    assert report["flags"]["ON"]["matched"] == len(USERS)
+    assert report["values"]["LIMIT"]["distribution"] == {20: 900, 30: 100}
+    assert report["not_overridden"] == ["DEFAULT"]
+
+    # numbers are coerced to ints, so PERCENT hashes are the same
+    csv_report = audience(
+        response,
+        csv_contexts(),
+        flags=["HALF"],
+        values=[],
+        fmt="csv",
+        chunk_size=100,
+    )
+    assert csv_report["flags"]["HALF"]["matched"] == half
+    assert csv_report["values"] == {}
+
+
+def test_invalid_csv_cells(response):
+    contexts = io.StringIO("user.id,email\n1,a\nmany,b\n,c\n")
+    report = audience(response, contexts, fmt="csv")
+    # rows with numbers which can't be parsed are not evaluated, empty
+    # cells are missing values
+    assert report["rows"] == 2
+    assert report["invalid"] == 1
+    assert report["values"]["LIMIT"]["distribution"] == {30: 1, 20: 1}
+
+
+def test_process_pool(response):
+    single = audience(response, jsonl_contexts(), chunk_size=100)
+    pooled = audience(response, jsonl_contexts(), workers=2, chunk_size=100)
+    assert pooled == single
+
+
+def test_main(response, tmp_path, capsys):
+    snapshot = tmp_path / "flags.json"
+    snapshot.write_text(json.dumps(response))
+    contexts = tmp_path / "contexts.csv"
+    contexts.write_text(csv_contexts().getvalue())
+
+    main(
+        [
+            "--snapshot",
+            str(snapshot),
+            "--flag",
+            "ON",
+            "--json",
+            str(contexts),
+        ]
+    )
+    report = json.loads(capsys.readouterr().out)
+    assert report["flags"] == {
+        "ON": {"matched": len(USERS), "share": 1.0, "constant": True}
+    }
+    assert report["values"] == {}
+
+    main(["--snapshot", str(snapshot), str(contexts)])
+    assert "flag ON: 1000 (100.00%, constant)" in capsys.readouterr().out
+
+
+def test_main_upstream(response, tmp_path, capsys):
+    contexts = tmp_path / "contexts.jsonl"
+    contexts.write_text(jsonl_contexts().getvalue())
+    reply = MagicMock()
+    reply.__enter__.return_value.read.return_value = json.dumps(response)
+
+    with patch("urllib.request.urlopen", return_value=reply) as urlopen:
+        main(
+            [
+                "--upstream",
+                "http://flags.example",
+                "--project",
+                "test",
+                "--flag",
+                "HALF",
+                "--value",
+                "UNKNOWN",
+                "--json",
+                str(contexts),
+            ]
+        )
+
+    # sync request doesn't register names on the server
+    request = urlopen.call_args.args[0]
+    assert request.full_url == "http://flags.example/flags/sync"
+    assert json.loads(request.data) == {
+        "project": "test",
+        "version": 0,
+        "flags": ["HALF"],
+        "values": ["UNKNOWN"],
+    }
+    report = json.loads(capsys.readouterr().out)
+    assert report["not_overridden"] == ["UNKNOWN"]
@@ -0,0 +1,190 @@
+import gzip
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.constants import Endpoints
+from featureflags_client.http.exposures import ExposureLog
+from featureflags_client.http.managers.requests import RequestsManager
+from featureflags_client.http.types import (
+    Flag,
+    PreloadFlagsResponse,
+    Value,
+    Variable,
+    VariableType,
+)
+from featureflags_client.relay import Relay, make_server
+
+USER_ID = Variable("user.id", VariableType.NUMBER)
+
+
+def upstream_response(request, version=1):
+    response = PreloadFlagsResponse(
+        version=version,
+        flags=[
+            Flag(name=name, enabled=True, overridden=True, conditions=[])
+            for name in request["flags"]
+        ],
+        values=[
+            Value(
+                name=name,
+                enabled=True,
+                overridden=True,
+                value_default=default,
+                value_override=f"{default}-override",
+                conditions=[],
+            )
+            for name, default in (
+                value if isinstance(value, list) else [value, ""]
+                for value in request["values"]
+            )
+        ],
+    )
+    return response.to_dict()
+
+
+@pytest.fixture
+def relay():
+    relay = Relay("http://flags.server.example")
+    relay.upstream_version = 1
+    requests = []
+
+    def post(endpoint, payload, headers=None):
+        if endpoint is Endpoints.EXPOSURES:
+            requests.append((endpoint, payload, headers))
+            return b"{}"
+        request = json.loads(payload)
+        requests.append((endpoint, request))
+        return json.dumps(
+            upstream_response(request, relay.upstream_version)
+        ).encode()
+
+    with patch.object(relay, "_post", side_effect=post):
+        relay.upstream_requests = requests
+        yield relay
+
+
+@pytest.fixture
+def relay_url(relay):
+    server = make_server(relay, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(url, flags, values=None, exposures=None):
+    manager = RequestsManager(
+        url=url,
+        project="test",
+        variables=[USER_ID],
+        defaults=dict.fromkeys(flags, False),
+        values_defaults=values or {},
+    )
+    return FeatureFlagsClient(manager, exposures=exposures)
+
+
+def test_relay(relay, relay_url):
+    first = make_client(relay_url, ["A"], {"V": "v"})
+    first.preload()
+    with first.flags() as flags:
+        assert flags.A is True
+    with first.values() as values:
+        assert values.V == "v-override"
+
+    # known names are answered from the cached state
+    make_client(relay_url, ["A"], {"V": "v"}).preload()
+    assert len(relay.upstream_requests) == 1
+
+    second = make_client(relay_url, ["B"])
+    second.preload()
+    with second.flags() as flags:
+        assert flags.B is True
+    assert len(relay.upstream_requests) == 2
+    # names of all processes are requested together
+    endpoint, request = relay.upstream_requests[-1]
+    assert endpoint is Endpoints.PRELOAD
+    assert request["flags"] == ["A", "B"]
+    assert request["values"] == [["V", "v"]]
+    assert request["variables"] == [
+        {"name": USER_ID.name, "type": USER_ID.type.value}
+    ]
+
+    # state is refreshed with sync requests of the current version
+    state = relay._projects["test"].state
+    assert relay.refresh_all() is True
+    assert relay.upstream_requests[-1] == (
+        Endpoints.SYNC,
+        {"project": "test", "version": 1, "flags": ["A", "B"], "values": ["V"]},
+    )
+    assert relay._projects["test"].state is state
+
+    relay.upstream_version = 2
+    assert relay.refresh_all() is True
+    assert relay._projects["test"].state.version == 2
+    second._manager.sync()
+    assert second._manager.get_snapshot().version == 2
+
+
+def test_sync_without_preload(relay, relay_url):
+    client = make_client(relay_url, ["A"], {"V": "v"})
+    # values are requested by the first read, without a preload
+    with client.values() as values:
+        assert values.V == "-override"
+    with client.flags() as flags:
+        assert flags.A is True
+    assert relay.upstream_requests[-1][1]["values"] == [["V", ""]]
+
+    # default sent by a preload replaces the unknown one
+    make_client(relay_url, ["A"], {"V": "v"}).preload()
+    assert relay.upstream_requests[-1][1]["values"] == [["V", "v"]]
+    assert len(relay.upstream_requests) == 2
+
+
+def test_stale_state(relay):
+    request = {
+        "project": "test",
+        "version": 0,
+        "variables": [],
+        "flags": ["A"],
+        "values": [],
+    }
+    body = relay.handle(Endpoints.PRELOAD, request)
+
+    with patch.object(relay, "_post", side_effect=OSError("down")):
+        assert relay.refresh_all() is False
+        # new names are requested, last known state is used
+        response = json.loads(
+            relay.handle(Endpoints.PRELOAD, {**request, "flags": ["A", "B"]})
+        )
+    assert [flag["name"] for flag in response["flags"]] == ["A"]
+    assert json.loads(body)["version"] == 1
+
+
+def test_exposures(relay, relay_url):
+    exposures = ExposureLog("user.id")
+    client = make_client(relay_url, ["A"], exposures=exposures)
+    manager = client._manager
+    client.preload()
+    with client.flags({"user.id": 1}) as flags:
+        assert flags.A is True
+
+    exposures.flush(manager)
+    assert exposures.sent == 1
+    endpoint, payload, headers = relay.upstream_requests[-1]
+    assert endpoint is Endpoints.EXPOSURES
+    assert headers == {"Content-Encoding": "gzip"}
+    [exposure] = json.loads(gzip.decompress(payload))["exposures"]
+    assert exposure["name"] == "A"
+
+    # failures are reported to the process
+    with patch.object(relay, "_post", side_effect=OSError("down")):
+        with client.flags({"user.id": 2}) as flags:
+            assert flags.A is True
+        exposures.flush(manager)
+    assert exposures.failed == 1
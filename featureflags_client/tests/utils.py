@@ -0,0 +1,37 @@
+from featureflags_client.http.client import FeatureFlagsClient
+from featureflags_client.http.managers.dummy import DummyManager
+from featureflags_client.http.types import Check, CheckVariable
+
+
+def make_check(name, variable_type, operator, value):
+    return Check(
+        operator=operator,
+        variable=CheckVariable(name, variable_type),
+        value=value,
+    )
+
+
+def make_client(
+    defaults,
+    values_defaults=None,
+    flags=None,
+    values=None,
+    *,
+    version=1,
+    manager_class=DummyManager,
+    **kwargs,
+):
+    """
+    Client with a dummy manager, its state is updated with the given flags
+    and values. Keyword arguments are passed to the client.
+    """
+    manager = manager_class(
+        url="",
+        project="test",
+        variables=[],
+        defaults=defaults,
+        values_defaults=values_defaults,
+    )
+    if flags is not None or values is not None:
+        manager._state.update(flags or [], values or [], version)
+    return FeatureFlagsClient(manager, **kwargs)